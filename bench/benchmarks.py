@@ -0,0 +1,448 @@
+"""
+Environment and training throughput benchmarks.
+
+Each benchmark returns a dict of results: name -> (value, unit, higher_is_better).
+"""
+import os  # for file operations
+import sys  # for system operations
+import time  # for timing
+import random  # for the apple spawn RNG
+
+import numpy as np  # for numerical operations
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from entitySnake import Snake, SAMPLE_FREE_FRACTION, UP, DOWN, LEFT, RIGHT  # for snake entity, direction codes and the spawn switch-over
+from entityApple import Apple  # for apple entity
+from rl import SnakeEnv  # for SnakeEnv environment
+
+# Board sizes as (cols, rows)
+GRID_SIZES = [(12, 12), (24, 24), (50, 50), (100, 100), (200, 200)]
+
+# Snake lengths as a fraction of the board
+LENGTH_FRACTIONS = [0.0, 0.25, 0.75]
+
+
+# Run fn and return the best time of a few repeats
+def _best_time(fn, repeats: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+# Directions following a Hamiltonian cycle over the board (needs an even number of rows)
+def cycle_directions(cols: int, rows: int) -> list[int]:
+    """
+    Returns the direction code to take from every cell so the snake never dies:
+    right along row 0, zigzag through columns 1.. on the other rows, back up column 0
+    """
+    directions = [UP] * (cols * rows)
+    for row in range(rows):
+        for col in range(cols):
+            cell = row * cols + col
+            if row == 0:
+                directions[cell] = RIGHT if col < cols - 1 else DOWN
+            elif col == 0:
+                directions[cell] = UP
+            elif row % 2 == 0:
+                directions[cell] = RIGHT if col < cols - 1 else DOWN
+            elif col > 1:
+                directions[cell] = LEFT
+            else:
+                directions[cell] = DOWN if row < rows - 1 else LEFT
+    return directions
+
+
+# Play steps with the cycle policy and return steps per second
+def _steps_per_second(env: SnakeEnv, steps: int) -> float:
+    directions = cycle_directions(env.cols, env.rows)
+
+    def run():
+        # Same episodes on every repeat
+        env.reset(seed=0)
+        snake = env.snake
+        for _ in range(steps):
+            _, _, terminated, truncated, _ = env.step(directions[snake.body[0]])
+            if terminated or truncated:
+                env.reset()
+                snake = env.snake
+
+    return steps / _best_time(run)
+
+
+# Env steps/sec at several snake lengths and grid sizes
+def bench_step(quick: bool = False) -> dict:
+    steps = 5000 if quick else 20000
+    results = {}
+    for cols, rows in GRID_SIZES:
+        for fraction in LENGTH_FRACTIONS:
+            length = max(5, int(cols * rows * fraction))
+            env = SnakeEnv(cols=cols, rows=rows, initial_length=length)
+            name = f"step/{cols}x{rows}/len{length}"
+            results[name] = (_steps_per_second(env, steps), "steps/s", True)
+    return results
+
+
+# Reset cost per grid size
+def bench_reset(quick: bool = False) -> dict:
+    resets = 200 if quick else 1000
+    results = {}
+    for cols, rows in GRID_SIZES:
+        env = SnakeEnv(cols=cols, rows=rows)
+
+        def run():
+            # Same start cells on every repeat
+            for i in range(resets):
+                env.reset(seed=0 if i == 0 else None)
+
+        name = f"reset/{cols}x{rows}"
+        results[name] = (_best_time(run) / resets * 1e6, "us/reset", False)
+    return results
+
+
+# Apple spawn cost on a nearly full board and just past the rejection sampling switch-over
+def bench_apple_spawn(quick: bool = False) -> dict:
+    spawns = 2000 if quick else 10000
+    results = {}
+    for cols, rows in GRID_SIZES:
+        # 3 free cells, and the most free cells that still skip rejection sampling
+        switch_over = (cols * rows - 1) // SAMPLE_FREE_FRACTION
+        for n_free, label in ((3, "3_free"), (switch_over, "switch_over")):
+            rng = random.Random(0)
+            snake = Snake(cols, rows, rng=rng)
+            apple = Apple(cols, rows, rng=rng)
+
+            # Leave only n_free free cells
+            free_cells = snake.free_cells
+            while len(free_cells) > n_free:
+                free_cells.remove(free_cells.cells[0])
+
+            def run():
+                for _ in range(spawns):
+                    apple.spawn_random(free_cells=free_cells)
+
+            name = f"apple_spawn/{cols}x{rows}/{label}"
+            results[name] = (_best_time(run) / spawns * 1e6, "us/spawn", False)
+    return results
+
+
+# Observation extraction cost at several snake lengths (feature vector and board image)
+def bench_obs(quick: bool = False) -> dict:
+    calls = 5000 if quick else 20000
+    results = {}
+    cols, rows = GRID_SIZES[0]
+    for obs_type in ("features", "grid"):
+        for fraction in LENGTH_FRACTIONS:
+            length = max(5, int(cols * rows * fraction))
+            env = SnakeEnv(cols=cols, rows=rows, initial_length=length, obs_type=obs_type)
+            env.reset(seed=0)
+
+            # Unroll the snake along the cycle so the body is spread over the board
+            directions = cycle_directions(env.cols, env.rows)
+            for _ in range(length):
+                env.step(directions[env.snake.body[0]])
+
+            def run():
+                for _ in range(calls):
+                    env._get_obs()
+
+            suffix = "" if obs_type == "features" else "/grid"
+            name = f"obs/{cols}x{rows}{suffix}/len{length}"
+            results[name] = (_best_time(run) / calls * 1e6, "us/obs", False)
+    return results
+
+
+# Saving and restoring game states (SnakeEnv and batched SnakeVecEnv boards)
+def bench_state(quick: bool = False) -> dict:
+    from rl.vec_env import SnakeVecEnv
+
+    calls = 5000 if quick else 20000
+    results = {}
+    cols, rows = GRID_SIZES[0]
+    for fraction in LENGTH_FRACTIONS:
+        length = max(5, int(cols * rows * fraction))
+        env = SnakeEnv(cols=cols, rows=rows, initial_length=length)
+        env.reset(seed=0)
+
+        # Unroll the snake along the cycle so the body is spread over the board
+        directions = cycle_directions(env.cols, env.rows)
+        for _ in range(length):
+            env.step(directions[env.snake.body[0]])
+        state = env.get_state()
+
+        def run():
+            for _ in range(calls):
+                env.get_state(state)
+                env.set_state(state)
+
+        results[f"state/{cols}x{rows}/len{length}"] = (_best_time(run) / calls * 1e6, "us/save+restore", False)
+
+    # Copy one board into all boards of a batch (lookahead from one position)
+    num_envs = 256
+    clones = 200 if quick else 1000
+    env = SnakeVecEnv(num_envs, seed=0)
+    env.reset()
+    source = np.zeros(num_envs, dtype=np.int64)
+    target = np.arange(num_envs)
+
+    def run_clone():
+        for _ in range(clones):
+            env.clone_boards(source, target)
+
+    results[f"state/clone_{num_envs}_boards"] = (_best_time(run_clone) / clones * 1e6, "us/clone", False)
+
+    # Load a batch board into a SnakeEnv (correctness: bench/check_state.py)
+    single = SnakeEnv()
+    single.reset(seed=0)
+
+    def run_vec_to_env():
+        for _ in range(calls):
+            single.set_state(env.get_states([0])[0])
+
+    results["state/vec_to_env"] = (_best_time(run_vec_to_env) / calls * 1e6, "us/restore", False)
+    return results
+
+
+# Tree search simulations/sec while playing (uniform priors and random rollouts)
+def bench_mcts(quick: bool = False) -> dict:
+    from rl.mcts import MCTSAgent
+
+    moves = 20 if quick else 100
+    budget = 200
+    env = SnakeEnv()
+
+    def run():
+        agent = MCTSAgent(env, budget=budget, seed=0)
+        env.reset(seed=0)
+        for _ in range(moves):
+            _, _, terminated, truncated, _ = env.step(agent.act(env))
+            if terminated or truncated:
+                env.reset()
+
+    return {f"mcts/12x12/budget{budget}": (moves * budget / _best_time(run, 3), "simulations/s", True)}
+
+
+# Solver decisions/sec over whole games (Hamiltonian cycle with shortcuts), timing only act()
+def bench_solver(quick: bool = False) -> dict:
+    from rl.solver import SolverAgent
+
+    episodes = 2 if quick else 5
+    env = SnakeEnv()
+    agent = SolverAgent(env)
+    best = 0.0
+    for _ in range(3):
+        decisions = 0
+        elapsed = 0.0
+        for episode in range(episodes):
+            env.reset(seed=episode)
+            terminated = truncated = False
+            while not (terminated or truncated):
+                start = time.perf_counter()
+                action = agent.act(env)
+                elapsed += time.perf_counter() - start
+                decisions += 1
+                _, _, terminated, truncated, _ = env.step(action)
+        best = max(best, decisions / elapsed)
+    return {"solver/12x12": (best, "decisions/s", True)}
+
+
+# rgb_array frames/sec while playing (step plus render)
+def bench_render(quick: bool = False) -> dict:
+    steps = 1000 if quick else 5000
+    results = {}
+    for copy_frame in (True, False):
+        env = SnakeEnv(render_mode="rgb_array", copy_frame=copy_frame)
+        directions = cycle_directions(env.cols, env.rows)
+
+        def run():
+            env.reset(seed=0)
+            for _ in range(steps):
+                _, _, terminated, truncated, _ = env.step(directions[env.snake.body[0]])
+                env.render()
+                if terminated or truncated:
+                    env.reset()
+
+        name = f"render/12x12/{'copy' if copy_frame else 'no_copy'}"
+        results[name] = (steps / _best_time(run), "frames/s", True)
+    return results
+
+
+# Batched SnakeVecEnv steps/sec (feature vector and board image observations)
+def bench_vec_env(quick: bool = False) -> dict:
+    from rl.vec_env import SnakeVecEnv
+
+    num_envs = 256
+    steps = 50 if quick else 200
+    actions = np.random.default_rng(0).integers(4, size=(steps, num_envs))
+    results = {}
+    for obs_type in ("features", "grid"):
+        env = SnakeVecEnv(num_envs, seed=0, obs_type=obs_type)
+
+        def run():
+            env.reset()
+            for i in range(steps):
+                env.step(actions[i])
+
+        suffix = "" if obs_type == "features" else "/grid"
+        results[f"vec_env/{num_envs}_boards{suffix}"] = (steps * num_envs / _best_time(run), "steps/s", True)
+    return results
+
+
+# Policy decisions/sec: one game calling predict per step vs concurrent games through the inference server
+def bench_inference(quick: bool = False) -> dict:
+    import threading
+    import torch
+    from stable_baselines3 import DQN
+    from rl.inference import InferenceServer
+    from rl.numpy_policy import NumpyPolicy
+    from rl.export import describe_q_net
+
+    torch.set_num_threads(1)
+    decisions = 2000 if quick else 10000
+    num_games = 64
+    model = DQN("MlpPolicy", SnakeEnv(), seed=0, device="cpu")
+
+    # Play a number of decisions with a predict function
+    def play(predict, count):
+        env = SnakeEnv()
+        obs, _ = env.reset(seed=0)
+        for _ in range(count):
+            action, _ = predict(obs)
+            obs, _, terminated, truncated, _ = env.step(action)
+            if terminated or truncated:
+                obs, _ = env.reset()
+
+    single = decisions / _best_time(lambda: play(lambda obs: model.predict(obs, deterministic=True), decisions), 3)
+
+    # Same Q-network exported to NumPy
+    layers, arrays = describe_q_net(model.policy.q_net)
+    numpy_policy = NumpyPolicy(layers, arrays, {"obs_shape": [11], "normalize_images": False, "n_actions": 4})
+    exported = decisions / _best_time(lambda: play(numpy_policy.predict, decisions), 3)
+
+    def run_server():
+        with InferenceServer(model.policy, max_batch_size=num_games, max_wait_ms=2.0) as server:
+            threads = [threading.Thread(target=play, args=(server.predict, decisions // num_games)) for _ in range(num_games)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+    served = decisions // num_games * num_games / _best_time(run_server, 3)
+    return {
+        "inference/single_predict": (single, "decisions/s", True),
+        "inference/numpy_single_predict": (exported, "decisions/s", True),
+        f"inference/server_{num_games}_games": (served, "decisions/s", True),
+    }
+
+
+# Median latency of one decision (one observation) per policy backend
+def bench_latency(quick: bool = False) -> dict:
+    import torch
+    from stable_baselines3 import DQN
+    from rl.export import describe_q_net
+    from rl.numpy_policy import NumpyPolicy
+    from rl.policies import GridCNN
+    from rl.torch_runtime import QNetworkPolicy
+
+    torch.set_num_threads(1)
+    decisions = 1000 if quick else 5000
+    results = {}
+    for obs_type in ("features", "grid"):
+        env = SnakeEnv(obs_type=obs_type)
+        if obs_type == "grid":
+            model = DQN("CnnPolicy", env, policy_kwargs=dict(features_extractor_class=GridCNN), seed=0, device="cpu")
+        else:
+            model = DQN("MlpPolicy", env, seed=0, device="cpu")
+
+        # Observations of random play
+        rng = np.random.default_rng(0)
+        observations = []
+        obs, _ = env.reset(seed=0)
+        for _ in range(decisions):
+            observations.append(obs)
+            obs, _, terminated, truncated, _ = env.step(int(rng.integers(4)))
+            if terminated or truncated:
+                obs, _ = env.reset()
+
+        layers, arrays = describe_q_net(model.policy.q_net)
+        metadata = {"obs_shape": list(env.observation_space.shape), "normalize_images": obs_type == "grid", "n_actions": 4}
+        policies = {
+            "sb3_predict": model,
+            "numpy": NumpyPolicy(layers, arrays, metadata),
+            "eager": QNetworkPolicy(model, "eager"),
+            "trace": QNetworkPolicy(model, "trace"),
+            "compile": QNetworkPolicy(model, "compile"),
+        }
+        for name, policy in policies.items():
+            # Warm up (torch.compile compiles here)
+            for obs in observations[:20]:
+                policy.predict(obs, deterministic=True)
+            latencies = np.empty(decisions)
+            for i, obs in enumerate(observations):
+                start = time.perf_counter()
+                policy.predict(obs, deterministic=True)
+                latencies[i] = time.perf_counter() - start
+            results[f"latency/{obs_type}/{name}"] = (float(np.median(latencies)) * 1e6, "us/decision", False)
+    return results
+
+
+# Replay buffer minibatches/sec (default Stable-Baselines3 buffer and compact buffer)
+def bench_replay(quick: bool = False) -> dict:
+    from stable_baselines3.common.buffers import ReplayBuffer
+    from rl.replay import SnakeReplayBuffer
+
+    transitions = 5000 if quick else 20000
+    batches = 200 if quick else 1000
+    results = {}
+    for obs_type in ("features", "grid"):
+        env = SnakeEnv(obs_type=obs_type)
+        rng = np.random.default_rng(0)
+        for name, buffer_class in (("default", ReplayBuffer), ("compact", SnakeReplayBuffer)):
+            buffer = buffer_class(transitions, env.observation_space, env.action_space, device="cpu")
+            obs, _ = env.reset(seed=0)
+            for _ in range(transitions):
+                action = int(rng.integers(4))
+                next_obs, reward, terminated, truncated, info = env.step(action)
+                buffer.add(obs[None], next_obs[None], np.array([action]), np.array([reward]), np.array([terminated]), [info])
+                obs = env.reset()[0] if terminated or truncated else next_obs
+
+            def run():
+                for _ in range(batches):
+                    buffer.sample(256)
+
+            results[f"replay/{obs_type}/{name}_sample_256"] = (batches / _best_time(run, 3), "batches/s", True)
+    return results
+
+
+# End-to-end DQN samples/sec (environment stepping plus learning)
+def bench_dqn(quick: bool = False) -> dict:
+    import torch
+    from stable_baselines3 import DQN
+
+    torch.set_num_threads(1)
+    timesteps = 3000 if quick else 10000
+    model = DQN("MlpPolicy", SnakeEnv(), learning_starts=1000, buffer_size=100_000, seed=0, device="cpu")
+    elapsed = _best_time(lambda: model.learn(timesteps, reset_num_timesteps=True), 1)
+    return {"dqn/samples_per_sec": (timesteps / elapsed, "samples/s", True)}
+
+
+# All benchmarks by name
+BENCHMARKS = {
+    "step": bench_step,
+    "reset": bench_reset,
+    "apple_spawn": bench_apple_spawn,
+    "obs": bench_obs,
+    "state": bench_state,
+    "mcts": bench_mcts,
+    "solver": bench_solver,
+    "render": bench_render,
+    "vec_env": bench_vec_env,
+    "inference": bench_inference,
+    "latency": bench_latency,
+    "replay": bench_replay,
+    "dqn": bench_dqn,
+}
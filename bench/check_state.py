@@ -0,0 +1,88 @@
+"""
+Check that board states move between SnakeVecEnv and SnakeEnv without changing the game.
+
+Exits with status 1 if any check fails.
+"""
+import os  # for file operations
+import sys  # for system operations
+import argparse  # for command line arguments
+
+import numpy as np  # for numerical operations
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rl import SnakeEnv  # for SnakeEnv environment
+from rl.vec_env import SnakeVecEnv  # for batched boards
+
+# Header fields describing the random stream rather than the game
+RNG_FIELDS = ("rng_state", "rng_pos")
+
+
+# Game fields of two saved states that differ
+def state_differences(state: np.ndarray, expected: np.ndarray, dtype: np.dtype) -> list[str]:
+    """
+    Returns the names of the non-random fields that differ
+    """
+    state, expected = state.view(dtype)[0], expected.view(dtype)[0]
+    return [
+        field for field in dtype.names
+        if field not in RNG_FIELDS and not np.array_equal(state[field], expected[field])
+    ]
+
+
+# Load every board of a stepped SnakeVecEnv into a SnakeEnv
+def check_vec_to_env(num_envs: int, steps: int, **env_kwargs) -> list[str]:
+    """
+    Returns failure messages: game fields that did not survive the round trip,
+    or a SnakeEnv whose random stream changed when the board was loaded
+    """
+    failures = []
+    vec = SnakeVecEnv(num_envs, seed=0, **env_kwargs)
+    vec.reset()
+    rng = np.random.default_rng(0)
+    for _ in range(steps):
+        vec.step(rng.integers(4, size=num_envs))
+
+    env = SnakeEnv(**env_kwargs)
+    env.reset(seed=0)
+    for i, board in enumerate(vec.get_states()):
+        rng_before = env.rng.get_state()
+        env.set_state(board)
+        differences = state_differences(env.get_state(), board, vec._state_dtype)
+        if differences:
+            failures.append(f"board {i}: {', '.join(differences)} changed")
+        if env.rng.get_state() != rng_before:
+            failures.append(f"board {i}: set_state replaced the env's random stream")
+
+    # The stream still produces varied numbers after all the loads
+    if len({env.rng.random() for _ in range(8)}) == 1:
+        failures.append("random stream is constant after loading SnakeVecEnv states")
+    return failures
+
+
+# Main function to run the checks on a few board sizes and observation types
+def main():
+    parser = argparse.ArgumentParser(description="SnakeVecEnv -> SnakeEnv state round-trip check")
+    parser.add_argument("--num-envs", type=int, default=32, help="Boards per check")
+    parser.add_argument("--steps", type=int, default=50, help="Random steps before saving the boards")
+    args = parser.parse_args()
+
+    configs = {
+        "12x12 features": dict(),
+        "10x8 cells features": dict(cols=10, rows=8),
+        "12x12 grid": dict(obs_type="grid"),
+    }
+    failed = False
+    for name, kwargs in configs.items():
+        failures = check_vec_to_env(args.num_envs, args.steps, **kwargs)
+        print(f"{name}: {'ok' if not failures else 'FAILED'}")
+        for failure in failures:
+            print(f"  {failure}")
+        failed = failed or bool(failures)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Run the benchmark suite, write JSON results and compare them against a stored baseline.
+
+Exits with status 1 if any result is worse than a baseline recorded with the same
+settings (machine, processor, Python, --quick) by more than the threshold.
+"""
+import os  # for file operations
+import sys  # for system operations
+import json  # for result files
+import time  # for timestamps
+import argparse  # for command line arguments
+import platform  # for machine metadata
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.benchmarks import BENCHMARKS  # for benchmark functions
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+
+
+# Run the selected benchmarks
+def run_benchmarks(names: list[str], quick: bool) -> dict:
+    """
+    Returns {"meta": {...}, "results": {name: {"value", "unit", "higher_is_better"}}}
+    """
+    results = {}
+    for name in names:
+        print(f"Running {name}...", flush=True)
+        for key, (value, unit, higher_is_better) in BENCHMARKS[name](quick).items():
+            results[key] = {"value": value, "unit": unit, "higher_is_better": higher_is_better}
+            print(f"  {key}: {value:,.2f} {unit}")
+
+    meta = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "quick": quick,
+    }
+    return {"meta": meta, "results": results}
+
+
+# Run settings that must match for results to be comparable
+COMPARABLE_META = ("quick", "machine", "processor", "python")
+
+
+# Differences between the run settings of the results and the baseline
+def meta_mismatches(results: dict, baseline: dict) -> list[str]:
+    """
+    Returns "key: baseline -> current" for every COMPARABLE_META key that differs
+    """
+    current, base = results["meta"], baseline.get("meta", {})
+    return [f"{key}: {base.get(key)!r} -> {current.get(key)!r}" for key in COMPARABLE_META if base.get(key) != current.get(key)]
+
+
+# Compare results against a baseline
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Returns the names of results that regressed by more than threshold (a fraction)
+    """
+    regressions = []
+    print(f"\n{'benchmark':<32} {'baseline':>14} {'current':>14} {'change':>8}")
+    for name, current in results["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"{name:<32} {'-':>14} {current['value']:>14,.2f} {'new':>8}")
+            continue
+
+        # Positive change means better, whichever direction the metric goes
+        ratio = current["value"] / base["value"] if base["value"] else 1.0
+        change = ratio - 1.0 if current["higher_is_better"] else 1.0 / ratio - 1.0
+        regressed = change < -threshold
+        if regressed:
+            regressions.append(name)
+        marker = "  REGRESSION" if regressed else ""
+        print(f"{name:<32} {base['value']:>14,.2f} {current['value']:>14,.2f} {change:>+8.1%}{marker}")
+    return regressions
+
+
+# Main function to parse arguments and run the suite
+def main():
+    parser = argparse.ArgumentParser(description="Snake environment benchmark suite")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS), help="Benchmarks to run")
+    parser.add_argument("--quick", action="store_true", help="Fewer iterations (noisier)")
+    parser.add_argument("--output", type=str, default="bench_results.json", help="Where to write the JSON results")
+    parser.add_argument("--baseline", type=str, default=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown before failing (0.2 = 20%%)")
+    parser.add_argument("--update-baseline", action="store_true", help="Replace the baseline with these results")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.only, args.quick)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.update_baseline:
+        # A fresh baseline, so every entry was measured with the stored meta
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline written: {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, run with --update-baseline to create one")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+
+    # Results of another machine, Python or iteration count are only shown, never gated
+    mismatches = meta_mismatches(results, baseline)
+    if mismatches:
+        print(f"\nBaseline was recorded with different settings ({', '.join(mismatches)}), not failing on regressions")
+        print("Run with --update-baseline on this machine to create a comparable baseline")
+        return
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+    print("\nNo regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,69 +1,107 @@
 import random
-import pygame
+from typing import TYPE_CHECKING
+
+# pygame is only needed for drawing, so it is imported lazily
+if TYPE_CHECKING:
+    import pygame
 
 class Apple:
+    """
+    Apple on a cols x rows board of integer cells.
+
+    The pixel layout (grid_left, grid_top, cell_size, size) is only used for drawing.
+    Random positions come from rng (the global random module by default).
+    """
     def __init__(
         self,
-        grid_left: int,
-        grid_top: int,
-        grid_width: int,
-        grid_height: int,
+        cols: int,
+        rows: int,
+        grid_left: int = 0,
+        grid_top: int = 0,
         cell_size: int = 50,
         size: int = 30,
+        rng=None,
     ) -> None:
 
+        self.rng = random if rng is None else rng
+        self.cols = cols
+        self.rows = rows
         self.grid_left = grid_left
         self.grid_top = grid_top
-        self.grid_width = grid_width
-        self.grid_height = grid_height
         self.cell_size = cell_size
         self.size = size
 
         # Spawn the apple at a random position (without snake segments initially)
         self.spawn_random([])
 
-    def spawn_random(self, snake_segments: list = None) -> None:
+    def spawn_random(self, snake_segments: list = None, free_cells=None) -> None:
+        cols = self.cols
+        rows = self.rows
+
+        # Pick directly from the snake's free-cell index when available (O(1))
+        if free_cells is not None:
+            if len(free_cells) == 0:
+                raise ValueError("No valid position found for apple")
+            cell = free_cells.sample(self.rng)
+            self._place(cell % cols, cell // cols)
+            return
+
         if snake_segments is None:
             snake_segments = []
-        cols = self.grid_width // self.cell_size
-        rows = self.grid_height // self.cell_size
+
+        # Cells covered by the snake segments (anything with x, y pixel positions)
+        occupied = {
+            ((segment.x - self.grid_left) // self.cell_size, (segment.y - self.grid_top) // self.cell_size)
+            for segment in snake_segments
+        }
 
         # Try to find a valid position (not occupied by snake)
         max_attempts = cols * rows * 2  # Prevent infinite loop
         attempts = 0
         
+        rng = self.rng
         while attempts < max_attempts:
-            col = random.randint(0, cols - 1)
-            row = random.randint(0, rows - 1)
-
-            # top left of the chosen cell
-            cell_left = self.grid_left + col * self.cell_size
-            cell_top = self.grid_top + row * self.cell_size
+            col = rng.randint(0, cols - 1)
+            row = rng.randint(0, rows - 1)
 
-            # Create a rect for this cell to check collision
-            cell_rect = pygame.Rect(cell_left, cell_top, self.cell_size, self.cell_size)
-            
-            # Check if this cell collides with any snake segment
-            collision = False
-            for segment in snake_segments:
-                if cell_rect.colliderect(segment):
-                    collision = True
-                    break
-            
             # If no collision, use this position
-            if not collision:
-                # center the apple (size) inside the cell (cell_size)
-                offset = (self.cell_size - self.size) // 2
-                self.x = cell_left + offset
-                self.y = cell_top + offset
+            if (col, row) not in occupied:
+                self._place(col, row)
                 return
             
             attempts += 1
+
+        # Unlucky sampling: pick among the remaining free cells
+        free = [(col, row) for row in range(rows) for col in range(cols) if (col, row) not in occupied]
+        if free:
+            self._place(*rng.choice(free))
+            return
         
         raise ValueError("No valid position found for apple")
 
+    # Place the apple on a flat cell index (row * cols + col), e.g. to restore a saved state
+    def place(self, cell: int) -> None:
+        self._place(cell % self.cols, cell // self.cols)
+
+    # Place the apple in the given cell
+    def _place(self, col: int, row: int) -> None:
+        self.col = col
+        self.row = row
+        self.cell = row * self.cols + col
+
+    # Pixel position, centering the apple (size) inside the cell (cell_size)
+    @property
+    def x(self) -> int:
+        return self.grid_left + self.col * self.cell_size + (self.cell_size - self.size) // 2
+
+    @property
+    def y(self) -> int:
+        return self.grid_top + self.row * self.cell_size + (self.cell_size - self.size) // 2
+
     # Draw the apple
-    def draw(self, surface: pygame.Surface, color: tuple[int, int, int]) -> None:
+    def draw(self, surface: "pygame.Surface", color: tuple[int, int, int]) -> None:
+        import pygame
+
         pygame.draw.rect(surface, color, pygame.Rect(self.x, self.y, self.size, self.size))
 
 
@@ -1,70 +1,235 @@
 import random
-import pygame
+from collections import deque
+from typing import TYPE_CHECKING
+
+# pygame is only needed for keyboard input and drawing, so it is imported lazily
+if TYPE_CHECKING:
+    import pygame
+
+# Direction codes (same order as the SnakeEnv actions)
+UP, DOWN, LEFT, RIGHT = 0, 1, 2, 3
+DIRECTION_NAMES = ("UP", "DOWN", "LEFT", "RIGHT")
+OPPOSITE_DIRECTIONS = (DOWN, UP, RIGHT, LEFT)
+
+# Coordinate offsets (col, row) of each direction code
+DIRECTION_OFFSETS = ((0, -1), (0, 1), (-1, 0), (1, 0))
+
+# FreeCells.sample: rejection sampling while 1 / SAMPLE_FREE_FRACTION of the cells are free
+SAMPLE_FREE_FRACTION = 8
+SAMPLE_ATTEMPTS = 32
+
+# Move tables per board size, see move_table
+_MOVE_TABLES: dict[tuple[int, int], tuple[list[int], ...]] = {}
+
+# Get the next cell for every cell and direction (clamped at the walls)
+def move_table(cols: int, rows: int) -> tuple[list[int], ...]:
+    table = _MOVE_TABLES.get((cols, rows))
+    if table is None:
+        table = tuple(
+            [
+                min(max(row + row_offset, 0), rows - 1) * cols + min(max(col + col_offset, 0), cols - 1)
+                for row in range(rows)
+                for col in range(cols)
+            ]
+            for col_offset, row_offset in DIRECTION_OFFSETS
+        )
+        _MOVE_TABLES[(cols, rows)] = table
+    return table
+
+class FreeCells:
+    """
+    Set of unoccupied cells with O(1) add, remove and uniform sampling.
+
+    Free cells are packed in cells[:size] and positions maps each cell index
+    (row * cols + col) to its slot, so removal swaps the last free cell in.
+    The packing order depends on the history of adds and removes, so sample()
+    only depends on which cells are free: a snake restored from a saved body
+    gets the same apples for the same random numbers. For that, block_free
+    counts the free cells of each block of about sqrt(n_cells) consecutive
+    cells, so the k-th free cell in cell order is found in O(sqrt(n_cells))
+    instead of sorting all free cells.
+    """
+    def __init__(self, n_cells: int) -> None:
+        self.cells = list(range(n_cells))
+        self.positions = list(range(n_cells))
+        self.size = n_cells
+        self.block_shift = max(0, (n_cells - 1).bit_length() // 2)
+        block_size = 1 << self.block_shift
+        self.block_free = [min(block_size, n_cells - start) for start in range(0, n_cells, block_size)]
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __contains__(self, cell: int) -> bool:
+        return self.positions[cell] < self.size
+
+    # Mark a cell as occupied
+    def remove(self, cell: int) -> None:
+        slot = self.positions[cell]
+        last = self.cells[self.size - 1]
+        self.cells[slot] = last
+        self.positions[last] = slot
+        self.cells[self.size - 1] = cell
+        self.positions[cell] = self.size - 1
+        self.size -= 1
+        self.block_free[cell >> self.block_shift] -= 1
+
+    # Mark a cell as free
+    def add(self, cell: int) -> None:
+        slot = self.positions[cell]
+        first_used = self.cells[self.size]
+        self.cells[slot] = first_used
+        self.positions[first_used] = slot
+        self.cells[self.size] = cell
+        self.positions[cell] = self.size
+        self.size += 1
+        self.block_free[cell >> self.block_shift] += 1
+
+    # Pick a random free cell (rng: the random module or any object with its randrange)
+    def sample(self, rng=random) -> int:
+        positions = self.positions
+        size = self.size
+
+        # Rejection sampling over all cells while at least 1/8 of them are free
+        if size * SAMPLE_FREE_FRACTION >= len(positions):
+            for _ in range(SAMPLE_ATTEMPTS):
+                cell = rng.randrange(len(positions))
+                if positions[cell] < size:
+                    return cell
+
+        # Nearly full board: the k-th free cell in cell order (sorting a few cells beats scanning the blocks)
+        k = rng.randrange(size)
+        if size <= len(self.block_free):
+            return sorted(self.cells[:size])[k]
+        block = 0
+        for free in self.block_free:
+            if k < free:
+                break
+            k -= free
+            block += 1
+        for cell in range(block << self.block_shift, len(positions)):
+            if positions[cell] < size:
+                if k == 0:
+                    return cell
+                k -= 1
+        raise AssertionError("free cell counts out of sync")
+
 
 class Snake:
+    """
+    Snake on a cols x rows board of integer cells.
+
+    All game logic works on flat cell indices (row * cols + col); the pixel
+    layout (grid_left, grid_top, step) is only used for drawing. Random draws
+    come from rng (the global random module by default, or e.g. a random.Random
+    instance owned by an environment).
+    """
     def __init__(
         self,
-        grid_left: int,
-        grid_top: int,
-        grid_width: int,
-        grid_height: int,
-        step: int = 50,
+        cols: int,
+        rows: int,
         initial_length: int = 5,
-        segment_size: int | None = None,
+        grid_left: int = 0,
+        grid_top: int = 0,
+        step: int = 50,
+        rng=None,
     ) -> None:
 
+        # Random number source (randrange, randint, choice like the random module)
+        self.rng = random if rng is None else rng
+
+        # Pixel layout (rendering only)
         self.grid_left = grid_left
         self.grid_top = grid_top
-        self.grid_width = grid_width
-        self.grid_height = grid_height
         self.step = step
         self.segment_size = step
 
-        # Random starting cell inside the grid
-        cols = grid_width // step
-        rows = grid_height // step
-        col_index = random.randint(0, cols - 1)
-        row_index = random.randint(0, rows - 1)
+        # Board size and move table
+        self.cols = cols
+        self.rows = rows
+        self.moves = move_table(cols, rows)
 
-        x = grid_left + col_index * step
-        y = grid_top + row_index * step
+        # Segment count per cell for O(1) collision checks
+        self.occupancy = [0] * (cols * rows)
 
-        head = pygame.Rect(x, y, self.segment_size, self.segment_size)
-        self.segments: list[pygame.Rect] = [head]
+        # Free cells kept in sync with the occupancy (used for apple spawning)
+        self.free_cells = FreeCells(cols * rows)
 
-        # Start all stacked segments
-        for _ in range(initial_length - 1):
-            self.segments.append(pygame.Rect(x, y, self.segment_size, self.segment_size))
+        # Body cell indices (row * cols + col) from head to tail
+        self.body: deque[int] = deque()
+        self.reset(initial_length)
 
-        self.direction: str | None = None
-        self.next_direction: str | None = None  # Queued direction change
+    # Start a new snake on the same board
+    def reset(self, initial_length: int = 5) -> None:
+        """
+        Clears the previous body in O(length), so the board arrays are reused
+        """
+        occupancy = self.occupancy
+        self._clear_body()
+
+        # Random starting cell inside the grid, all segments start stacked
+        start = self.rng.randrange(self.cols * self.rows)
+        self.body = deque([start] * initial_length)
+        occupancy[start] = initial_length
+        self.free_cells.remove(start)
+
+        self.direction: int | None = None  # Direction code (UP, DOWN, LEFT, RIGHT)
+        self.next_direction: int | None = None  # Queued direction change
         self.direction_locked = False  # Lock direction changes until next update
         self.alive = True
         self.should_grow = False
 
+    # Remove the body from the occupancy and free cells (the body itself is kept)
+    def _clear_body(self) -> None:
+        occupancy = self.occupancy
+        for cell in self.body:
+            if occupancy[cell]:
+                occupancy[cell] = 0
+                self.free_cells.add(cell)
+
+    # Replace the body with the given cells (head first), e.g. to restore a saved state
+    def set_body(self, cells: list[int]) -> None:
+        """
+        Runs in O(old length + new length), free cells are only touched where they changed
+        """
+        occupancy = self.occupancy
+        free_cells = self.free_cells
+        positions = free_cells.positions
+        old_body = self.body
+
+        # Move the segment counts, then only fix cells whose free state changed
+        for cell in old_body:
+            occupancy[cell] -= 1
+        for cell in cells:
+            occupancy[cell] += 1
+        for cell in old_body:
+            if occupancy[cell] == 0 and positions[cell] >= free_cells.size:
+                free_cells.add(cell)
+        for cell in cells:
+            if positions[cell] < free_cells.size:
+                free_cells.remove(cell)
+        self.body = deque(cells)
+
     # Update direction based on a key press
     def handle_key(self, key: int) -> None:
+        import pygame
+
         # If direction is already queued for this update cycle, ignore new input
         if self.direction_locked:
             return
+
+        key_directions = {
+            pygame.K_LEFT: LEFT,
+            pygame.K_RIGHT: RIGHT,
+            pygame.K_UP: UP,
+            pygame.K_DOWN: DOWN,
+        }
+        direction = key_directions.get(key)
         
         # Check against actual current direction, not queued direction
-        if key == pygame.K_LEFT:
-            if self.direction != "RIGHT":
-                self.next_direction = "LEFT"
-                self.direction_locked = True
-        elif key == pygame.K_RIGHT:
-            if self.direction != "LEFT":
-                self.next_direction = "RIGHT"
-                self.direction_locked = True
-        elif key == pygame.K_UP:
-            if self.direction != "DOWN":
-                self.next_direction = "UP"
-                self.direction_locked = True
-        elif key == pygame.K_DOWN:
-            if self.direction != "UP":
-                self.next_direction = "DOWN"
-                self.direction_locked = True
+        if direction is not None and self.direction != OPPOSITE_DIRECTIONS[direction]:
+            self.next_direction = direction
+            self.direction_locked = True
 
     # Advance the snake one step
     def update(self) -> bool:
@@ -76,41 +241,29 @@ class Snake:
             self.direction = self.next_direction
             self.next_direction = None
 
-        head = self.segments[0]
-        new_x, new_y = head.x, head.y
-
-        # Move one step in the current direction
-        if self.direction == "LEFT":
-            new_x = max(self.grid_left, head.x - self.step)
-        elif self.direction == "RIGHT":
-            new_x = min(self.grid_left + self.grid_width - head.width, head.x + self.step)
-        elif self.direction == "UP":
-            new_y = max(self.grid_top, head.y - self.step)
-        elif self.direction == "DOWN":
-            new_y = min(self.grid_top + self.grid_height - head.height, head.y + self.step)
-
-        new_head = pygame.Rect(new_x, new_y, self.segment_size, self.segment_size)
+        head = self.body[0]
+        new_head = head
+        occupancy = self.occupancy
 
         if self.direction is not None:
-            # Wall collision
-            if (
-                new_head.x < self.grid_left
-                or new_head.x > self.grid_left + self.grid_width - new_head.width
-                or new_head.y < self.grid_top
-                or new_head.y > self.grid_top + self.grid_height - new_head.height
-            ):
-                self.alive = False
-                return False
+            # Move one step in the current direction (clamped at the walls)
+            new_head = self.moves[self.direction][head]
 
-            # Self collision
-            if new_head in self.segments[1:]:
+            # Self collision (any segment except the current head)
+            if occupancy[new_head] - (new_head == head) > 0:
                 self.alive = False
                 return False
 
         # Update the snake's position
-        self.segments = [new_head] + self.segments
+        self.body.appendleft(new_head)
+        occupancy[new_head] += 1
+        if occupancy[new_head] == 1:
+            self.free_cells.remove(new_head)
         if not self.should_grow:
-            self.segments.pop()
+            tail = self.body.pop()
+            occupancy[tail] -= 1
+            if occupancy[tail] == 0:
+                self.free_cells.add(tail)
         else:
             self.should_grow = False
         
@@ -118,12 +271,44 @@ class Snake:
         self.direction_locked = False
         return True
 
+    # Check if any segment occupies the given cell
+    def is_occupied(self, col: int, row: int) -> bool:
+        if not (0 <= col < self.cols and 0 <= row < self.rows):
+            return False
+        return self.occupancy[row * self.cols + col] > 0
+
+    # Number of segments
+    def __len__(self) -> int:
+        return len(self.body)
+
+    # Head cell (col, row)
+    @property
+    def head(self) -> tuple[int, int]:
+        row, col = divmod(self.body[0], self.cols)
+        return col, row
+
+    # Segments as rects from head to tail (for drawing and existing callers)
+    @property
+    def segments(self) -> list["pygame.Rect"]:
+        import pygame
+
+        return [
+            pygame.Rect(
+                self.grid_left + (cell % self.cols) * self.step,
+                self.grid_top + (cell // self.cols) * self.step,
+                self.segment_size,
+                self.segment_size,
+            )
+            for cell in self.body
+        ]
+
     # Grow the snake by one segment
     def grow(self) -> None:
         self.should_grow = True
 
     # Draw the snake
-    def draw(self, surface: pygame.Surface, color: tuple[int, int, int]) -> None:
+    def draw(self, surface: "pygame.Surface", color: tuple[int, int, int]) -> None:
+        import pygame
+
         for segment in self.segments:
             pygame.draw.rect(surface, color, segment)
-
@@ -38,19 +38,19 @@ GRID_ROWS = GRID_H // STEP
 TOTAL_GRID_CELLS = GRID_COLS * GRID_ROWS
 
 snake = Snake(
+    cols=GRID_COLS,
+    rows=GRID_ROWS,
+    initial_length=INITIAL_LENGTH,
     grid_left=GRID_LEFT,
     grid_top=GRID_TOP,
-    grid_width=GRID_W,
-    grid_height=GRID_H,
     step=STEP,
-    initial_length=INITIAL_LENGTH,
 )
 
 apple = Apple(
+    cols=GRID_COLS,
+    rows=GRID_ROWS,
     grid_left=GRID_LEFT,
     grid_top=GRID_TOP,
-    grid_width=GRID_W,
-    grid_height=GRID_H,
     cell_size=STEP,
 )
 
@@ -63,18 +63,18 @@ large_font = pygame.font.Font(None, 48)
 def reset_game():
     global snake, apple
     snake = Snake(
+        cols=GRID_COLS,
+        rows=GRID_ROWS,
+        initial_length=INITIAL_LENGTH,
         grid_left=GRID_LEFT,
         grid_top=GRID_TOP,
-        grid_width=GRID_W,
-        grid_height=GRID_H,
         step=STEP,
-        initial_length=INITIAL_LENGTH,
     )
     apple = Apple(
+        cols=GRID_COLS,
+        rows=GRID_ROWS,
         grid_left=GRID_LEFT,
         grid_top=GRID_TOP,
-        grid_width=GRID_W,
-        grid_height=GRID_H,
         cell_size=STEP,
     )
 
@@ -200,7 +200,7 @@ while run:
 
     if not snake.update():
         # Calculate final score
-        final_score = (len(snake.segments) - INITIAL_LENGTH) * 100
+        final_score = (len(snake) - INITIAL_LENGTH) * 100
         
         # Show play again dialog
         if play_again_display(final_score):
@@ -210,14 +210,12 @@ while run:
             sys.exit()
 
     # Check if snake eats apple
-    snake_head = snake.segments[0]
-    apple_rect = pygame.Rect(apple.x, apple.y, apple.size, apple.size)
-    if snake_head.colliderect(apple_rect):
+    if snake.body[0] == apple.cell:
         snake.grow()
         # Check win condition: snake fills entire grid
-        if len(snake.segments) >= TOTAL_GRID_CELLS:
+        if len(snake) >= TOTAL_GRID_CELLS:
             # Calculate final score
-            final_score = (len(snake.segments) - INITIAL_LENGTH) * 100
+            final_score = (len(snake) - INITIAL_LENGTH) * 100
             
             # Show win dialog
             if win_display(final_score):
@@ -226,10 +224,10 @@ while run:
                 pygame.quit()
                 sys.exit()
         else:
-            apple.spawn_random(snake.segments)
+            apple.spawn_random(free_cells=snake.free_cells)
     
     # Calculate score based on snake length
-    score = (len(snake.segments) - INITIAL_LENGTH) * 100
+    score = (len(snake) - INITIAL_LENGTH) * 100
 
     # Draw background and grid outline
     screen.fill(BG)
@@ -0,0 +1,506 @@
+"""
+Asynchronous checkpoints: in-memory snapshots written by a background thread, with incremental replay-buffer chunks.
+
+load_checkpoint() resumes training from one: model, optimizer, counters, replay buffer, random streams and boards.
+"""
+import os  # for file operations
+import sys  # for system operations
+import copy  # for snapshots of mutable training state
+import json  # for checkpoint manifests
+import glob  # for finding old checkpoints
+import pickle  # for random generator states
+import random  # for the Python random state
+import shutil  # for removing chunk directories
+from collections import deque  # for snapshotting episode info buffers
+from concurrent.futures import Future, ThreadPoolExecutor  # for the background writer
+from typing import Any, Callable, Dict, List, Tuple  # for type hints
+
+import numpy as np  # for numerical operations
+import torch  # for the torch random state
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stable_baselines3 import DQN  # for loading checkpoints
+from stable_baselines3.common.callbacks import BaseCallback  # for training callbacks
+from stable_baselines3.common.save_util import save_to_zip_file  # for the Stable-Baselines3 zip format
+from stable_baselines3.common.vec_env import VecEnvWrapper  # for finding the base VecEnv
+
+# Replay buffer arrays with one row per slot (Stable-Baselines3 ReplayBuffer and SnakeReplayBuffer)
+REPLAY_FIELDS = ("observations", "next_observations", "obs_bits", "obs_dense", "actions", "rewards", "dones", "timeouts")
+
+# Directory of the replay chunks next to the checkpoints
+REPLAY_DIR = "replay"
+
+
+# Copy of everything model.save() writes, taken on the training thread
+def snapshot_model(model, policy_state: Dict[str, Any] | None = None) -> Dict[str, Any]:
+    """
+    Returns {"data", "params", "pytorch_variables"} for save_model
+
+    Tensors are cloned and mutable containers copied, so training can continue
+    while the snapshot is serialized. policy_state replaces the live policy
+    weights (e.g. with an evaluated snapshot's).
+    """
+    state_dicts, torch_variables = model._get_torch_save_params()
+    exclude = set(model._excluded_save_params()) | {name.split(".")[0] for name in state_dicts + torch_variables}
+    data = {}
+    for name, value in model.__dict__.items():
+        if name in exclude:
+            continue
+        # Buffers the training loop mutates in place
+        data[name] = value.copy() if isinstance(value, (deque, np.ndarray)) else value
+
+    params = copy.deepcopy(model.get_parameters())
+    if policy_state is not None:
+        params["policy"] = copy.deepcopy(policy_state)
+    pytorch_variables = {name: copy.deepcopy(getattr(model, name)) for name in torch_variables} or None
+    return {"data": data, "params": params, "pytorch_variables": pytorch_variables}
+
+
+# Write a snapshot as a Stable-Baselines3 zip (loadable with DQN.load)
+def save_model(path: str, snapshot: Dict[str, Any]) -> None:
+    if not path.endswith(".zip"):
+        path += ".zip"
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temporary = path + ".tmp.zip"
+    save_to_zip_file(temporary, **snapshot)
+    os.replace(temporary, path)
+
+
+class BackgroundWriter:
+    """
+    Runs write jobs in order on one background thread.
+
+    An exception raised by a job is re-raised on the training thread by the
+    next submit() or wait(), so failed checkpoints do not go unnoticed.
+    """
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="checkpoint-writer")
+        self._futures: List[Future] = []
+
+    # Queue a write job
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        self._collect()
+        future = self._executor.submit(fn, *args, **kwargs)
+        self._futures.append(future)
+        return future
+
+    # Jobs queued or running
+    @property
+    def pending(self) -> int:
+        return sum(not future.done() for future in self._futures)
+
+    # Block until all queued jobs are written
+    def wait(self) -> None:
+        futures, self._futures = self._futures, []
+        for future in futures:
+            future.result()
+
+    def close(self) -> None:
+        try:
+            self.wait()
+        finally:
+            self._executor.shutdown()
+
+    # Drop finished jobs, re-raising their errors
+    def _collect(self) -> None:
+        finished = [future for future in self._futures if future.done()]
+        self._futures = [future for future in self._futures if not future.done()]
+        for future in finished:
+            future.result()
+
+
+class ReplayChunks:
+    """
+    Stores a replay buffer as append-only chunks of the slots written since the previous chunk.
+
+    Rows are tracked by a logical index that grows by one per vectorized step
+    (slot = logical % buffer_size). Each chunk copies the logical rows from the
+    end of the previous chunk up to the current position, inclusive, because
+    the slot at pos may already hold the next observation. Writing the chunks
+    back in order rebuilds the buffer. A chunk is dropped from the manifest
+    once the ring has wrapped past all of its rows.
+    """
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.chunks: List[Dict[str, int | str]] = [] # {"name", "start", "end"} logical rows, end inclusive
+        self.end: int | None = None # Logical row of the buffer position at the last chunk
+        self.timesteps = 0 # Vectorized steps at the last chunk
+        # Chunk names continue after chunks already in the directory
+        existing = [int(entry) for entry in os.listdir(directory) if entry.isdigit()] if os.path.isdir(directory) else []
+        self.counter = max(existing, default=0) # Name of the newest chunk
+
+    # Continue after the chunks of a restored checkpoint
+    def resume(self, manifest: Dict[str, Any]) -> None:
+        """
+        Args:
+            manifest: the "replay" entry of the checkpoint the buffer was restored from
+        """
+        self.chunks = [dict(chunk) for chunk in manifest["chunks"]]
+        self.end = manifest["end"]
+        self.timesteps = manifest["timesteps"]
+
+    # Copy the rows added since the previous chunk
+    def snapshot(self, buffer, steps: int) -> Dict[str, Any]:
+        """
+        Returns a chunk for write() and the replay manifest it completes
+
+        Args:
+            steps: vectorized steps taken so far (rows added per env column)
+        """
+        size = buffer.buffer_size
+        if self.end is None:
+            # First chunk: everything the buffer holds
+            end = buffer.pos + (size if buffer.full else 0)
+            start = 0
+        else:
+            end = self.end + max(steps - self.timesteps, 0)
+            start = self.end
+            if end % size != buffer.pos:
+                # Rows were added outside training: take the whole ring
+                end = self.end + size + (buffer.pos - self.end) % size
+        start = max(start, end - size + 1)
+        segments = ring_segments(start, end, size)
+        fields = {name: np.concatenate([getattr(buffer, name)[low:high] for low, high in segments]) for name in replay_fields(buffer)}
+        finals = getattr(buffer, "final_observations", None)
+        if finals is not None:
+            # Encoded final observations of truncated episodes in these slots
+            keys = sorted(key for key in finals if (key // buffer.n_envs - start) % size <= end - start)
+            fields["final_slots"] = np.array(keys, dtype=np.int64)
+            fields["final_bits"] = np.array([finals[key][0] for key in keys], dtype=np.uint8).reshape(len(keys), buffer.obs_bits.shape[-1])
+            fields["final_dense"] = np.array([finals[key][1] for key in keys], dtype=buffer.obs_dense.dtype).reshape(len(keys), buffer.obs_dense.shape[-1])
+
+        self.counter += 1
+        chunk = {"name": f"{self.counter:06d}", "start": int(start), "end": int(end)}
+        self.chunks = [old for old in self.chunks if old["end"] + size > end + 1] + [chunk]
+        self.end = end
+        self.timesteps = steps
+        manifest = {
+            "class": type(buffer).__name__,
+            "buffer_size": size,
+            "n_envs": buffer.n_envs,
+            "pos": int(buffer.pos),
+            "full": bool(buffer.full),
+            "end": int(end),
+            "timesteps": int(steps),
+            "chunks": [dict(old) for old in self.chunks],
+        }
+        return {"name": chunk["name"], "fields": fields, "manifest": manifest}
+
+    # Write a chunk's arrays (background thread)
+    def write(self, chunk: Dict[str, Any]) -> None:
+        path = os.path.join(self.directory, chunk["name"])
+        temporary = path + ".tmp"
+        shutil.rmtree(temporary, ignore_errors=True)
+        os.makedirs(temporary)
+        for name, array in chunk["fields"].items():
+            np.save(os.path.join(temporary, f"{name}.npy"), array)
+        shutil.rmtree(path, ignore_errors=True)
+        os.rename(temporary, path)
+
+
+# Slot ranges of the logical rows start..end (inclusive) in a ring of size slots
+def ring_segments(start: int, end: int, size: int) -> List[tuple[int, int]]:
+    """
+    Returns [(low, high), ...] slot slices in row order (at most two)
+    """
+    low = start % size
+    high = low + end - start + 1
+    if high <= size:
+        return [(low, high)]
+    return [(low, size), (0, high - size)]
+
+
+# Rebuild a replay buffer from the chunks listed in a replay manifest
+def restore_replay_buffer(buffer, directory: str, manifest: Dict[str, Any]) -> None:
+    """
+    Chunks are memory-mapped and copied slice by slice into the buffer, oldest first.
+
+    Args:
+        buffer: empty buffer of the checkpointed class, size and n_envs
+        directory: replay chunk directory (checkpoints/replay)
+        manifest: the "replay" entry of a checkpoint manifest
+    """
+    size = buffer.buffer_size
+    if (size, buffer.n_envs) != (manifest["buffer_size"], manifest["n_envs"]):
+        raise ValueError(
+            f"Replay buffer has {size} slots for {buffer.n_envs} envs, "
+            f"the checkpoint has {manifest['buffer_size']} for {manifest['n_envs']}"
+        )
+    finals = getattr(buffer, "final_observations", None)
+    for chunk in manifest["chunks"]:
+        path = os.path.join(directory, chunk["name"])
+        segments = ring_segments(chunk["start"], chunk["end"], size)
+        for name in replay_fields(buffer):
+            rows = np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+            offset = 0
+            for low, high in segments:
+                getattr(buffer, name)[low:high] = rows[offset:offset + high - low]
+                offset += high - low
+        if finals is not None:
+            # Final observations of the rewritten slots come from this chunk
+            for key in [key for key in finals if (key // buffer.n_envs - chunk["start"]) % size <= chunk["end"] - chunk["start"]]:
+                del finals[key]
+            keys = np.load(os.path.join(path, "final_slots.npy"))
+            bits = np.load(os.path.join(path, "final_bits.npy"))
+            dense = np.load(os.path.join(path, "final_dense.npy"))
+            for key, key_bits, key_dense in zip(keys.tolist(), bits, dense):
+                finals[key] = (key_bits, key_dense)
+    buffer.pos = manifest["pos"]
+    buffer.full = manifest["full"]
+
+
+# Replay buffer arrays copied into chunks
+def replay_fields(buffer) -> List[str]:
+    fields = []
+    for name in REPLAY_FIELDS:
+        array = getattr(buffer, name, None)
+        if isinstance(array, np.ndarray) and array.shape[:1] == (buffer.buffer_size,):
+            fields.append(name)
+    if not fields:
+        raise ValueError(f"Cannot checkpoint replay buffers of type {type(buffer).__name__}")
+    return fields
+
+
+# Innermost VecEnv below wrappers such as VecMonitor
+def _base_vec_env(env):
+    while isinstance(env, VecEnvWrapper):
+        env = env.venv
+    return env
+
+
+# Random streams and board states needed to continue training where it stopped
+def capture_training_state(model) -> Dict[str, Any]:
+    """
+    Returns Python, NumPy and torch random states, the action space's generator
+    (epsilon-greedy exploration) and the training boards with their generators
+    """
+    state: Dict[str, Any] = {
+        "python": random.getstate(),
+        "numpy": np.random.get_state(),
+        "torch": torch.get_rng_state(),
+        "torch_cuda": torch.cuda.get_rng_state_all() if torch.cuda.is_available() else None,
+        "action_space": model.action_space.np_random.bit_generator.state,
+        "env": None,
+    }
+    env = model.get_env()
+    base = _base_vec_env(env)
+    if hasattr(base, "get_states"):
+        # SnakeVecEnv: boards and one shared generator
+        state["env"] = {"boards": base.get_states(), "rng": base.np_random.bit_generator.state}
+    else:
+        try:
+            # SnakeEnvs: get_state includes each env's random stream
+            state["env"] = {"states": env.env_method("get_state")}
+        except AttributeError:
+            pass
+    return state
+
+
+# Put back what capture_training_state saved (the env must have been reset)
+def restore_training_state(model, state: Dict[str, Any]) -> None:
+    random.setstate(state["python"])
+    np.random.set_state(state["numpy"])
+    torch.set_rng_state(state["torch"])
+    if state["torch_cuda"] is not None and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(state["torch_cuda"])
+    model.action_space.np_random.bit_generator.state = state["action_space"]
+
+    env_state = state["env"]
+    if env_state is None:
+        return
+    env = model.get_env()
+    if "boards" in env_state:
+        base = _base_vec_env(env)
+        base.set_states(env_state["boards"])
+        base.np_random.bit_generator.state = env_state["rng"]
+    else:
+        for index, board in enumerate(env_state["states"]):
+            env.env_method("set_state", board, indices=[index])
+
+
+# Checkpoint zip and manifest for a path
+def find_checkpoint(path: str, name_prefix: str = "snake_dqn") -> Tuple[str, Dict[str, Any] | None]:
+    """
+    Returns (model zip path, manifest or None for zips without one)
+
+    Args:
+        path: checkpoint .zip or .json, or a checkpoint directory (its newest checkpoint)
+    """
+    if os.path.isdir(path):
+        checkpoints = list_checkpoints(path, name_prefix)
+        if not checkpoints:
+            raise FileNotFoundError(f"No {name_prefix} checkpoints in {path}")
+        path = max(checkpoints)[1]
+    base = path[:-len(".zip")] if path.endswith(".zip") else path[:-len(".json")] if path.endswith(".json") else path
+    if not os.path.exists(base + ".json"):
+        if not os.path.exists(base + ".zip"):
+            raise FileNotFoundError(f"No checkpoint at {path}")
+        return base + ".zip", None
+    with open(base + ".json") as f:
+        manifest = json.load(f)
+    return os.path.join(os.path.dirname(base), manifest["model"]), manifest
+
+
+# Load a checkpoint to continue training
+def load_checkpoint(path: str, env, algorithm=DQN, name_prefix: str = "snake_dqn", **load_kwargs) -> Tuple[Any, Dict[str, Any] | None]:
+    """
+    Returns (model, manifest) with the model ready for learn(reset_num_timesteps=False)
+
+    Restores weights, optimizer state, counters and exploration schedule position
+    (from the zip), the replay buffer (from its chunks, memory-mapped), and the
+    random streams and boards of the training envs, so training continues from
+    the checkpointed transition. Zips without a manifest restore the model only.
+    """
+    model_path, manifest = find_checkpoint(path, name_prefix)
+    directory = os.path.dirname(model_path)
+    state = None
+    if manifest is not None and manifest.get("state"):
+        with open(os.path.join(directory, manifest["state"]), "rb") as f:
+            state = pickle.load(f)
+
+    # Keep the saved last observation only if the boards it came from are restored too
+    resume_boards = state is not None and state["env"] is not None
+    model = algorithm.load(model_path, env=env, force_reset=not resume_boards, **load_kwargs)
+    if manifest is not None and "replay" in manifest:
+        restore_replay_buffer(model.replay_buffer, os.path.join(directory, REPLAY_DIR), manifest["replay"])
+    if state is not None:
+        if resume_boards:
+            # Monitor wrappers need a reset before the boards are replaced
+            model.get_env().reset()
+        restore_training_state(model, state)
+    return model, manifest
+
+
+class AsyncCheckpointCallback(BaseCallback):
+    """
+    Saves checkpoints without pausing training for disk I/O.
+
+    Every save_freq calls (at the start of the next rollout, so the model,
+    replay buffer and boards agree) the model (weights, optimizer state and
+    training counters) is copied in memory together with the replay-buffer rows
+    added since the previous checkpoint, and a background thread writes:
+    - {name_prefix}_{timesteps}_steps.zip: Stable-Baselines3 model zip
+    - {name_prefix}_{timesteps}_steps_state.pkl: random streams and training boards
+    - replay/<chunk>/*.npy: the new replay rows (append-only)
+    - {name_prefix}_{timesteps}_steps.json: manifest with the chunks needed to
+      rebuild the replay buffer (and the metadata entries), written last
+    Only the newest keep_last checkpoints are kept; chunks no kept manifest
+    refers to are deleted.
+    """
+    def __init__(
+        self,
+        save_freq: int,
+        save_path: str,
+        name_prefix: str = "snake_dqn",
+        keep_last: int = 3,
+        save_replay_buffer: bool = True,
+        metadata: Dict[str, Any] | None = None,
+        verbose: int = 0,
+    ):
+        super().__init__(verbose)
+        self.metadata = dict(metadata or {})
+        self.save_freq = save_freq
+        self.save_path = save_path
+        self.name_prefix = name_prefix
+        self.keep_last = keep_last
+        self.save_replay_buffer = save_replay_buffer
+        self.replay_chunks = ReplayChunks(os.path.join(save_path, REPLAY_DIR))
+        self._writer: BackgroundWriter | None = None
+        self._due = False
+
+    def _init_callback(self) -> None:
+        os.makedirs(self.save_path, exist_ok=True)
+        self._writer = BackgroundWriter()
+
+    def _on_step(self) -> bool:
+        if self.save_freq > 0 and self.n_calls % self.save_freq == 0:
+            self._due = True
+        return True
+
+    # Save between rollouts, when the last transition is stored and the model trained on it
+    def _on_rollout_start(self) -> None:
+        if self._due:
+            self._due = False
+            self.save_checkpoint()
+
+    # Continue the replay chunks of the checkpoint training was resumed from
+    def resume(self, manifest: Dict[str, Any]) -> None:
+        if "replay" in manifest:
+            self.replay_chunks.resume(manifest["replay"])
+
+    def _on_training_end(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    # Snapshot the model (and new replay rows) and queue the write
+    def save_checkpoint(self) -> str:
+        """
+        Returns the path of the checkpoint zip being written
+        """
+        name = f"{self.name_prefix}_{self.num_timesteps}_steps"
+        manifest: Dict[str, Any] = {"timesteps": self.num_timesteps, "model": name + ".zip", "state": name + "_state.pkl", **self.metadata}
+        snapshot = snapshot_model(self.model)
+        state = capture_training_state(self.model)
+        chunk = None
+        replay_buffer = getattr(self.model, "replay_buffer", None)
+        if self.save_replay_buffer and replay_buffer is not None:
+            chunk = self.replay_chunks.snapshot(replay_buffer, self.num_timesteps // self.training_env.num_envs)
+            manifest["replay"] = chunk["manifest"]
+        self._writer.submit(self._write, name, snapshot, state, chunk, manifest)
+        if self.verbose >= 2:
+            print(f"Queued checkpoint {name} ({self._writer.pending} pending)")
+        return os.path.join(self.save_path, name + ".zip")
+
+    # Write one checkpoint and rotate old ones (background thread)
+    def _write(self, name: str, snapshot: Dict[str, Any], state: Dict[str, Any], chunk: Dict[str, Any] | None, manifest: Dict[str, Any]) -> None:
+        save_model(os.path.join(self.save_path, name + ".zip"), snapshot)
+        with open(os.path.join(self.save_path, manifest["state"]), "wb") as f:
+            pickle.dump(state, f)
+        if chunk is not None:
+            self.replay_chunks.write(chunk)
+        path = os.path.join(self.save_path, name + ".json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(path + ".tmp", path)
+        self._rotate()
+        if self.verbose >= 1:
+            print(f"Saved checkpoint {os.path.join(self.save_path, name)}")
+
+    # Keep the newest keep_last checkpoints and the chunks they refer to
+    def _rotate(self) -> None:
+        manifests = sorted(list_checkpoints(self.save_path, self.name_prefix), key=lambda entry: (os.path.getmtime(entry[1]), entry[0]))
+        if self.keep_last > 0:
+            for _, path in manifests[:-self.keep_last]:
+                for stale in (path, path[:-len(".json")] + ".zip", path[:-len(".json")] + "_state.pkl"):
+                    if os.path.exists(stale):
+                        os.remove(stale)
+            manifests = manifests[-self.keep_last:]
+
+        # Chunks only leave manifests from the front, so unreferenced chunks are never needed again
+        referenced = set()
+        for _, path in manifests:
+            with open(path) as f:
+                replay = json.load(f).get("replay")
+            if replay is not None:
+                referenced.update(chunk["name"] for chunk in replay["chunks"])
+        directory = self.replay_chunks.directory
+        if os.path.isdir(directory):
+            for entry in os.listdir(directory):
+                if entry not in referenced:
+                    shutil.rmtree(os.path.join(directory, entry), ignore_errors=True)
+
+
+# Checkpoint manifests in a directory
+def list_checkpoints(directory: str, name_prefix: str = "snake_dqn") -> List[tuple[int, str]]:
+    """
+    Returns [(timesteps, manifest path), ...] in no particular order
+    """
+    checkpoints = []
+    for path in glob.glob(os.path.join(directory, f"{name_prefix}_*_steps.json")):
+        steps = os.path.basename(path)[len(name_prefix) + 1:-len("_steps.json")]
+        if steps.isdigit():
+            checkpoints.append((int(steps), path))
+    return checkpoints
@@ -0,0 +1,408 @@
+"""
+Demonstration datasets: play SnakeEnv episodes with any agent across processes and
+store the transitions in chunked, memory-mapped NumPy files.
+"""
+import os  # for file operations
+import sys  # for system operations
+import json  # for the dataset description
+import time  # for throughput measurement
+import argparse  # for command line arguments
+import multiprocessing as mp  # for generator processes
+from concurrent.futures import ProcessPoolExecutor  # for generator processes
+from typing import Any, Dict, List, Tuple  # for type hints
+
+import numpy as np  # for numerical operations
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rl.snake_env import SnakeEnv, obs_type_of  # for the environment and model observation types
+
+# Dataset description file and layout version
+META_FILE = "meta.json"
+DATASET_VERSION = 1
+
+# Per-episode index (start and length are rows of the concatenated chunks)
+EPISODE_DTYPE = np.dtype([
+    ("start", np.int64),
+    ("length", np.int64),
+    ("score", np.int64),
+    ("reward", np.float64),
+    ("truncated", np.bool_),
+])
+
+# Agents that are not model paths
+AGENT_NAMES = ("random", "solver", "mcts")
+
+
+# One row per step: observation, action taken, reward received and whether the episode ended
+def transition_dtype(obs_shape: Tuple[int, ...], obs_dtype) -> np.dtype:
+    return np.dtype([
+        ("obs", obs_dtype, obs_shape),
+        ("action", np.uint8),
+        ("reward", np.float32),
+        ("done", np.bool_),
+    ])
+
+
+class RandomAgent:
+    """
+    Uniformly random actions from a seeded generator.
+    """
+    def __init__(self, seed: int | None = None):
+        self.rng = np.random.default_rng(seed)
+
+    def act(self, env: SnakeEnv) -> int:
+        return int(self.rng.integers(4))
+
+    def close(self) -> None:
+        pass
+
+
+class ChunkWriter:
+    """
+    Buffers transitions in memory and writes every chunk_size rows to its own .npy file,
+    so a generator never holds more than one chunk.
+    """
+    def __init__(self, directory: str, prefix: str, dtype: np.dtype, chunk_size: int):
+        self.directory = directory
+        self.prefix = prefix
+        self.buffer = np.zeros(chunk_size, dtype=dtype)
+        self.rows = 0
+        self.chunks: List[Dict[str, Any]] = []
+
+    # Append one transition
+    def add(self, obs: np.ndarray, action: int, reward: float, done: bool) -> None:
+        row = self.buffer[self.rows]
+        row["obs"] = obs
+        row["action"] = action
+        row["reward"] = reward
+        row["done"] = done
+        self.rows += 1
+        if self.rows == len(self.buffer):
+            self.flush()
+
+    # Write the buffered rows as the next chunk
+    def flush(self) -> None:
+        if self.rows == 0:
+            return
+        name = f"{self.prefix}_{len(self.chunks):05d}.npy"
+        np.save(os.path.join(self.directory, name), self.buffer[:self.rows])
+        self.chunks.append({"file": name, "rows": self.rows})
+        self.rows = 0
+
+
+# Build the agent that plays the demonstrations
+def make_agent(agent: str, env: SnakeEnv, seed: int | None, agent_kwargs: Dict[str, Any]):
+    """
+    Returns (agent with act(env), policy with predict(obs)); exactly one is not None.
+    agent is "random", "solver", "mcts" or a model path (.zip or .npz).
+    """
+    if agent == "random":
+        return RandomAgent(seed), None
+    if agent == "solver":
+        from rl.solver import SolverAgent
+        return SolverAgent(env, **agent_kwargs), None
+    if agent == "mcts":
+        from rl.mcts import MCTSAgent
+        return MCTSAgent(env, seed=seed, **agent_kwargs), None
+
+    from rl.numpy_policy import load_policy
+    return None, load_policy(agent, device="cpu")
+
+
+# Play episodes with one agent and write their transitions (runs in a generator process)
+def _generate_worker(
+    worker: int,
+    directory: str,
+    agent: str,
+    agent_kwargs: Dict[str, Any],
+    env_kwargs: Dict[str, Any],
+    n_episodes: int,
+    seed: int,
+    chunk_size: int,
+) -> Dict[str, Any]:
+    """
+    Returns the worker's chunks, episodes (starts relative to its own rows) and terminal observations
+    """
+    env = SnakeEnv(**env_kwargs)
+    player, policy = make_agent(agent, env, seed + worker, agent_kwargs)
+    writer = ChunkWriter(directory, f"chunk_w{worker:02d}", transition_dtype(env.observation_space.shape, env.observation_space.dtype), chunk_size)
+    episodes = np.zeros(n_episodes, dtype=EPISODE_DTYPE)
+    terminal_obs = np.zeros((n_episodes, *env.observation_space.shape), dtype=env.observation_space.dtype)
+
+    rows = 0
+    obs, info = env.reset(seed=seed + worker)
+    try:
+        for episode in range(n_episodes):
+            if episode:
+                obs, info = env.reset()
+            start = rows
+            total_reward = 0.0
+            terminated = truncated = False
+            while not (terminated or truncated):
+                if policy is not None:
+                    action, _ = policy.predict(obs, deterministic=True)
+                    action = int(action)
+                else:
+                    action = player.act(env)
+                next_obs, reward, terminated, truncated, info = env.step(action)
+                writer.add(obs, action, reward, terminated or truncated)
+                obs = next_obs
+                total_reward += reward
+                rows += 1
+            episodes[episode] = (start, rows - start, info["score"], total_reward, truncated and not terminated)
+            terminal_obs[episode] = obs
+        writer.flush()
+    finally:
+        if player is not None:
+            player.close()
+        env.close()
+    return {"chunks": writer.chunks, "episodes": episodes, "terminal_obs": terminal_obs}
+
+
+# Generate a demonstration dataset
+def generate_dataset(
+    directory: str,
+    agent: str,
+    n_episodes: int,
+    workers: int = 1,
+    env_kwargs: Dict[str, Any] | None = None,
+    agent_kwargs: Dict[str, Any] | None = None,
+    seed: int = 0,
+    chunk_size: int = 100_000,
+) -> Dict[str, Any]:
+    """
+    Returns the dataset metadata (also written to directory/meta.json)
+
+    Worker i plays its share of the episodes on an env seeded with seed + i and writes
+    its own chunks; the chunks are then listed in worker order and the episode index
+    is rebased onto the concatenated rows.
+    """
+    env_kwargs = dict(env_kwargs or {})
+    agent_kwargs = dict(agent_kwargs or {})
+    if agent not in AGENT_NAMES:
+        from rl.numpy_policy import load_policy
+
+        # Observations must be the ones the model was trained on
+        model_obs_type = obs_type_of(load_policy(agent, device="cpu").observation_space)
+        if env_kwargs.setdefault("obs_type", model_obs_type) != model_obs_type:
+            raise ValueError(f"{agent} expects {model_obs_type} observations, not {env_kwargs['obs_type']}")
+
+    os.makedirs(directory, exist_ok=True)
+    if os.path.exists(os.path.join(directory, META_FILE)):
+        raise FileExistsError(f"{directory} already contains a dataset")
+
+    workers = max(1, min(workers, n_episodes))
+    shares = [(n_episodes + i) // workers for i in range(workers)]
+    jobs = [(i, directory, agent, agent_kwargs, env_kwargs, share, seed, chunk_size) for i, share in enumerate(shares)]
+    if workers == 1:
+        results = [_generate_worker(*jobs[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn")) as executor:
+            results = list(executor.map(_generate_worker, *zip(*jobs)))
+
+    # Rebase every worker's episodes onto the concatenated rows
+    chunks = []
+    episodes = []
+    offset = 0
+    for result in results:
+        worker_episodes = result["episodes"].copy()
+        worker_episodes["start"] += offset
+        episodes.append(worker_episodes)
+        chunks.extend(result["chunks"])
+        offset += sum(chunk["rows"] for chunk in result["chunks"])
+    np.save(os.path.join(directory, "episodes.npy"), np.concatenate(episodes))
+    np.save(os.path.join(directory, "terminal_obs.npy"), np.concatenate([result["terminal_obs"] for result in results]))
+
+    env = SnakeEnv(**env_kwargs)
+    metadata = {
+        "version": DATASET_VERSION,
+        "agent": agent if agent in AGENT_NAMES else os.path.basename(agent),
+        "agent_kwargs": agent_kwargs,
+        "env_kwargs": env_kwargs,
+        "obs_shape": list(env.observation_space.shape),
+        "obs_dtype": np.dtype(env.observation_space.dtype).name,
+        "seed": seed,
+        "transitions": offset,
+        "episodes": n_episodes,
+        "chunks": chunks,
+    }
+    env.close()
+    with open(os.path.join(directory, META_FILE), "w") as f:
+        json.dump(metadata, f, indent=2)
+    return metadata
+
+
+class DemoDataset:
+    """
+    Read-only view of a demonstration dataset with the chunks memory-mapped.
+
+    Rows are numbered across the chunks in the order of meta.json. The next
+    observation of a row is the following row, except for the last row of an
+    episode whose next observation is the stored terminal observation. Only the
+    rows that are gathered are read from disk.
+    """
+    def __init__(self, directory: str):
+        with open(os.path.join(directory, META_FILE)) as f:
+            self.metadata = json.load(f)
+        self.directory = directory
+        self.obs_shape = tuple(self.metadata["obs_shape"])
+        self.obs_dtype = np.dtype(self.metadata["obs_dtype"])
+        self.chunks = [np.load(os.path.join(directory, chunk["file"]), mmap_mode="r") for chunk in self.metadata["chunks"]]
+        self.episodes = np.load(os.path.join(directory, "episodes.npy"))
+        self.terminal_obs = np.load(os.path.join(directory, "terminal_obs.npy"), mmap_mode="r")
+
+        # First row of every chunk (plus the total) and last row of every episode
+        self._chunk_starts = np.concatenate([[0], np.cumsum([len(chunk) for chunk in self.chunks])])
+        self._episode_ends = self.episodes["start"] + self.episodes["length"] - 1
+
+    def __len__(self) -> int:
+        return int(self._chunk_starts[-1])
+
+    # Gather rows by index from the chunks
+    def rows(self, indices: np.ndarray) -> np.ndarray:
+        """
+        Returns the transition records (obs, action, reward, done) of the given rows
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        chunk_ids = np.searchsorted(self._chunk_starts, indices, side="right") - 1
+        out = np.empty(len(indices), dtype=self.chunks[0].dtype)
+        for chunk_id in np.unique(chunk_ids):
+            mask = chunk_ids == chunk_id
+            out[mask] = self.chunks[chunk_id][indices[mask] - self._chunk_starts[chunk_id]]
+        return out
+
+    # Transitions of the given rows as arrays
+    def transitions(self, indices: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Returns obs, actions, rewards, next_obs, dones (episode ended) and timeouts
+        (episode ended by the food timeout, so the next state still has a value)
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        records = self.rows(indices)
+
+        # Last rows of their episode take the terminal observation instead of the next row
+        episode_ids = np.searchsorted(self.episodes["start"], indices, side="right") - 1
+        last = indices == self._episode_ends[episode_ids]
+        next_indices = np.minimum(indices + 1, len(self) - 1)
+        next_obs = self.rows(next_indices)["obs"]
+        if last.any():
+            next_obs[last] = self.terminal_obs[episode_ids[last]]
+
+        return {
+            "obs": records["obs"],
+            "actions": records["action"].astype(np.int64),
+            "rewards": records["reward"],
+            "next_obs": next_obs,
+            "dones": records["done"],
+            "timeouts": last & self.episodes["truncated"][episode_ids],
+        }
+
+    # Random minibatch of transitions
+    def sample(self, batch_size: int, rng: np.random.Generator | None = None) -> Dict[str, np.ndarray]:
+        rng = rng or np.random.default_rng()
+        return self.transitions(np.sort(rng.integers(len(self), size=batch_size)))
+
+    # Copy transitions into a Stable-Baselines3 replay buffer
+    def fill_replay_buffer(self, buffer, max_transitions: int | None = None, block_size: int = 65_536) -> int:
+        """
+        Returns the number of transitions added. The first rows of the dataset are used,
+        up to max_transitions and the buffer capacity, split into one contiguous run per
+        buffer env column. Plain ReplayBuffers are written with array assignments, other
+        buffers (e.g. optimize_memory_usage) through buffer.add.
+
+        Buffers filled through add keep a transition's next observation in the
+        following slot, which the first live transition overwrites. So the last
+        row of each column, unless it ends its episode, is stored as a timeout with
+        its real next observation in buffers that keep final observations
+        (SnakeReplayBuffer), and as done (no bootstrapping) in the others.
+        """
+        if tuple(buffer.obs_shape) != self.obs_shape:
+            raise ValueError(f"Replay buffer observations {tuple(buffer.obs_shape)} do not match the dataset's {self.obs_shape}")
+        n_envs = buffer.n_envs
+        per_column = min(len(self), max_transitions or len(self)) // n_envs
+        per_column = min(per_column, buffer.buffer_size)
+        vectorized = getattr(buffer, "next_observations", None) is not None and not buffer.optimize_memory_usage
+
+        for block_start in range(0, per_column, block_size):
+            block = np.arange(block_start, min(block_start + block_size, per_column))
+            positions = (buffer.pos + block) % buffer.buffer_size
+
+            # Column j holds rows j * per_column, j * per_column + 1, ...
+            batch = self.transitions((block[:, None] + np.arange(n_envs)[None, :] * per_column).ravel())
+            batch = {key: value.reshape(len(block), n_envs, *value.shape[1:]) for key, value in batch.items()}
+            if vectorized:
+                buffer.observations[positions] = batch["obs"]
+                buffer.next_observations[positions] = batch["next_obs"]
+                buffer.actions[positions] = batch["actions"].reshape(len(block), n_envs, -1)
+                buffer.rewards[positions] = batch["rewards"]
+                buffer.dones[positions] = batch["dones"]
+                buffer.timeouts[positions] = batch["timeouts"]
+            else:
+                # The column runs stop mid-episode here (see above)
+                if block[-1] == per_column - 1:
+                    open_ends = ~batch["dones"][-1]
+                    if hasattr(buffer, "final_observations"):
+                        batch["timeouts"][-1] |= open_ends
+                    else:
+                        batch["dones"][-1] |= open_ends
+                for i in range(len(block)):
+                    infos = [{"TimeLimit.truncated": bool(timeout)} for timeout in batch["timeouts"][i]]
+                    buffer.add(batch["obs"][i], batch["next_obs"][i], batch["actions"][i], batch["rewards"][i], batch["dones"][i], infos)
+
+        if vectorized and per_column:
+            buffer.full = buffer.full or buffer.pos + per_column >= buffer.buffer_size
+            buffer.pos = (buffer.pos + per_column) % buffer.buffer_size
+        return per_column * n_envs
+
+    # Summary of the stored episodes
+    def summary(self) -> Dict[str, float]:
+        episodes = self.episodes
+        return {
+            "transitions": len(self),
+            "episodes": len(episodes),
+            "score_mean": float(episodes["score"].mean()) if len(episodes) else 0.0,
+            "reward_mean": float(episodes["reward"].mean()) if len(episodes) else 0.0,
+            "length_mean": float(episodes["length"].mean()) if len(episodes) else 0.0,
+            "truncated": float(episodes["truncated"].mean()) if len(episodes) else 0.0,
+        }
+
+
+# Main function to generate a dataset from the command line
+def main():
+    # Set up argument parser
+    parser = argparse.ArgumentParser(description="Generate Snake demonstration datasets")
+    parser.add_argument("--agent", type=str, default="solver", help="random, solver, mcts or a model path (.zip or .npz)")
+    parser.add_argument("--episodes", type=int, default=100, help="Number of episodes")
+    parser.add_argument("--workers", type=int, default=1, help="Generator processes")
+    parser.add_argument("--output", type=str, required=True, help="Dataset directory (must not contain a dataset)")
+    parser.add_argument("--obs-type", choices=["features", "grid"], default=None, help="Observation type (default: the model's, else features)")
+    parser.add_argument("--cols", type=int, default=None, help="Board width in cells (default: the training board)")
+    parser.add_argument("--rows", type=int, default=None, help="Board height in cells (default: the training board)")
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="Transitions per chunk file")
+    parser.add_argument("--budget", type=int, default=200, help="MCTS: simulations per move")
+    parser.add_argument("--seed", type=int, default=0, help="Base seed (worker i uses seed + i)")
+    args = parser.parse_args()
+
+    # SnakeEnv defaults are the training board
+    env_kwargs: Dict[str, Any] = {}
+    if args.cols is not None or args.rows is not None:
+        env_kwargs.update(cols=args.cols, rows=args.rows)
+    if args.obs_type is not None:
+        env_kwargs["obs_type"] = args.obs_type
+    agent_kwargs = {"budget": args.budget} if args.agent == "mcts" else {}
+
+    start = time.perf_counter()
+    metadata = generate_dataset(args.output, args.agent, args.episodes, args.workers, env_kwargs, agent_kwargs, args.seed, args.chunk_size)
+    elapsed = time.perf_counter() - start
+
+    summary = DemoDataset(args.output).summary()
+    size = sum(os.path.getsize(os.path.join(args.output, name)) for name in os.listdir(args.output))
+    print(f"Wrote {metadata['transitions']} transitions from {metadata['episodes']} episodes to {args.output} "
+          f"({len(metadata['chunks'])} chunks, {size / 2**20:.1f} MiB) in {elapsed:.1f}s ({metadata['transitions'] / elapsed:.0f} transitions/s)")
+    print(f"Score: mean={summary['score_mean']:.1f}, episode length: mean={summary['length_mean']:.1f}, truncated: {summary['truncated']:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Episode statistics and a lockstep runner for SnakeEnvs that do not need Stable-Baselines3.
+"""
+from typing import Any, Dict, List, Sequence  # for type hints
+
+import numpy as np  # for numerical operations
+
+# Percentiles reported for every episode statistic
+PERCENTILES = (5, 25, 75, 95)
+
+
+class LockstepEnvs:
+    """
+    Steps several SnakeEnvs together with the VecEnv calling convention.
+
+    reset() returns stacked observations and step(actions) returns
+    (observations, rewards, dones, infos). Finished boards are reset
+    automatically and their last observation is stored in
+    info["terminal_observation"], like Stable-Baselines3's DummyVecEnv,
+    so run_episodes works without importing Stable-Baselines3 or torch.
+    """
+    def __init__(self, envs: Sequence, seed: int | None = None):
+        self.envs = list(envs)
+        self.num_envs = len(self.envs)
+        self.seed_value = seed
+
+    # Reset all boards (board i is seeded with seed + i)
+    def reset(self) -> np.ndarray:
+        seeds = [None] * self.num_envs if self.seed_value is None else [self.seed_value + i for i in range(self.num_envs)]
+        return np.stack([env.reset(seed=seed)[0] for env, seed in zip(self.envs, seeds)])
+
+    # Step all boards with one action each
+    def step(self, actions: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, List[Dict[str, Any]]]:
+        observations = []
+        rewards = np.zeros(self.num_envs, dtype=np.float32)
+        dones = np.zeros(self.num_envs, dtype=bool)
+        infos = []
+        for i, (env, action) in enumerate(zip(self.envs, actions)):
+            obs, rewards[i], terminated, truncated, info = env.step(int(action))
+            dones[i] = terminated or truncated
+            if dones[i]:
+                info = dict(info, terminal_observation=obs)
+                info["TimeLimit.truncated"] = truncated and not terminated
+                obs, _ = env.reset()
+            observations.append(obs)
+            infos.append(info)
+        return np.stack(observations), rewards, dones, infos
+
+    def close(self) -> None:
+        for env in self.envs:
+            env.close()
+
+
+# Play episodes on all boards at once with batched policy inference
+def run_episodes(policy, env, n_episodes: int, deterministic: bool = True) -> Dict[str, np.ndarray]:
+    """
+    Returns per-episode arrays: reward, score, length (snake length), steps, died
+
+    Args:
+        policy: anything with predict(obs, deterministic) such as a DQN model or its policy
+        env: vectorized environment that auto-resets finished boards (a VecEnv or LockstepEnvs)
+        n_episodes: number of episodes to play, spread evenly over the boards
+    """
+    num_envs = env.num_envs
+
+    # Fixed number of episodes per board so short episodes are not over-represented
+    targets = np.array([(n_episodes + i) // num_envs for i in range(num_envs)])
+    counts = np.zeros(num_envs, dtype=np.int64)
+    returns = np.zeros(num_envs, dtype=np.float64)
+    steps = np.zeros(num_envs, dtype=np.int64)
+    episodes: Dict[str, list] = {"reward": [], "score": [], "length": [], "steps": [], "died": []}
+
+    obs = env.reset()
+    while (counts < targets).any():
+        # One forward pass for all live boards
+        actions, _ = policy.predict(obs, deterministic=deterministic)
+        obs, rewards, dones, infos = env.step(actions)
+        returns += rewards
+        steps += 1
+
+        for i in np.flatnonzero(dones):
+            if counts[i] < targets[i]:
+                info = infos[i]
+                episodes["reward"].append(returns[i])
+                episodes["score"].append(info["score"])
+                episodes["length"].append(info["snake_length"])
+                episodes["steps"].append(steps[i])
+                # Death is the only termination with a negative reward (a win gives +100)
+                episodes["died"].append(not info.get("TimeLimit.truncated", False) and rewards[i] < 0)
+                counts[i] += 1
+            returns[i] = 0.0
+            steps[i] = 0
+
+    return {key: np.array(values) for key, values in episodes.items()}
+
+
+# Summarize per-episode arrays
+def summarize(episodes: Dict[str, np.ndarray]) -> Dict[str, float]:
+    """
+    Returns mean, median and percentiles of reward, score, length, steps and steps_to_death
+    """
+    stats: Dict[str, float] = {"episodes": float(len(episodes["reward"]))}
+    columns = {key: episodes[key] for key in ("reward", "score", "length", "steps")}
+    columns["steps_to_death"] = episodes["steps"][episodes["died"]]
+
+    for name, values in columns.items():
+        if len(values) == 0:
+            continue
+        stats[f"{name}_mean"] = float(np.mean(values))
+        stats[f"{name}_median"] = float(np.median(values))
+        for q, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+            stats[f"{name}_p{q}"] = float(value)
+
+    stats["death_rate"] = float(np.mean(episodes["died"])) if len(episodes["died"]) else 0.0
+    return stats
@@ -0,0 +1,233 @@
+"""
+Batched evaluation of Snake agents across many boards at once.
+"""
+import os  # for file operations
+import sys  # for system operations
+import copy  # for policy snapshots
+import random  # for random base seeds
+import argparse  # for command line arguments
+import multiprocessing as mp  # for the asynchronous evaluation process
+from concurrent.futures import Future, ProcessPoolExecutor  # for asynchronous evaluation
+from typing import Any, Dict  # for type hints
+
+import numpy as np  # for numerical operations
+import torch  # for inference mode and thread settings
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stable_baselines3.common.callbacks import BaseCallback  # for training callbacks
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv, VecEnv  # for parallel environments
+from rl import SnakeEnv  # for SnakeEnv environment
+from rl.vec_env import SnakeVecEnv  # for batched environment
+from rl.snake_env import obs_type_of  # for matching the model's observation type
+from rl.episodes import run_episodes, summarize  # for episode statistics
+from rl.checkpoint import BackgroundWriter, save_model, snapshot_model  # for saving best models in the background
+
+# Create a factory for one evaluation environment
+def _make_snake_env(env_kwargs: Dict[str, Any]):
+    def _init():
+        # Each env draws from its own generator, seeded by env.seed(base_seed) (board i gets base_seed + i)
+        return SnakeEnv(**env_kwargs)
+    return _init
+
+
+# Create a vectorized evaluation environment
+def make_eval_env(
+    num_envs: int,
+    backend: str = "numpy",
+    seed: int | None = None,
+    env_kwargs: Dict[str, Any] | None = None,
+) -> VecEnv:
+    """
+    Returns a VecEnv with num_envs boards
+
+    Args:
+        backend: numpy (SnakeVecEnv), dummy (SnakeEnvs in this process) or subproc (one process per SnakeEnv)
+    """
+    env_kwargs = env_kwargs or {}
+    if backend == "numpy":
+        return SnakeVecEnv(num_envs, seed=seed, **env_kwargs)
+
+    base_seed = seed if seed is not None else random.randrange(2**31)
+    env_fns = [_make_snake_env(env_kwargs) for _ in range(num_envs)]
+    env = SubprocVecEnv(env_fns) if backend == "subproc" else DummyVecEnv(env_fns)
+    env.seed(base_seed)
+    return env
+
+
+# Evaluate a policy on a fresh vectorized environment
+def evaluate_batched(
+    policy,
+    n_episodes: int = 100,
+    num_envs: int = 16,
+    backend: str = "numpy",
+    seed: int | None = None,
+    env_kwargs: Dict[str, Any] | None = None,
+    deterministic: bool = True,
+) -> Dict[str, float]:
+    """
+    Returns summary statistics (see summarize) over n_episodes
+    """
+    env = make_eval_env(min(num_envs, n_episodes), backend, seed, env_kwargs)
+    try:
+        with torch.inference_mode():
+            return summarize(run_episodes(policy, env, n_episodes, deterministic))
+    finally:
+        env.close()
+
+
+# Entry point of the asynchronous evaluation process
+def _evaluate_snapshot(policy, kwargs: Dict[str, Any]) -> Dict[str, float]:
+    # Leave the CPU cores to the training process
+    torch.set_num_threads(1)
+    return evaluate_batched(policy, **kwargs)
+
+
+class BatchedEvalCallback(BaseCallback):
+    """
+    Periodically evaluates the agent on many boards at once.
+
+    With asynchronous=True, a CPU copy of the policy is evaluated in a separate
+    process while training continues; results are logged when they arrive.
+    A new evaluation is skipped if the previous one is still running.
+    The best policy (by mean reward) is saved to best_model_save_path.
+    """
+    def __init__(
+        self,
+        eval_freq: int,
+        n_eval_episodes: int = 32,
+        num_envs: int = 16,
+        backend: str = "numpy",
+        asynchronous: bool = True,
+        best_model_save_path: str | None = None,
+        log_path: str | None = None,
+        seed: int = 0,
+        env_kwargs: Dict[str, Any] | None = None,
+        verbose: int = 1,
+    ):
+        super().__init__(verbose)
+        self.eval_freq = eval_freq
+        self.asynchronous = asynchronous
+        self.best_model_save_path = best_model_save_path
+        self.log_path = log_path
+        self.eval_kwargs = dict(
+            n_episodes=n_eval_episodes,
+            num_envs=num_envs,
+            backend=backend,
+            seed=seed,  # Same boards every evaluation so results are comparable
+            env_kwargs=env_kwargs,
+        )
+        self.best_mean_reward = -np.inf
+        self.evaluations: Dict[str, list] = {"timesteps": [], "results": [], "ep_lengths": [], "scores": []}
+        self._executor: ProcessPoolExecutor | None = None
+        self._pending: tuple[int, Any, Future] | None = None
+        self._writer: BackgroundWriter | None = None
+
+    def _init_callback(self) -> None:
+        for path in (self.best_model_save_path, self.log_path):
+            if path is not None:
+                os.makedirs(path, exist_ok=True)
+        if self.asynchronous:
+            self._executor = ProcessPoolExecutor(max_workers=1, mp_context=mp.get_context("spawn"))
+        self._writer = BackgroundWriter()
+
+    def _on_step(self) -> bool:
+        # Log the asynchronous result if it finished
+        if self._pending is not None and self._pending[2].done():
+            self._finish_pending()
+
+        if self.eval_freq > 0 and self.n_calls % self.eval_freq == 0:
+            if not self.asynchronous:
+                self._record(self.num_timesteps, evaluate_batched(self.model.policy, **self.eval_kwargs), None)
+            elif self._pending is None:
+                # Evaluate a CPU snapshot so training can keep updating the live policy
+                snapshot = copy.deepcopy(self.model.policy).to("cpu")
+                future = self._executor.submit(_evaluate_snapshot, snapshot, self.eval_kwargs)
+                self._pending = (self.num_timesteps, snapshot, future)
+        return True
+
+    def _on_training_end(self) -> None:
+        if self._pending is not None:
+            self._finish_pending()
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def _finish_pending(self) -> None:
+        timesteps, snapshot, future = self._pending
+        self._pending = None
+        self._record(timesteps, future.result(), snapshot)
+
+    # Continue the evaluation history and best reward of a resumed run
+    def load_history(self, timesteps: int) -> None:
+        """
+        Args:
+            timesteps: checkpoint the run resumed from (later evaluations are dropped)
+        """
+        path = os.path.join(self.log_path, "evaluations.npz") if self.log_path is not None else None
+        if path is None or not os.path.exists(path):
+            return
+        with np.load(path) as data:
+            keep = data["timesteps"] <= timesteps
+            self.evaluations = {key: data[key][keep].tolist() for key in self.evaluations}
+        if self.evaluations["results"]:
+            self.best_mean_reward = max(self.evaluations["results"])
+
+    # Log one evaluation and save the model if it is the best so far
+    def _record(self, timesteps: int, stats: Dict[str, float], snapshot) -> None:
+        for key, value in stats.items():
+            self.logger.record(f"eval/{key}", value)
+        self.logger.record("eval/timesteps", timesteps)
+
+        if self.verbose >= 1:
+            print(
+                f"Eval at {timesteps} steps: reward={stats['reward_mean']:.2f}, "
+                f"score={stats['score_mean']:.1f} (median {stats['score_median']:.0f}), "
+                f"steps={stats['steps_mean']:.1f}"
+            )
+
+        if self.log_path is not None:
+            self.evaluations["timesteps"].append(timesteps)
+            self.evaluations["results"].append(stats["reward_mean"])
+            self.evaluations["ep_lengths"].append(stats["steps_mean"])
+            self.evaluations["scores"].append(stats["score_mean"])
+            np.savez(os.path.join(self.log_path, "evaluations"), **self.evaluations)
+
+        if stats["reward_mean"] > self.best_mean_reward:
+            self.best_mean_reward = stats["reward_mean"]
+            if self.best_model_save_path is not None:
+                self._save_best(snapshot)
+
+    # Save the model with the evaluated weights (the snapshot if evaluated asynchronously) in the background
+    def _save_best(self, snapshot) -> None:
+        path = os.path.join(self.best_model_save_path, "best_model")
+        model_snapshot = snapshot_model(self.model, None if snapshot is None else snapshot.state_dict())
+        self._writer.submit(save_model, path, model_snapshot)
+
+
+# Main function to evaluate a saved model from the command line
+def main():
+    from rl.numpy_policy import load_policy
+
+    # Set up argument parser
+    parser = argparse.ArgumentParser(description="Batched evaluation of a trained Snake model")
+    parser.add_argument("--model", type=str, required=True, help="Path to trained model (.zip or exported .npz)")
+    parser.add_argument("--episodes", type=int, default=100, help="Number of episodes")
+    parser.add_argument("--num-envs", type=int, default=16, help="Boards played at once")
+    parser.add_argument("--backend", choices=["numpy", "dummy", "subproc"], default="numpy", help="Environment backend")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed")
+    args = parser.parse_args()
+
+    model = load_policy(args.model)
+    env_kwargs = {"obs_type": obs_type_of(model.observation_space)}
+    stats = evaluate_batched(model, args.episodes, args.num_envs, args.backend, args.seed, env_kwargs)
+    for key, value in stats.items():
+        print(f"{key}: {value:.3f}")
+
+
+if __name__ == "__main__":
+    main()
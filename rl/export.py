@@ -0,0 +1,121 @@
+"""
+Export the Q-network of a trained DQN model to a compact NumPy file for rl/numpy_policy.py.
+"""
+import os  # for file operations
+import sys  # for system operations
+import json  # for the layer description
+import argparse  # for command line arguments
+from typing import Any, Dict, List, Tuple  # for type hints
+
+import numpy as np  # for numerical operations
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from torch import nn  # for layer types
+from stable_baselines3 import DQN  # for loading trained models
+from stable_baselines3.common.preprocessing import is_image_space  # for observation preprocessing
+
+# Activation modules supported by the NumPy runtime
+ACTIVATION_NAMES = {nn.ReLU: "relu", nn.Tanh: "tanh"}
+
+
+# Describe the Q-network as a flat list of layers in forward order
+def describe_q_net(q_net: nn.Module) -> Tuple[List[Dict[str, Any]], Dict[str, np.ndarray]]:
+    """
+    Returns (layers, arrays): layer descriptions referencing float32 weight arrays by name
+
+    The features extractor (Flatten, NatureCNN-style or GridCNN) and the Q-value MLP
+    register their layers in forward order, so the leaf modules are exported in order.
+    """
+    layers: List[Dict[str, Any]] = []
+    arrays: Dict[str, np.ndarray] = {}
+
+    # Store a parameter under a new name
+    def add_array(tensor) -> str | None:
+        if tensor is None:
+            return None
+        name = f"param_{len(arrays)}"
+        arrays[name] = tensor.detach().cpu().numpy().astype(np.float32)
+        return name
+
+    for module in q_net.modules():
+        if isinstance(module, nn.Linear):
+            layers.append({"type": "linear", "weight": add_array(module.weight), "bias": add_array(module.bias)})
+        elif isinstance(module, nn.Conv2d):
+            if module.stride[0] != module.stride[1] or module.padding[0] != module.padding[1] or module.groups != 1 or module.dilation != (1, 1):
+                raise ValueError(f"Unsupported convolution: {module}")
+            layers.append({
+                "type": "conv2d",
+                "weight": add_array(module.weight),
+                "bias": add_array(module.bias),
+                "stride": module.stride[0],
+                "padding": module.padding[0],
+            })
+        elif isinstance(module, nn.Flatten):
+            layers.append({"type": "flatten"})
+        elif type(module) in ACTIVATION_NAMES:
+            layers.append({"type": ACTIVATION_NAMES[type(module)]})
+        elif not list(module.children()):
+            raise ValueError(f"Unsupported layer in the Q-network: {module}")
+    return layers, arrays
+
+
+# Export a trained model
+def export_model(model_path: str, output_path: str) -> Dict[str, Any]:
+    """
+    Returns the metadata written to output_path (.npz with the weights and a JSON layer description)
+    """
+    model = DQN.load(model_path, device="cpu")
+    policy = model.policy
+    layers, arrays = describe_q_net(policy.q_net)
+
+    metadata = {
+        "obs_shape": list(model.observation_space.shape),
+        "normalize_images": bool(policy.normalize_images and is_image_space(model.observation_space)),
+        "n_actions": int(model.action_space.n),
+        "source": os.path.basename(model_path),
+    }
+    spec = json.dumps({"layers": layers, "metadata": metadata})
+    np.savez(output_path, __spec__=np.array(spec), **arrays)
+    return metadata
+
+
+# Check that the exported network picks the same actions as the model
+def verify_export(model_path: str, output_path: str, n_samples: int = 10000, seed: int = 0) -> int:
+    """
+    Returns the number of sampled observations where the NumPy policy and DQN.predict disagree
+    """
+    from rl.numpy_policy import NumpyPolicy
+
+    model = DQN.load(model_path, device="cpu")
+    policy = NumpyPolicy.load(output_path)
+    model.observation_space.seed(seed)
+    obs = np.stack([model.observation_space.sample() for _ in range(n_samples)])
+    expected, _ = model.predict(obs, deterministic=True)
+    actions, _ = policy.predict(obs)
+    return int(np.sum(expected != actions))
+
+
+# Main function to export a model from the command line
+def main():
+    # Set up argument parser
+    parser = argparse.ArgumentParser(description="Export a trained DQN Q-network to NumPy")
+    parser.add_argument("--model", type=str, required=True, help="Path to trained model (.zip)")
+    parser.add_argument("--output", type=str, default=None, help="Output .npz path (default: next to the model)")
+    parser.add_argument("--verify", type=int, default=10000, help="Random observations to compare against DQN.predict (0 to skip)")
+    args = parser.parse_args()
+
+    output = args.output or os.path.splitext(args.model)[0] + ".npz"
+    metadata = export_model(args.model, output)
+    print(f"Exported {args.model} to {output} ({os.path.getsize(output) / 1024:.1f} KiB, observation shape {tuple(metadata['obs_shape'])})")
+
+    if args.verify > 0:
+        mismatches = verify_export(args.model, output, args.verify)
+        print(f"Verified on {args.verify} random observations: {mismatches} mismatched actions")
+        if mismatches:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
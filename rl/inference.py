@@ -0,0 +1,215 @@
+"""
+Micro-batching inference server shared by many concurrent game loops.
+"""
+import time  # for latency measurements
+import queue  # for the request queue
+import threading  # for the serving thread
+from collections import Counter, deque  # for statistics
+from concurrent.futures import Future  # for pending results
+from typing import Any, Dict, Tuple  # for type hints
+
+import numpy as np  # for numerical operations
+
+# Latency percentiles reported by stats()
+LATENCY_PERCENTILES = (50, 90, 99)
+
+
+class InferenceServer:
+    """
+    Collects observations from many game loops and answers them with one batched forward pass.
+
+    Game loops (threads) call predict(obs) like they would call model.predict. A
+    serving thread takes the first queued request, waits up to max_wait_ms for more
+    (up to max_batch_size), stacks them and runs policy.predict once for the batch.
+
+    Use as a context manager (or call start() and stop()):
+
+        with InferenceServer(model, max_batch_size=64, max_wait_ms=2) as server:
+            action, _ = server.predict(obs)
+    """
+    def __init__(
+        self,
+        policy,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 2.0,
+        deterministic: bool = True,
+        max_latency_samples: int = 100_000,
+    ):
+        """
+        Args:
+            policy: anything with predict(obs, deterministic) such as a DQN model or its policy
+            max_batch_size: largest batch of observations per forward pass
+            max_wait_ms: how long the first request of a batch waits for more requests
+            deterministic: passed to policy.predict
+            max_latency_samples: number of most recent request latencies kept for stats()
+        """
+        self.policy = policy
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.deterministic = deterministic
+
+        # Requests are (observation, submit time, future); None stops the server
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+        # Set by stop(); submit() checks it under the lock so nothing is queued after the stop marker
+        self._stopped = False
+        self._submit_lock = threading.Lock()
+
+        # Statistics (written by the serving thread, read under the lock)
+        self._stats_lock = threading.Lock()
+        self._latencies: deque = deque(maxlen=max_latency_samples)
+        self._batch_sizes: Counter = Counter()
+        self._busy_time = 0.0
+        self._started_at = 0.0
+
+    def __enter__(self) -> "InferenceServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    # Start the serving thread
+    def start(self) -> "InferenceServer":
+        with self._submit_lock:
+            self._stopped = False
+        if self._thread is None:
+            self._started_at = time.perf_counter()
+            self._thread = threading.Thread(target=self._serve, name="inference-server", daemon=True)
+            self._thread.start()
+        return self
+
+    # Answer the queued requests and stop the serving thread
+    def stop(self) -> None:
+        with self._submit_lock:
+            self._stopped = True
+            if self._thread is not None:
+                self._queue.put(None)
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        # Fail requests nobody will serve (queued before start() or left by a failed serving thread)
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is not None:
+                request[2].set_exception(RuntimeError("Inference server stopped"))
+
+    # Queue one observation
+    def submit(self, obs: np.ndarray) -> Future:
+        """
+        Returns a Future resolving to the action (int) for obs
+
+        Raises RuntimeError once the server is stopped.
+        """
+        future: Future = Future()
+        with self._submit_lock:
+            if self._stopped:
+                raise RuntimeError("Inference server stopped")
+            self._queue.put((obs, time.perf_counter(), future))
+        return future
+
+    # Drop-in replacement for model.predict for a single observation
+    def predict(self, obs: np.ndarray, state=None, episode_start=None, deterministic: bool = True) -> Tuple[int, None]:
+        """
+        Returns (action, None); blocks until the batch containing obs was evaluated.
+        The deterministic flag of the server is used.
+        """
+        return self.submit(obs).result(), None
+
+    # Serving loop: build micro-batches and evaluate them
+    def _serve(self) -> None:
+        stopping = False
+        while not stopping:
+            request = self._queue.get()
+            if request is None:
+                break
+            batch = [request]
+
+            # Wait a little for more requests, up to the batch size
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if request is None:
+                    stopping = True
+                    break
+                batch.append(request)
+
+            self._run_batch(batch)
+
+    # One forward pass for a batch of requests
+    def _run_batch(self, batch: list) -> None:
+        start = time.perf_counter()
+        try:
+            actions, _ = self.policy.predict(np.stack([obs for obs, _, _ in batch]), deterministic=self.deterministic)
+        except Exception as e:
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+
+        done = time.perf_counter()
+        with self._stats_lock:
+            self._busy_time += done - start
+            self._batch_sizes[len(batch)] += 1
+            self._latencies.extend(done - submitted for _, submitted, _ in batch)
+        for (_, _, future), action in zip(batch, actions):
+            future.set_result(int(action))
+
+    # Summary of the requests served so far
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns requests, batches, mean_batch_size, requests_per_sec, busy (fraction of
+        time spent in forward passes), latency_p50/p90/p99_ms and batch_size_histogram
+        ({batch size: number of batches})
+        """
+        with self._stats_lock:
+            batch_sizes = dict(sorted(self._batch_sizes.items()))
+            latencies = np.array(self._latencies)
+            busy_time = self._busy_time
+        batches = sum(batch_sizes.values())
+        requests = sum(size * count for size, count in batch_sizes.items())
+        elapsed = time.perf_counter() - self._started_at if self._started_at else 0.0
+
+        stats: Dict[str, Any] = {
+            "requests": requests,
+            "batches": batches,
+            "mean_batch_size": requests / batches if batches else 0.0,
+            "requests_per_sec": requests / elapsed if elapsed else 0.0,
+            "busy": busy_time / elapsed if elapsed else 0.0,
+        }
+        for q in LATENCY_PERCENTILES:
+            stats[f"latency_p{q}_ms"] = float(np.percentile(latencies, q)) * 1000 if len(latencies) else 0.0
+        stats["batch_size_histogram"] = batch_sizes
+        return stats
+
+
+# Format server statistics for printing
+def format_stats(stats: Dict[str, Any]) -> str:
+    """
+    Returns a multi-line summary; the batch size histogram is grouped in powers of two
+    """
+    latencies = ", ".join(f"p{q}={stats[f'latency_p{q}_ms']:.2f}ms" for q in LATENCY_PERCENTILES)
+    lines = [
+        f"Requests: {stats['requests']} in {stats['batches']} batches "
+        f"(mean batch size {stats['mean_batch_size']:.1f}, {stats['requests_per_sec']:.0f} requests/s, "
+        f"{stats['busy']:.0%} busy)",
+        f"Latency: {latencies}",
+        "Batch sizes:",
+    ]
+
+    # Power-of-two buckets: 1, 2-3, 4-7, ...
+    buckets: Counter = Counter()
+    for size, count in stats["batch_size_histogram"].items():
+        buckets[1 << (size.bit_length() - 1)] += count
+    total = max(sum(buckets.values()), 1)
+    for low in sorted(buckets):
+        label = str(low) if low == 1 else f"{low}-{2 * low - 1}"
+        share = buckets[low] / total
+        lines.append(f"  {label:>9}: {buckets[low]:>8} {'#' * round(share * 40)}")
+    return "\n".join(lines)
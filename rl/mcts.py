@@ -0,0 +1,365 @@
+"""
+Monte Carlo tree search agent that plans with a copy of the Snake environment.
+"""
+import os  # for file operations
+import sys  # for system operations
+import math  # for the exploration bonus
+import time  # for the per-move time limit
+import multiprocessing as mp  # for parallel search workers
+from concurrent.futures import ProcessPoolExecutor  # for parallel search workers
+from typing import Any, Dict, List, Tuple  # for type hints
+
+import numpy as np  # for numerical operations
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from entitySnake import OPPOSITE_DIRECTIONS  # for pruning reversals
+from rl.snake_env import SnakeEnv, STATE_HEADER  # for the forward model and its state header
+
+# Number of actions (UP, DOWN, LEFT, RIGHT)
+N_ACTIONS = 4
+
+
+# Q-values for a batch of observations from a NumpyPolicy or a Stable-Baselines3 DQN
+def q_value_function(policy):
+    """
+    Returns a function mapping an (N, *obs_shape) batch to (N, 4) Q-values
+    """
+    if hasattr(policy, "q_values"):
+        return policy.q_values
+
+    import torch
+
+    q_net = policy.q_net
+
+    def q_values(obs: np.ndarray) -> np.ndarray:
+        with torch.no_grad():
+            tensor, _ = policy.policy.obs_to_tensor(obs)
+            return q_net(tensor).cpu().numpy()
+    return q_values
+
+
+class Node:
+    """
+    Search statistics of one position: visits and summed returns per action.
+    """
+    __slots__ = ("actions", "priors", "visits", "value_sums", "total")
+
+    def __init__(self, actions: List[int], priors: List[float]):
+        self.actions = actions
+        self.priors = priors
+        self.visits = [0] * N_ACTIONS
+        self.value_sums = [0.0] * N_ACTIONS
+        self.total = 0
+
+
+class MCTS:
+    """
+    PUCT search over a private SnakeEnv used as forward model.
+
+    Positions are stored in a transposition table keyed by their saved state
+    (body, direction, apple and steps without food), so paths that reach the same
+    position share statistics and the table is reused on the next move. The model
+    keeps its own random stream when a position is restored, so apple spawns are
+    sampled rather than replayed from the real game.
+
+    With a policy (DQN model or NumpyPolicy) the softmax of its Q-values gives the
+    priors and the best Q-value scores new leaves; without one, priors are uniform
+    and leaves are scored with a random rollout that avoids immediate collisions.
+    """
+    def __init__(
+        self,
+        env_kwargs: Dict[str, Any],
+        policy=None,
+        c_puct: float = 1.5,
+        gamma: float = 0.97,
+        rollout_depth: int = 20,
+        max_depth: int = 100,
+        prior_temperature: float = 1.0,
+        max_nodes: int = 200_000,
+        seed: int | None = None,
+    ):
+        """
+        Args:
+            env_kwargs: SnakeEnv arguments of the game being played (board size, obs_type)
+            policy: optional DQN model or NumpyPolicy for priors and leaf values
+            c_puct: exploration constant
+            gamma: discount of the search returns
+            rollout_depth: steps of the random rollout scoring a leaf (without policy)
+            max_depth: longest path followed inside the tree in one simulation
+            prior_temperature: softmax temperature of the Q-value priors
+            max_nodes: the transposition table is cleared when it grows past this size
+            seed: seed of the model's random stream (apple spawns and rollouts)
+        """
+        self.model = SnakeEnv(**env_kwargs, copy_obs=False, reuse_info=True)
+        self.model.reset(seed=seed)
+        self.rng = self.model.rng
+        self.q_values = q_value_function(policy) if policy is not None else None
+        self.c_puct = c_puct
+        self.gamma = gamma
+        self.rollout_depth = rollout_depth
+        self.max_depth = max_depth
+        self.prior_temperature = prior_temperature
+        self.max_nodes = max_nodes
+
+        self.table: Dict[bytes, Node] = {}
+        self._state = np.zeros(self.model.state_size, dtype=np.uint8)
+
+        # State bytes that identify a position: the header up to the score and
+        # steps_without_food (score, episode_steps and the random stream are left
+        # out), then the body cells of the current length
+        fields = self.model._state_dtype.fields
+        self._key_spans = ((0, fields["score"][1]), (fields["steps_without_food"][1], fields["episode_steps"][1]))
+        self._cell_size = fields["body"][0].base.itemsize
+
+        # Range of backed-up returns, used to normalize the action values to [0, 1]
+        self._min_value = math.inf
+        self._max_value = -math.inf
+
+    # Transposition key of the model's current position
+    def _key(self) -> bytes:
+        state = self.model.get_state(self._state)
+        (start, end), (counter_start, counter_end) = self._key_spans
+        body_end = STATE_HEADER.size + len(self.model.snake) * self._cell_size
+        return state[start:end].tobytes() + state[counter_start:counter_end].tobytes() + state[STATE_HEADER.size:body_end].tobytes()
+
+    # Actions that are not a reversal (reversals are ignored and repeat the current direction)
+    def _legal_actions(self) -> List[int]:
+        direction = self.model.snake.direction
+        if direction is None:
+            return list(range(N_ACTIONS))
+        return [action for action in range(N_ACTIONS) if action != OPPOSITE_DIRECTIONS[direction]]
+
+    # Add the model's current position to the table and score it
+    def _expand(self, key: bytes, obs: np.ndarray) -> Tuple[Node, float]:
+        """
+        Returns the new node and the value estimate of its position
+        """
+        actions = self._legal_actions()
+        if self.q_values is None:
+            node = Node(actions, [1.0 / len(actions)] * N_ACTIONS)
+            value = self._rollout()
+        else:
+            q = self.q_values(obs[None])[0]
+            legal = q[actions]
+            weights = np.exp((legal - legal.max()) / self.prior_temperature)
+            priors = [0.0] * N_ACTIONS
+            for action, weight in zip(actions, weights / weights.sum()):
+                priors[action] = float(weight)
+            node = Node(actions, priors)
+            value = float(legal.max())
+        self.table[key] = node
+        return node, value
+
+    # Discounted return of a random rollout that avoids immediate collisions
+    def _rollout(self) -> float:
+        model = self.model
+        snake = model.snake
+        occupancy = snake.occupancy
+        moves = snake.moves
+        rng = self.rng
+        value = 0.0
+        discount = 1.0
+        for _ in range(self.rollout_depth):
+            head = snake.body[0]
+            safe = [
+                action for action in self._legal_actions()
+                if occupancy[moves[action][head]] - (moves[action][head] == head) == 0
+            ]
+            action = safe[rng.randrange(len(safe))] if safe else rng.randrange(N_ACTIONS)
+            _, reward, terminated, truncated, _ = model.step(action)
+            value += discount * reward
+            discount *= self.gamma
+            if terminated or truncated:
+                break
+        return value
+
+    # Pick the action with the best PUCT score
+    def _select(self, node: Node) -> int:
+        low, high = self._min_value, self._max_value
+        scale = 1.0 / (high - low) if high > low else 0.0
+        exploration = self.c_puct * math.sqrt(node.total + 1)
+        first_visit = 1.0 if self.q_values is None else 0.0  # Optimistic without priors
+        best_action = node.actions[0]
+        best_score = -math.inf
+        for action in node.actions:
+            visits = node.visits[action]
+            if visits:
+                value = (node.value_sums[action] / visits - low) * scale if scale else 0.5
+            else:
+                value = first_visit
+            score = value + exploration * node.priors[action] / (1 + visits)
+            if score > best_score:
+                best_score = score
+                best_action = action
+        return best_action
+
+    # Run simulations from a saved state
+    def search(self, state: np.ndarray | bytes, budget: int, time_limit: float | None = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns (visits, mean returns) of the root actions after budget simulations
+        (or fewer if time_limit seconds pass first)
+        """
+        if len(self.table) > self.max_nodes:
+            self.table.clear()
+        model = self.model
+        deadline = time.perf_counter() + time_limit if time_limit else None
+
+        obs = model.set_state(state, restore_rng=False)
+        root_key = self._key()
+        root = self.table.get(root_key)
+        if root is None:
+            root, _ = self._expand(root_key, obs)
+
+        for simulation in range(budget):
+            if deadline is not None and simulation and time.perf_counter() > deadline:
+                break
+            model.set_state(state, restore_rng=False)
+
+            # Follow the tree until a new position, a terminal step or the depth limit
+            node = root
+            path = []
+            value = 0.0
+            for _ in range(self.max_depth):
+                action = self._select(node)
+                obs, reward, terminated, truncated, _ = model.step(action)
+                path.append((node, action, reward))
+                if terminated or truncated:
+                    break
+                key = self._key()
+                child = self.table.get(key)
+                if child is None:
+                    _, value = self._expand(key, obs)
+                    break
+                node = child
+
+            # Back up the discounted returns
+            for node, action, reward in reversed(path):
+                value = reward + self.gamma * value
+                node.visits[action] += 1
+                node.value_sums[action] += value
+                node.total += 1
+                if value < self._min_value:
+                    self._min_value = value
+                if value > self._max_value:
+                    self._max_value = value
+
+        visits = np.array(root.visits, dtype=np.int64)
+        values = np.array([root.value_sums[a] / root.visits[a] if root.visits[a] else 0.0 for a in range(N_ACTIONS)])
+        return visits, values
+
+
+# Pick the most visited action (best mean return among ties)
+def best_action(visits: np.ndarray, values: np.ndarray) -> int:
+    candidates = np.flatnonzero(visits == visits.max())
+    return int(candidates[np.argmax(values[candidates])])
+
+
+# Search worker process state (see _init_worker)
+_worker_search: MCTS | None = None
+
+
+def _init_worker(env_kwargs: Dict[str, Any], policy_path: str | None, search_kwargs: Dict[str, Any], seed: int | None) -> None:
+    global _worker_search
+    policy = None
+    if policy_path is not None:
+        from rl.numpy_policy import load_policy
+        policy = load_policy(policy_path, device="cpu")
+    _worker_search = MCTS(env_kwargs, policy, seed=seed, **search_kwargs)
+
+
+def _run_worker(state: bytes, budget: int, time_limit: float | None) -> Tuple[np.ndarray, np.ndarray]:
+    return _worker_search.search(state, budget, time_limit)
+
+
+class MCTSAgent:
+    """
+    Plays SnakeEnv by searching from the current position before every move.
+
+    act(env) reads the position with env.get_state(), runs budget simulations and
+    returns the most visited action. With workers > 1 the budget is split over
+    worker processes that search the same position independently (root
+    parallelization, each with its own transposition table) and their root
+    visits are summed. Worker i always gets share i of the budget and is seeded
+    with seed + i, so runs with a seed are reproducible (unless time_limit_ms
+    cuts searches short). time_limit_ms caps the search time of a move.
+    """
+    def __init__(
+        self,
+        env: SnakeEnv,
+        budget: int = 200,
+        policy=None,
+        policy_path: str | None = None,
+        workers: int = 1,
+        time_limit_ms: float | None = None,
+        seed: int | None = None,
+        **search_kwargs,
+    ):
+        """
+        Args:
+            env: the environment that will be played (its board size and obs_type are copied)
+            budget: simulations per move
+            policy: optional DQN model or NumpyPolicy for priors (single process)
+            policy_path: model path loaded by every worker process (workers > 1)
+            workers: number of search processes
+            time_limit_ms: optional time limit per move
+            seed: seed of the search's random streams
+            search_kwargs: MCTS options (c_puct, gamma, rollout_depth, ...)
+        """
+        # Boards sized in cells are rebuilt from cells so the model observes like the env
+        if env.sized_in_cells:
+            board = {"cols": env.cols, "rows": env.rows}
+        else:
+            board = {"grid_width": env.grid_width, "grid_height": env.grid_height, "step_size": env.step_size}
+        env_kwargs = {
+            **board,
+            "initial_length": env.initial_length,
+            "obs_type": env.obs_type,
+        }
+        self.budget = budget
+        self.workers = workers
+        self.time_limit = time_limit_ms / 1000.0 if time_limit_ms else None
+        self._executors: List[ProcessPoolExecutor] = []
+        self._search: MCTS | None = None
+        if workers > 1:
+            # One single-process executor per worker, so share i is always searched by worker i
+            self._executors = [
+                ProcessPoolExecutor(
+                    max_workers=1,
+                    mp_context=mp.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(env_kwargs, policy_path, search_kwargs, None if seed is None else seed + i),
+                )
+                for i in range(workers)
+            ]
+        else:
+            if policy is None and policy_path is not None:
+                from rl.numpy_policy import load_policy
+                policy = load_policy(policy_path, device="cpu")
+            self._search = MCTS(env_kwargs, policy, seed=seed, **search_kwargs)
+
+    # Choose the next action for the env's current position
+    def act(self, env: SnakeEnv) -> int:
+        state = env.get_state()
+        if not self._executors:
+            visits, values = self._search.search(state, self.budget, self.time_limit)
+            return best_action(visits, values)
+
+        # Split the budget over the workers and merge their root statistics
+        shares = [(self.budget + i) // self.workers for i in range(self.workers)]
+        state_bytes = state.tobytes()
+        futures = [executor.submit(_run_worker, state_bytes, share, self.time_limit) for executor, share in zip(self._executors, shares) if share]
+        visits = np.zeros(N_ACTIONS, dtype=np.int64)
+        value_sums = np.zeros(N_ACTIONS)
+        for future in futures:
+            worker_visits, worker_values = future.result()
+            visits += worker_visits
+            value_sums += worker_visits * worker_values
+        return best_action(visits, np.divide(value_sums, np.maximum(visits, 1)))
+
+    # Stop the worker processes
+    def close(self) -> None:
+        for executor in self._executors:
+            executor.shutdown()
+        self._executors = []
@@ -0,0 +1,106 @@
+"""
+Pure-NumPy runtime for Q-networks exported with rl/export.py (no torch or Stable-Baselines3 needed).
+"""
+import json  # for the layer description
+from types import SimpleNamespace  # for the observation space stand-in
+from typing import Any, Dict, List, Tuple  # for type hints
+
+import numpy as np  # for numerical operations
+
+
+# Activation functions by exported name
+ACTIVATIONS = {
+    "relu": lambda x: np.maximum(x, 0, out=x),
+    "tanh": lambda x: np.tanh(x, out=x),
+}
+
+
+# 2D convolution (NCHW input, OIHW weight) matching torch.nn.Conv2d
+def conv2d(x: np.ndarray, weight: np.ndarray, bias: np.ndarray | None, stride: int, padding: int) -> np.ndarray:
+    """
+    Returns the (N, out_channels, H', W') convolution output
+    """
+    if padding:
+        x = np.pad(x, ((0, 0), (0, 0), (padding, padding), (padding, padding)))
+    kernel_h, kernel_w = weight.shape[2:]
+    windows = np.lib.stride_tricks.sliding_window_view(x, (kernel_h, kernel_w), axis=(2, 3))[:, :, ::stride, ::stride]
+    out = np.einsum("nchwij,ocij->nohw", windows, weight, optimize=True)
+    if bias is not None:
+        out += bias[None, :, None, None]
+    return out
+
+
+class NumpyPolicy:
+    """
+    Greedy policy that evaluates an exported Q-network with NumPy.
+
+    predict() has the same calling convention as DQN.predict, so it can replace
+    the model in play_rl.py, run_episodes and the inference server. Actions are
+    the argmax of the Q-values, the same as DQN.predict(obs, deterministic=True).
+    """
+    def __init__(self, layers: List[Dict[str, Any]], arrays: Dict[str, np.ndarray], metadata: Dict[str, Any]):
+        self.layers = layers
+        self.arrays = arrays
+        self.obs_shape = tuple(metadata["obs_shape"])
+        self.normalize_images = metadata["normalize_images"]
+        self.n_actions = metadata["n_actions"]
+
+    # Load an exported .npz file
+    @classmethod
+    def load(cls, path: str) -> "NumpyPolicy":
+        with np.load(path) as data:
+            arrays = {key: data[key] for key in data.files if key != "__spec__"}
+            spec = json.loads(str(data["__spec__"]))
+        return cls(spec["layers"], arrays, spec["metadata"])
+
+    # Shape-only stand-in for the observation space (used to pick the obs_type)
+    @property
+    def observation_space(self) -> SimpleNamespace:
+        return SimpleNamespace(shape=self.obs_shape)
+
+    # Q-values of a batch of observations
+    def q_values(self, obs: np.ndarray) -> np.ndarray:
+        """
+        Returns (N, n_actions) float32 Q-values for a batch of observations
+        """
+        # Same preprocessing as Stable-Baselines3 (images are scaled to [0, 1])
+        x = obs.astype(np.float32)
+        if self.normalize_images:
+            x /= np.float32(255.0)
+
+        arrays = self.arrays
+        for layer in self.layers:
+            kind = layer["type"]
+            if kind == "linear":
+                x = x @ arrays[layer["weight"]].T
+                if layer["bias"] is not None:
+                    x += arrays[layer["bias"]]
+            elif kind == "conv2d":
+                bias = arrays[layer["bias"]] if layer["bias"] is not None else None
+                x = conv2d(x, arrays[layer["weight"]], bias, layer["stride"], layer["padding"])
+            elif kind == "flatten":
+                x = x.reshape(len(x), -1)
+            else:
+                x = ACTIVATIONS[kind](x)
+        return x
+
+    # Greedy actions (same signature as DQN.predict)
+    def predict(self, obs: np.ndarray, state=None, episode_start=None, deterministic: bool = True) -> Tuple[np.ndarray, None]:
+        """
+        Returns (actions, None); a single observation gives a single action like DQN.predict
+        """
+        obs = np.asarray(obs)
+        batched = obs.ndim > len(self.obs_shape)
+        actions = self.q_values(obs if batched else obs[None]).argmax(axis=1)
+        return (actions if batched else actions[0]), None
+
+
+# Load an exported .npz policy or a Stable-Baselines3 .zip model
+def load_policy(path: str, device: str = "auto"):
+    """
+    Returns a NumpyPolicy for .npz files, otherwise DQN.load(path) (imports Stable-Baselines3 only then)
+    """
+    if path.endswith(".npz"):
+        return NumpyPolicy.load(path)
+    from stable_baselines3 import DQN
+    return DQN.load(path, device=device)
@@ -7,9 +7,14 @@ import os # for file operations
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import time # for throughput measurement
 import argparse # for command line arguments
+import threading # for concurrent game loops
+import contextlib # for running exported models without torch
+import numpy as np # for latency statistics
 from rl import SnakeEnv # for SnakeEnv environment
-from stable_baselines3 import DQN # for DQN agent
+from rl.snake_env import obs_type_of # for matching the model's observation type
+from rl.numpy_policy import NumpyPolicy, load_policy # for exported models (Stable-Baselines3 is only imported for .zip models)
 
 # Play using random actions
 def play_random(env, num_episodes=1):
@@ -38,20 +43,85 @@ def play_random(env, num_episodes=1):
         print(f"Episode {episode+1}: Total Reward = {total_reward}, Steps = {steps}")
 
 
-# Play using a trained model
-def play_with_model(env, model_path, num_episodes=1):
-    # Try to load model from stable_baselines3
+# Print the latency statistics of per-decision timings (seconds)
+def print_latency(latencies):
+    if latencies:
+        latencies = np.array(latencies) * 1000
+        print(
+            f"Decision latency: mean={latencies.mean():.3f}ms, p50={np.percentile(latencies, 50):.3f}ms, "
+            f"p99={np.percentile(latencies, 99):.3f}ms, max={latencies.max():.3f}ms"
+        )
+
+# Run torch models under inference mode (exported NumPy models do not need torch)
+def inference_context(model):
+    if isinstance(model, NumpyPolicy):
+        return contextlib.nullcontext()
+    import torch
+    return torch.inference_mode()
+
+# Load a trained model, .zip or exported .npz, with the given backend
+def open_model(model_path, backend="sb3", device="auto"):
+    if backend == "sb3":
+        return load_policy(model_path, device=device)
+    # Q-network run directly, traced or compiled (rl/torch_runtime.py)
+    from rl.torch_runtime import load_play_policy
+    return load_play_policy(model_path, backend, device=device)
+
+# Load a trained model, .zip or exported .npz (None if it cannot be loaded)
+def load_model(model_path, backend="sb3"):
     try:
-        model = DQN.load(model_path)
+        return open_model(model_path, backend)
     except Exception as e:
         print(f"Error loading model: {e}")
         print("Falling back to random actions...")
+        return None
+
+# Play using a trained model
+def play_with_model(env, model_path, num_episodes=1, model=None):
+    # Try to load model from stable_baselines3
+    if model is None:
+        model = load_model(model_path)
+    if model is None:
         play_random(env, num_episodes)
         return
     
     # Print message about playing with model
     print(f"Playing with model from {model_path} for {num_episodes} episodes...")
-    
+
+    latencies = []
+    # Loop for num_episodes
+    with inference_context(model):
+        for episode in range(num_episodes):
+            obs, info = env.reset()
+            # Initialize tracking variables
+            total_reward = 0
+            steps = 0
+            terminated = False
+            truncated = False
+
+            # Run episode loop
+            while not terminated and not truncated:
+                # Get action from model (predict returns tuple: action, state), timing each decision
+                start = time.perf_counter()
+                action, _ = model.predict(obs, deterministic=True)
+                action = int(action)  # Convert to int
+                latencies.append(time.perf_counter() - start)
+                # Take step
+                obs, reward, terminated, truncated, info = env.step(action)
+                # Accumulate reward
+                total_reward += reward
+                steps += 1
+            # Print episode results
+            print(f"Episode {episode+1}: Score={info['score']}, Steps={steps}, Reward={total_reward:.2f}")
+
+    print_latency(latencies)
+
+# Play using a planning agent (anything with act(env) -> action)
+def play_with_agent(env, agent, name, num_episodes=1):
+    # Print message about playing with the agent
+    print(f"Playing with {name} for {num_episodes} episodes...")
+
+    latencies = []
     # Loop for num_episodes
     for episode in range(num_episodes):
         obs, info = env.reset()
@@ -63,9 +133,10 @@ def play_with_model(env, model_path, num_episodes=1):
 
         # Run episode loop
         while not terminated and not truncated:
-            # Get action from model (predict returns tuple: action, state)
-            action, _ = model.predict(obs, deterministic=True)
-            action = int(action)  # Convert to int
+            # Time each decision
+            start = time.perf_counter()
+            action = agent.act(env)
+            latencies.append(time.perf_counter() - start)
             # Take step
             obs, reward, terminated, truncated, info = env.step(action)
             # Accumulate reward
@@ -74,15 +145,146 @@ def play_with_model(env, model_path, num_episodes=1):
         # Print episode results
         print(f"Episode {episode+1}: Score={info['score']}, Steps={steps}, Reward={total_reward:.2f}")
 
+    print_latency(latencies)
+
+# Build a planning agent for env
+def make_agent(env, args, model=None):
+    if args.agent == "mcts":
+        from rl.mcts import MCTSAgent
+
+        # Worker processes load the model themselves
+        return MCTSAgent(
+            env,
+            budget=args.budget,
+            policy=model if args.workers <= 1 else None,
+            policy_path=args.model if args.workers > 1 else None,
+            workers=args.workers,
+            time_limit_ms=args.time_limit_ms,
+            seed=args.seed,
+        )
+    if args.agent == "solver":
+        from rl.solver import SolverAgent
+
+        return SolverAgent(env, shortcuts=not args.no_shortcuts)
+    raise ValueError(f"Unknown agent: {args.agent}")
+
+# Evaluate a trained model on many boards at once (headless)
+def eval_with_model(model_path, num_episodes=100, num_envs=16, backend="sb3", seed=None):
+    model = open_model(model_path, backend)
+    obs_type = obs_type_of(model.observation_space)
+    print(f"Evaluating model from {model_path} for {num_episodes} episodes on {num_envs} boards...")
+    if isinstance(model, NumpyPolicy):
+        # Exported models run without Stable-Baselines3 and torch
+        from rl.episodes import LockstepEnvs, run_episodes, summarize
+
+        env = LockstepEnvs([SnakeEnv(obs_type=obs_type) for _ in range(num_envs)], seed=seed)
+        try:
+            stats = summarize(run_episodes(model, env, num_episodes))
+        finally:
+            env.close()
+    else:
+        from rl.evaluate import evaluate_batched
+
+        stats = evaluate_batched(model, num_episodes, num_envs, seed=seed, env_kwargs={"obs_type": obs_type})
+    print(
+        f"Score: mean={stats['score_mean']:.1f}, median={stats['score_median']:.0f}, "
+        f"p5={stats['score_p5']:.0f}, p95={stats['score_p95']:.0f}"
+    )
+    print(f"Snake length: mean={stats['length_mean']:.1f}, median={stats['length_median']:.0f}")
+    print(f"Steps: mean={stats['steps_mean']:.1f}, median={stats['steps_median']:.0f}")
+    if "steps_to_death_mean" in stats:
+        print(f"Steps to death: mean={stats['steps_to_death_mean']:.1f} (death rate {stats['death_rate']:.0%})")
+
+# Play many headless games at once that share one model through an inference server
+def play_concurrent(model_path, num_episodes=100, num_games=64, max_batch_size=64, max_wait_ms=2.0, backend="sb3", seed=None):
+    from rl.inference import InferenceServer, format_stats
+
+    model = open_model(model_path, backend, device="cpu")
+    # DQN models serve their policy; NumPy and Q-network policies serve themselves
+    policy = getattr(model, "policy", model)
+    obs_type = obs_type_of(model.observation_space)
+    print(f"Playing {num_episodes} episodes in {num_games} concurrent games with model from {model_path}...")
+
+    scores = []
+    steps = [0]
+    lock = threading.Lock()
+
+    # One game loop: play its share of the episodes
+    def game_loop(server, episodes, game_seed):
+        env = SnakeEnv(obs_type=obs_type)
+        for episode in range(episodes):
+            obs, info = env.reset(seed=game_seed if episode == 0 else None)
+            terminated = truncated = False
+            episode_steps = 0
+            while not terminated and not truncated:
+                action, _ = server.predict(obs)
+                obs, reward, terminated, truncated, info = env.step(action)
+                episode_steps += 1
+            with lock:
+                scores.append(info["score"])
+                steps[0] += episode_steps
+
+    start = time.perf_counter()
+    with InferenceServer(policy, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms) as server:
+        threads = [
+            threading.Thread(target=game_loop, args=(server, (num_episodes + i) // num_games, None if seed is None else seed + i))
+            for i in range(num_games)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = server.stats()
+    elapsed = time.perf_counter() - start
+
+    print(f"Score: mean={sum(scores) / max(len(scores), 1):.1f} over {len(scores)} episodes")
+    print(f"Decisions: {steps[0]} in {elapsed:.1f}s ({steps[0] / elapsed:.0f}/s)")
+    print(format_stats(stats))
+
 # Main function to parse arguments and run play
 def main():
     # Set up argument parser
     parser = argparse.ArgumentParser(description="Snake with RL agent")
-    parser.add_argument("--model", type=str, default=None, help="Path to trained model")
+    parser.add_argument("--model", type=str, default=None, help="Path to trained model (.zip, or .npz exported with rl/export.py)")
     parser.add_argument("--episodes", type=int, default=1, help="Number of episodes")
     parser.add_argument("--headless", action="store_true", help="Run without rendering (faster)")
+    parser.add_argument("--eval-envs", type=int, default=0, help="With --headless and --model, play episodes on this many boards at once and print summary statistics")
+    parser.add_argument("--games", type=int, default=0, help="With --headless and --model, play this many games concurrently through a batched inference server")
+    parser.add_argument("--max-batch-size", type=int, default=64, help="Inference server: largest batch per forward pass")
+    parser.add_argument("--max-wait-ms", type=float, default=2.0, help="Inference server: how long a request waits for a fuller batch")
+    parser.add_argument("--agent", type=str, default="auto", choices=["auto", "random", "model", "mcts", "solver"], help="Who plays: auto (the model if given, else random), random, model, mcts (tree search, using the model as prior if given) or solver (Hamiltonian cycle with shortcuts)")
+    parser.add_argument("--budget", type=int, default=200, help="MCTS: simulations per move")
+    parser.add_argument("--workers", type=int, default=1, help="MCTS: search processes per move")
+    parser.add_argument("--time-limit-ms", type=float, default=None, help="MCTS: time limit per move")
+    parser.add_argument("--no-shortcuts", action="store_true", help="Solver: only follow the Hamiltonian cycle")
+    parser.add_argument("--seed", type=int, default=None, help="Seed of the environment and the search (board or game i of --eval-envs and --games uses seed + i)")
+    parser.add_argument("--policy-backend", choices=["sb3", "eager", "trace", "compile"], default="sb3", help="How a .zip model runs: model.predict, or its Q-network called directly, TorchScript-traced or torch.compile'd (rl/torch_runtime.py)")
+    parser.add_argument("--torch-threads", type=int, default=None, help="Torch intra-op threads (default: torch's choice)")
+    parser.add_argument("--interop-threads", type=int, default=None, help="Torch inter-op threads (default: torch's choice)")
     args = parser.parse_args()
 
+    # Torch thread counts (torch is only imported when they are set)
+    if args.torch_threads is not None or args.interop_threads is not None:
+        from rl.torch_runtime import configure_threads
+        configure_threads(args.torch_threads, args.interop_threads)
+
+    if args.agent == "model" and not args.model:
+        parser.error("--agent model needs --model")
+    uses_model = args.agent in ("auto", "model")
+
+    # Concurrent headless games sharing one model
+    if uses_model and args.model and args.headless and args.games > 0:
+        play_concurrent(args.model, args.episodes, args.games, args.max_batch_size, args.max_wait_ms, args.policy_backend, args.seed)
+        return
+
+    # Batched headless evaluation
+    if uses_model and args.model and args.headless and args.eval_envs > 0:
+        eval_with_model(args.model, args.episodes, args.eval_envs, args.policy_backend, args.seed)
+        return
+
+    # Load the model first so the environment matches its observation type
+    model = load_model(args.model, args.policy_backend) if args.model and args.agent not in ("random", "solver") else None
+
     # Initialize environment with rendering (unless headless)
     env = SnakeEnv(
         grid_width=600,
@@ -90,12 +292,25 @@ def main():
         step_size=50,
         initial_length=5,
         render_mode=None if args.headless else "human",  # Render by default
+        obs_type=obs_type_of(model.observation_space) if model else "features",
     )
     
-    # Play with model or random
+    env.reset(seed=args.seed)
+
+    # Play with a planning agent, the model or random actions
     try:
-        if args.model:
-            play_with_model(env, args.model, args.episodes)
+        if args.agent in ("mcts", "solver"):
+            agent = make_agent(env, args, model)
+            if args.agent == "mcts":
+                name = f"MCTS (budget {args.budget}, {args.workers} worker(s))"
+            else:
+                name = "the Hamiltonian cycle solver" + (" (no shortcuts)" if args.no_shortcuts else "")
+            try:
+                play_with_agent(env, agent, name, args.episodes)
+            finally:
+                agent.close()
+        elif model:
+            play_with_model(env, args.model, args.episodes, model)
         else:
             play_random(env, args.episodes)
     finally:
@@ -0,0 +1,37 @@
+"""
+Feature extractors for Snake policies.
+"""
+import gymnasium as gym  # for observation spaces
+import torch  # for tensors
+from torch import nn  # for neural network layers
+from stable_baselines3.common.torch_layers import BaseFeaturesExtractor  # for custom feature extractors
+
+
+class GridCNN(BaseFeaturesExtractor):
+    """
+    Small CNN for grid observations (obs_type="grid").
+
+    SB3's default NatureCNN needs images of at least 36x36, so boards are
+    processed with padded 3x3 convolutions instead, which work for any board size.
+    Use with DQN("CnnPolicy", env, policy_kwargs=dict(features_extractor_class=GridCNN)).
+    """
+    def __init__(self, observation_space: gym.spaces.Box, features_dim: int = 256):
+        super().__init__(observation_space, features_dim)
+        channels = observation_space.shape[0]
+        self.cnn = nn.Sequential(
+            nn.Conv2d(channels, 32, kernel_size=3, padding=1),
+            nn.ReLU(),
+            nn.Conv2d(32, 64, kernel_size=3, padding=1),
+            nn.ReLU(),
+            nn.Conv2d(64, 64, kernel_size=3, stride=2, padding=1),
+            nn.ReLU(),
+            nn.Flatten(),
+        )
+
+        # Size of the flattened convolution output
+        with torch.no_grad():
+            n_flatten = self.cnn(torch.zeros(1, *observation_space.shape)).shape[1]
+        self.linear = nn.Sequential(nn.Linear(n_flatten, features_dim), nn.ReLU())
+
+    def forward(self, observations: torch.Tensor) -> torch.Tensor:
+        return self.linear(self.cnn(observations))
@@ -0,0 +1,309 @@
+"""
+Opt-in per-phase timing of SnakeEnv.step/reset, a TensorBoard callback and a profiling entry point.
+"""
+import os  # for file operations
+import sys  # for system operations
+import time  # for timing
+import argparse  # for command line arguments
+from typing import Any, Callable, Dict, List, Tuple  # for type hints
+
+import numpy as np  # for numerical operations
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stable_baselines3.common.callbacks import BaseCallback  # for training callbacks
+from stable_baselines3.common.vec_env import SubprocVecEnv, VecEnvWrapper  # for finding the base VecEnv
+from rl import SnakeEnv  # for SnakeEnv environment
+
+# Outer phases: everything spent inside env.step, env.reset and env.render
+ENV_PHASES = ("step", "reset", "render")
+
+# Inner phases: methods called by the outer phases (time outside them is reported as "other")
+INNER_PHASES = ("snake_update", "snake_reset", "apple_spawn", "observation", "info", "draw")
+
+
+class PhaseTimer:
+    """
+    Accumulated wall time (seconds) and call counts per phase.
+
+    wrap(phase, fn) returns fn timed with time.perf_counter. The timer only holds
+    two dicts, so it can be pickled back from SubprocVecEnv workers with get_attr.
+    """
+    def __init__(self):
+        self.totals: Dict[str, float] = {phase: 0.0 for phase in ENV_PHASES + INNER_PHASES}
+        self.counts: Dict[str, int] = {phase: 0 for phase in ENV_PHASES + INNER_PHASES}
+
+    # Timed version of a function
+    def wrap(self, phase: str, fn: Callable) -> Callable:
+        totals = self.totals
+        counts = self.counts
+        totals.setdefault(phase, 0.0)
+        counts.setdefault(phase, 0)
+        clock = time.perf_counter
+
+        def timed(*args, **kwargs):
+            start = clock()
+            result = fn(*args, **kwargs)
+            totals[phase] += clock() - start
+            counts[phase] += 1
+            return result
+
+        timed.__wrapped__ = fn
+        return timed
+
+    # Clear all totals and counts
+    def clear(self) -> None:
+        for phase in self.totals:
+            self.totals[phase] = 0.0
+            self.counts[phase] = 0
+
+    # Add the totals and counts of other timers
+    def merge(self, *timers: "PhaseTimer") -> "PhaseTimer":
+        for timer in timers:
+            for phase, total in timer.totals.items():
+                self.totals[phase] = self.totals.get(phase, 0.0) + total
+                self.counts[phase] = self.counts.get(phase, 0) + timer.counts[phase]
+        return self
+
+    # Seconds spent in step, reset and render
+    @property
+    def env_time(self) -> float:
+        return sum(self.totals[phase] for phase in ENV_PHASES)
+
+    # Share of the env time per inner phase
+    def shares(self) -> Dict[str, float]:
+        """
+        Returns {phase: fraction of env time}, including "other" for the rest
+        """
+        env_time = self.env_time
+        if env_time <= 0:
+            return {}
+        shares = {phase: self.totals[phase] / env_time for phase in INNER_PHASES}
+        shares["other"] = max(0.0, 1.0 - sum(shares.values()))
+        return shares
+
+    # Human-readable phase table
+    def report(self) -> str:
+        """
+        Returns one line per phase with calls, total seconds, microseconds per call and share
+        """
+        shares = self.shares()
+        lines = [f"{'phase':<14}{'calls':>12}{'total s':>10}{'us/call':>10}{'share':>8}"]
+        for phase in ENV_PHASES + INNER_PHASES:
+            calls = self.counts[phase]
+            if calls == 0:
+                continue
+            share = f"{shares[phase]:.1%}" if phase in shares else ""
+            lines.append(f"{phase:<14}{calls:>12,}{self.totals[phase]:>10.3f}{self.totals[phase] / calls * 1e6:>10.2f}{share:>8}")
+        if "other" in shares:
+            lines.append(f"{'other':<14}{'':>12}{'':>10}{'':>10}{shares['other']:>8.1%}")
+        return "\n".join(lines)
+
+
+# Replace obj.name with a timed version and remember it
+def _patch(obj, name: str, phase: str, timer: PhaseTimer, patched: List[Tuple[Any, str]]) -> None:
+    setattr(obj, name, timer.wrap(phase, getattr(obj, name)))
+    patched.append((obj, name))
+
+
+# Time the snake and apple methods (the entities exist after the first reset)
+def _instrument_entities(env: SnakeEnv, timer: PhaseTimer, patched: List[Tuple[Any, str]]) -> None:
+    _patch(env.snake, "update", "snake_update", timer, patched)
+    _patch(env.snake, "reset", "snake_reset", timer, patched)
+    _patch(env.apple, "spawn_random", "apple_spawn", timer, patched)
+
+
+# Time the phases of one SnakeEnv
+def instrument_env(env: SnakeEnv, timer: PhaseTimer | None = None) -> PhaseTimer:
+    """
+    Returns the PhaseTimer that env.step, env.reset, env.render and the methods they call now report to
+
+    The methods are replaced by timed versions on the instance only, so other
+    environments and the class keep running the untimed code, and
+    remove_instrumentation(env) restores the originals.
+    """
+    if getattr(env, "_profiled", None):
+        raise ValueError("Environment is already instrumented")
+    timer = timer or PhaseTimer()
+    patched: List[Tuple[Any, str]] = []
+    env._profiled = patched
+
+    methods = (
+        ("step", "step"), ("reset", "reset"), ("render", "render"),
+        ("_get_obs", "observation"), ("_get_info", "info"), ("_render_frame", "draw"),
+    )
+    for name, phase in methods:
+        _patch(env, name, phase, timer, patched)
+
+    if env.snake is not None:
+        _instrument_entities(env, timer, patched)
+    else:
+        # Instrument the entities once the first reset has created them
+        timed_reset = env.reset
+
+        def first_reset(*args, **kwargs):
+            result = timed_reset(*args, **kwargs)
+            env.reset = timed_reset
+            _instrument_entities(env, timer, patched)
+            return result
+
+        env.reset = first_reset
+    return timer
+
+
+# Restore the untimed methods
+def remove_instrumentation(env: SnakeEnv) -> None:
+    for obj, name in getattr(env, "_profiled", None) or ():
+        obj.__dict__.pop(name, None)
+    env._profiled = None
+
+
+class ProfilingCallback(BaseCallback):
+    """
+    Logs env steps/sec and SnakeEnv phase shares to TensorBoard during training.
+
+    At the start of training every SnakeEnv enables its phase timers through
+    env_method("enable_profiling"), so SubprocVecEnv workers time themselves in
+    their own process. Every log_freq calls the callback records, since the
+    previous record:
+    - profile/steps_per_sec: environment steps per second of wall time
+    - profile/env_time_share: share of wall time each env spent in step/reset/render
+      (the rest is the learner, action selection and VecEnv plumbing)
+    - profile/learner_share: share of wall time spent in the model's gradient steps
+    - profile/phase/<name>: share of env time per phase (snake_update,
+      observation, apple_spawn, info, ...)
+    Envs without phase timers (SnakeVecEnv) only log steps/sec.
+    """
+    def __init__(self, log_freq: int = 10_000, verbose: int = 0):
+        super().__init__(verbose)
+        self.log_freq = log_freq
+        self._timed = False
+        self._in_process = True
+        self._learner = PhaseTimer()
+        self._last: Tuple[float, int, PhaseTimer, float] | None = None
+
+    def _on_training_start(self) -> None:
+        venv = self.training_env
+        while isinstance(venv, VecEnvWrapper):
+            venv = venv.venv
+        self._in_process = not isinstance(venv, SubprocVecEnv)
+        try:
+            self.training_env.env_method("enable_profiling")
+            self._timed = True
+        except AttributeError:
+            self._timed = False
+        self.model.train = self._learner.wrap("learner", self.model.train)
+        self._last = (time.perf_counter(), self.num_timesteps, self._collect(), 0.0)
+
+    def _on_step(self) -> bool:
+        if self.log_freq > 0 and self.n_calls % self.log_freq == 0:
+            self._record()
+        return True
+
+    def _on_training_end(self) -> None:
+        self.model.__dict__.pop("train", None)
+        if self.verbose >= 1 and self._timed:
+            print(self._collect().report())
+
+    # Timings summed over all envs
+    def _collect(self) -> PhaseTimer:
+        if not self._timed:
+            return PhaseTimer()
+        return PhaseTimer().merge(*self.training_env.get_attr("profiler"))
+
+    # Log the timings since the previous record
+    def _record(self) -> None:
+        now = time.perf_counter()
+        last_time, last_steps, last_timer, last_learner = self._last
+        timer = self._collect()
+        learner = self._learner.totals["learner"]
+        elapsed = now - last_time
+        self._last = (now, self.num_timesteps, timer, learner)
+        if elapsed <= 0:
+            return
+        self.logger.record("profile/steps_per_sec", (self.num_timesteps - last_steps) / elapsed)
+        self.logger.record("profile/learner_share", (learner - last_learner) / elapsed)
+        if not self._timed:
+            return
+
+        # Timings of this period
+        period = PhaseTimer()
+        for phase, total in timer.totals.items():
+            period.totals[phase] = total - last_timer.totals[phase]
+            period.counts[phase] = timer.counts[phase] - last_timer.counts[phase]
+        env_time = period.env_time if self._in_process else period.env_time / self.training_env.num_envs
+        self.logger.record("profile/env_time_share", env_time / elapsed)
+        for phase, share in period.shares().items():
+            self.logger.record(f"profile/phase/{phase}", share)
+
+
+# Step an env with pre-drawn actions (or an agent), resetting finished episodes
+def run_steps(env: SnakeEnv, steps: int, agent=None, seed: int = 0, render: bool = False) -> int:
+    """
+    Returns the number of finished episodes
+    """
+    actions = np.random.default_rng(seed).integers(4, size=steps).tolist()
+    episodes = 0
+    env.reset(seed=seed)
+    for i in range(steps):
+        action = agent.act(env) if agent is not None else actions[i]
+        _, _, terminated, truncated, _ = env.step(action)
+        if render:
+            env.render()
+        if terminated or truncated:
+            episodes += 1
+            env.reset()
+    return episodes
+
+
+# Main profiling function
+def main():
+    # Set up argument parser
+    parser = argparse.ArgumentParser(description="Profile SnakeEnv step/reset phases")
+    parser.add_argument("--steps", type=int, default=200_000, help="Environment steps")
+    parser.add_argument("--agent", choices=["random", "solver"], default="random", help="random: short episodes, solver: long snakes")
+    parser.add_argument("--obs-type", choices=["features", "grid"], default="features", help="Observation type")
+    parser.add_argument("--cols", type=int, default=None, help="Board width in cells (default: the training board)")
+    parser.add_argument("--rows", type=int, default=None, help="Board height in cells (default: the training board)")
+    parser.add_argument("--render", action="store_true", help="Render rgb_array frames every step")
+    parser.add_argument("--no-timers", action="store_true", help="Run uninstrumented (for py-spy or raw speed)")
+    parser.add_argument("--cprofile", type=str, default=None, help="Also run under cProfile and write the stats to this file")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+
+    env_kwargs: Dict[str, Any] = dict(obs_type=args.obs_type)
+    if args.cols is not None or args.rows is not None:
+        env_kwargs.update(cols=args.cols, rows=args.rows)
+    if args.render:
+        env_kwargs.update(render_mode="rgb_array", copy_frame=False)
+    env = SnakeEnv(**env_kwargs)
+    agent = None
+    if args.agent == "solver":
+        from rl.solver import SolverAgent
+        agent = SolverAgent(env)
+    timer = None if args.no_timers else env.enable_profiling()
+
+    profiler = None
+    if args.cprofile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    start = time.perf_counter()
+    episodes = run_steps(env, args.steps, agent, args.seed, args.render)
+    elapsed = time.perf_counter() - start
+    if profiler is not None:
+        import pstats
+        profiler.disable()
+        profiler.dump_stats(args.cprofile)
+        pstats.Stats(profiler).sort_stats("tottime").print_stats(15)
+        print(f"cProfile stats written to {args.cprofile}")
+
+    print(f"{args.steps:,} steps, {episodes:,} episodes in {elapsed:.2f}s ({args.steps / elapsed:,.0f} steps/s)")
+    if timer is not None:
+        print(f"env time {timer.env_time:.2f}s ({timer.env_time / elapsed:.1%} of wall time)")
+        print(timer.report())
+
+
+if __name__ == "__main__":
+    main()
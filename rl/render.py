@@ -0,0 +1,134 @@
+"""
+Fast rgb_array rendering of Snake boards into a reusable NumPy frame.
+"""
+import numpy as np  # for numerical operations
+from typing import Iterable  # for type hints
+
+# Colors (same as main.py)
+BG = (0, 0, 0)
+SNAKE_COLOR = (36, 140, 15)
+APPLE_COLOR = (255, 0, 0)
+GRID_OUTLINE = (60, 60, 60)
+TEXT_COLOR = (255, 255, 255)
+
+# Score label position and font size
+SCORE_POS = (20, 20)
+FONT_SIZE = 36
+
+
+# Cell states in the frame
+EMPTY, APPLE, SNAKE = 0, 1, 2
+
+
+class BoardRenderer:
+    """
+    Rasterizes a Snake board into a (window_height, window_width, 3) uint8 frame.
+
+    The static background (window fill and grid outline) is drawn once with pygame
+    and cached as an array. The frame remembers the state of every cell, so each
+    render only fills the cells that changed since the previous frame (usually the
+    new head, the old tail and the apple) through a (rows, step, cols, step, 3)
+    view of the frame; no pygame drawing happens per frame. The score label is
+    re-rendered only when the score changes.
+    """
+    # Initialize the renderer for one board layout
+    def __init__(
+        self,
+        cols: int,
+        rows: int,
+        step_size: int,
+        grid_left: int,
+        grid_top: int,
+        grid_width: int,
+        grid_height: int,
+        window_width: int,
+        window_height: int,
+    ):
+        import pygame
+
+        # Fonts need pygame's font module (also when no window is opened)
+        if not pygame.font.get_init():
+            pygame.font.init()
+        self._font = pygame.font.Font(None, FONT_SIZE)
+
+        # Static background: window fill and grid outline
+        surface = pygame.Surface((window_width, window_height))
+        surface.fill(BG)
+        pygame.draw.rect(surface, GRID_OUTLINE, (grid_left, grid_top, grid_width, grid_height), width=2)
+        self._background = np.ascontiguousarray(pygame.surfarray.array3d(surface).transpose(1, 0, 2))
+        self.frame = self._background.copy()
+
+        # Cell-shaped views of the board area (whole cells only)
+        board = (slice(grid_top, grid_top + rows * step_size), slice(grid_left, grid_left + cols * step_size))
+        self._board = self.frame[board].reshape(rows, step_size, cols, step_size, 3)
+        self._board_background = self._background[board].reshape(rows, step_size, cols, step_size, 3)
+
+        # Cell states of the next frame and of the frame buffer
+        self.cols = cols
+        self.n_cells = cols * rows
+        self._state = np.zeros(self.n_cells, dtype=np.uint8)
+        self._drawn = np.zeros(self.n_cells, dtype=np.uint8)
+        self._colors = {APPLE: np.array(APPLE_COLOR, dtype=np.uint8), SNAKE: np.array(SNAKE_COLOR, dtype=np.uint8)}
+
+        self._score: int | None = None  # Score currently drawn in the frame
+        self._score_area: tuple[slice, slice] | None = None
+
+    # Draw one board state into the frame
+    def render(self, snake_cells: Iterable[int] | np.ndarray, apple_cell: int, score: int, copy: bool = True) -> np.ndarray:
+        """
+        Returns the (window_height, window_width, 3) uint8 frame
+
+        Args:
+            snake_cells: occupied cell indices (row * cols + col) or a boolean mask over the cells
+            apple_cell: apple cell index (negative if there is no apple)
+            score: score shown in the top left corner
+            copy: if False, the internal frame is returned (it is overwritten by the next render)
+        """
+        if not isinstance(snake_cells, np.ndarray):
+            snake_cells = np.fromiter(snake_cells, dtype=np.int64)
+
+        # Snake is drawn on top of the apple
+        state = self._state
+        state[:] = EMPTY
+        if apple_cell >= 0:
+            state[apple_cell] = APPLE
+        state[snake_cells] = SNAKE
+
+        # Fill only the cells whose state changed
+        changed = np.flatnonzero(state != self._drawn)
+        if len(changed):
+            values = state[changed]
+            rows, cols = np.divmod(changed, self.cols)
+            board = self._board
+            for value in (EMPTY, APPLE, SNAKE):
+                selected = values == value
+                if not selected.any():
+                    continue
+                r, c = rows[selected], cols[selected]
+                if value == EMPTY:
+                    board[r, :, c] = self._board_background[r, :, c]
+                else:
+                    board[r, :, c] = self._colors[value]
+            self._drawn[changed] = values
+
+        if score != self._score:
+            self._draw_score(score)
+        return self.frame.copy() if copy else self.frame
+
+    # Replace the score label
+    def _draw_score(self, score: int) -> None:
+        import pygame
+
+        # Clear the previous label
+        if self._score_area is not None:
+            self.frame[self._score_area] = self._background[self._score_area]
+
+        # Render on the background color so the label can be copied without blending
+        text = self._font.render(f"Score: {score}", True, TEXT_COLOR, BG)
+        pixels = pygame.surfarray.array3d(text).transpose(1, 0, 2)
+        x, y = SCORE_POS
+        height = min(pixels.shape[0], self.frame.shape[0] - y)
+        width = min(pixels.shape[1], self.frame.shape[1] - x)
+        self._score_area = (slice(y, y + height), slice(x, x + width))
+        self.frame[self._score_area] = pixels[:height, :width]
+        self._score = score
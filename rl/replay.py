@@ -0,0 +1,237 @@
+"""
+Compact replay buffer for SnakeEnv transitions (drop-in replay_buffer_class for DQN).
+"""
+import os  # for file operations
+import sys  # for system operations
+from typing import Dict, List, Tuple  # for type hints
+
+import numpy as np  # for numerical operations
+from gymnasium import spaces  # for the observation and action spaces
+from stable_baselines3.common.buffers import BaseBuffer  # for the Stable-Baselines3 buffer interface
+from stable_baselines3.common.type_aliases import ReplayBufferSamples  # for sampled batches
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rl.snake_env import BINARY_CHANNELS, BINARY_FEATURES, obs_type_of  # for the binary parts of observations
+
+
+# Contiguous runs of sorted flat positions
+def _runs(positions: np.ndarray) -> List[Tuple[int, int]]:
+    """
+    Returns [(start, stop), ...] covering the positions
+    """
+    runs: List[Tuple[int, int]] = []
+    for position in positions.tolist():
+        if runs and runs[-1][1] == position:
+            runs[-1] = (runs[-1][0], position + 1)
+        else:
+            runs.append((position, position + 1))
+    return runs
+
+
+class ObservationCodec:
+    """
+    Splits flattened observations into bit-packed binary values and the remaining dense values.
+
+    Binary values are the danger and direction features (0 or 1) of feature
+    vectors and the head, apple and wall channels (0 or 255) of board images;
+    they are stored with np.packbits. The rest keeps the observation dtype, or
+    dense_dtype (e.g. np.float16) if given. Binary positions decode to 0 or the
+    "on" value, so the encoding is lossless for SnakeEnv observations. Both parts
+    are copied as contiguous slices of the flattened observation.
+    """
+    def __init__(self, observation_space: spaces.Box, quantize: bool = True, dense_dtype=None):
+        shape = observation_space.shape
+        size = int(np.prod(shape))
+        if not quantize:
+            binary = np.zeros(0, dtype=np.int64)
+        elif obs_type_of(observation_space) == "grid":
+            binary = np.sort(np.arange(size).reshape(shape[0], -1)[list(BINARY_CHANNELS)].ravel())
+        else:
+            binary = np.array(BINARY_FEATURES, dtype=np.int64)
+
+        self.shape = shape
+        self.size = size
+        self.dtype = np.dtype(observation_space.dtype)
+        self.binary_runs = _runs(binary)
+        self.dense_runs = _runs(np.setdiff1d(np.arange(size), binary))
+        self.n_binary = len(binary)
+        self.n_dense = size - len(binary)
+        self.on_value = 255 if self.dtype == np.uint8 else 1
+        self.dense_dtype = np.dtype(dense_dtype or self.dtype)
+        self.bits_size = (self.n_binary + 7) // 8
+
+    # Encode a batch of observations
+    def encode(self, obs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns (bits, dense) with shapes (N, bits_size) uint8 and (N, n_dense)
+        """
+        flat = np.asarray(obs).reshape(len(obs), -1)
+        binary = np.concatenate([flat[:, start:stop] for start, stop in self.binary_runs], axis=1) if self.binary_runs else flat[:, :0]
+        dense = np.concatenate([flat[:, start:stop] for start, stop in self.dense_runs], axis=1) if self.dense_runs else flat[:, :0]
+        return np.packbits(binary != 0, axis=1), dense.astype(self.dense_dtype, copy=False)
+
+    # Decode a batch of encoded observations
+    def decode(self, bits: np.ndarray, dense: np.ndarray) -> np.ndarray:
+        """
+        Returns (N, *shape) observations in the observation dtype
+        """
+        out = np.empty((len(bits), self.size), dtype=self.dtype)
+        if self.n_binary:
+            values = np.unpackbits(bits, axis=1, count=self.n_binary)
+            on_value = self.dtype.type(self.on_value)
+            offset = 0
+            for start, stop in self.binary_runs:
+                np.multiply(values[:, offset:offset + stop - start], on_value, out=out[:, start:stop], casting="unsafe")
+                offset += stop - start
+        offset = 0
+        for start, stop in self.dense_runs:
+            out[:, start:stop] = dense[:, offset:offset + stop - start]
+            offset += stop - start
+        return out.reshape(len(bits), *self.shape)
+
+
+class SnakeReplayBuffer(BaseBuffer):
+    """
+    Replay buffer that stores every observation once, bit-packed where it is binary.
+
+    Each env column is a ring of observations: the next observation of slot i is
+    the observation in slot i + 1. Like Stable-Baselines3's optimize_memory_usage,
+    add() writes next_obs into the following slot (the next add overwrites it with
+    the reset observation after an episode end) and the slot at pos is never
+    sampled. Transitions that end an episode take the reset observation as
+    next observation, which the TD target masks with done; only truncated
+    episodes (TimeLimit.truncated) need their real final observation and keep
+    it aside, so timeouts are handled correctly.
+
+    Actions are stored as uint8 and dones/timeouts as bool. With storage_dir the
+    arrays are memory-mapped .npy files in that directory, so the buffer can be
+    larger than RAM.
+
+    Use with DQN(..., replay_buffer_class=SnakeReplayBuffer, replay_buffer_kwargs=dict(...)).
+    """
+    def __init__(
+        self,
+        buffer_size: int,
+        observation_space: spaces.Box,
+        action_space: spaces.Discrete,
+        device="auto",
+        n_envs: int = 1,
+        optimize_memory_usage: bool = False,
+        handle_timeout_termination: bool = True,
+        quantize: bool = True,
+        dense_dtype=None,
+        storage_dir: str | None = None,
+    ):
+        """
+        Args:
+            buffer_size: transitions kept over all env columns
+            observation_space, action_space, device, n_envs: as for Stable-Baselines3's ReplayBuffer
+            optimize_memory_usage: ignored, observations are always stored once
+            handle_timeout_termination: keep bootstrapping from truncated episodes
+            quantize: bit-pack the binary parts of the observations
+            dense_dtype: storage dtype of the other observation values (default: the observation dtype)
+            storage_dir: directory for memory-mapped storage (default: in memory)
+        """
+        super().__init__(buffer_size, observation_space, action_space, device, n_envs=n_envs)
+        if not isinstance(action_space, spaces.Discrete) or action_space.n > 256:
+            raise ValueError(f"SnakeReplayBuffer needs a Discrete action space with at most 256 actions, got {action_space}")
+        self.buffer_size = max(buffer_size // n_envs, 1)
+        self.handle_timeout_termination = handle_timeout_termination
+        self.codec = ObservationCodec(observation_space, quantize, dense_dtype)
+        self.storage_dir = storage_dir
+        if storage_dir is not None:
+            os.makedirs(storage_dir, exist_ok=True)
+
+        size = (self.buffer_size, n_envs)
+        self.obs_bits = self._allocate("obs_bits", (*size, self.codec.bits_size), np.uint8)
+        self.obs_dense = self._allocate("obs_dense", (*size, self.codec.n_dense), self.codec.dense_dtype)
+        self.actions = self._allocate("actions", size, np.uint8)
+        self.rewards = self._allocate("rewards", size, np.float32)
+        self.dones = self._allocate("dones", size, np.bool_)
+        self.timeouts = self._allocate("timeouts", size, np.bool_)
+
+        # Encoded final observations of truncated episodes by slot (pos * n_envs + env)
+        self.final_observations: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+
+    # Zeroed array, memory-mapped in storage_dir if set
+    def _allocate(self, name: str, shape: Tuple[int, ...], dtype) -> np.ndarray:
+        if self.storage_dir is None:
+            return np.zeros(shape, dtype=dtype)
+        path = os.path.join(self.storage_dir, f"{name}.npy")
+        return np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+
+    # Bytes used by the stored transitions
+    @property
+    def nbytes(self) -> int:
+        arrays = (self.obs_bits, self.obs_dense, self.actions, self.rewards, self.dones, self.timeouts)
+        finals = sum(bits.nbytes + dense.nbytes for bits, dense in self.final_observations.values())
+        return sum(array.nbytes for array in arrays) + finals
+
+    # Store one transition per env
+    def add(self, obs: np.ndarray, next_obs: np.ndarray, action: np.ndarray, reward: np.ndarray, done: np.ndarray, infos) -> None:
+        pos = self.pos
+        n_envs = self.n_envs
+        next_pos = (pos + 1) % self.buffer_size
+
+        # Final observations of the slot being overwritten are no longer needed
+        if self.final_observations:
+            for env_index in range(n_envs):
+                self.final_observations.pop(pos * n_envs + env_index, None)
+
+        # Encode obs and next_obs in one pass
+        bits, dense = self.codec.encode(np.concatenate([np.asarray(obs).reshape(n_envs, -1), np.asarray(next_obs).reshape(n_envs, -1)]))
+        next_bits, next_dense = bits[n_envs:], dense[n_envs:]
+        self.obs_bits[pos] = bits[:n_envs]
+        self.obs_dense[pos] = dense[:n_envs]
+        self.obs_bits[next_pos] = next_bits
+        self.obs_dense[next_pos] = next_dense
+
+        self.actions[pos] = np.asarray(action).reshape(n_envs)
+        self.rewards[pos] = np.asarray(reward).reshape(n_envs)
+        self.dones[pos] = np.asarray(done).reshape(n_envs)
+        if self.handle_timeout_termination:
+            timeouts = np.array([info.get("TimeLimit.truncated", False) for info in infos], dtype=bool)
+            self.timeouts[pos] = timeouts
+            for env_index in np.flatnonzero(timeouts):
+                self.final_observations[pos * n_envs + env_index] = (next_bits[env_index].copy(), next_dense[env_index].copy())
+
+        self.pos = next_pos
+        if next_pos == 0:
+            self.full = True
+
+    # Random minibatch (the slot at pos holds a next observation, not a transition)
+    def sample(self, batch_size: int, env=None) -> ReplayBufferSamples:
+        if self.full:
+            batch_inds = (np.random.randint(1, self.buffer_size, size=batch_size) + self.pos) % self.buffer_size
+        else:
+            batch_inds = np.random.randint(0, self.pos, size=batch_size)
+        return self._get_samples(batch_inds, env=env)
+
+    # Gather and decode the sampled transitions
+    def _get_samples(self, batch_inds: np.ndarray, env=None) -> ReplayBufferSamples:
+        env_indices = np.random.randint(0, high=self.n_envs, size=(len(batch_inds),))
+        # Observations and next observations in one gather over flat rows (slot * n_envs + env)
+        rows = np.concatenate([batch_inds, (batch_inds + 1) % self.buffer_size]) * self.n_envs + np.concatenate([env_indices, env_indices])
+        bits = self.obs_bits.reshape(-1, self.codec.bits_size).take(rows, axis=0)
+        dense = self.obs_dense.reshape(-1, self.codec.n_dense).take(rows, axis=0)
+        decoded = self.codec.decode(bits, dense)
+        obs, next_obs = decoded[:len(batch_inds)], decoded[len(batch_inds):]
+
+        # Truncated episodes bootstrap from their final observation, not the reset observation
+        slots = rows[:len(batch_inds)]
+        timeouts = self.timeouts.reshape(-1).take(slots)
+        for i in np.flatnonzero(timeouts):
+            bits, dense = self.final_observations[int(slots[i])]
+            next_obs[i] = self.codec.decode(bits[None], dense[None])[0]
+
+        dones = self.dones.reshape(-1).take(slots) & ~timeouts
+        data = (
+            self._normalize_obs(obs, env),
+            self.actions.reshape(-1).take(slots).astype(np.int64).reshape(-1, 1),
+            self._normalize_obs(next_obs, env),
+            dones.astype(np.float32).reshape(-1, 1),
+            self._normalize_reward(self.rewards.reshape(-1).take(slots).reshape(-1, 1), env),
+        )
+        return ReplayBufferSamples(*tuple(map(self.to_torch, data)))
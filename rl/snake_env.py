@@ -4,15 +4,279 @@ Gymnasium environment for Snake game with feature-based state representation.
 import numpy as np  # for numerical operations
 import gymnasium as gym  # for gymnasium environment
 from gymnasium import spaces  # for action and observation spaces
-from typing import Tuple, Dict, Any  # for type hints
+from typing import Tuple, Dict, Any, List, Sequence  # for type hints
 import sys  # for system operations
 import os  # for file operations
 import math  # for mathematical operations
+import struct  # for packing saved states
+import random  # for the entities' first placement
 
 # Added parent directory to path to import game entities
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from entitySnake import Snake
+from entitySnake import Snake, UP, LEFT, RIGHT, DIRECTION_OFFSETS, OPPOSITE_DIRECTIONS
 from entityApple import Apple
+from rl.render import BoardRenderer
+
+# Observation index of the first direction feature (one-hot by direction code)
+DIRECTION_FEATURE = 6
+
+# Observation features that are always 0 or 1 (danger straight/left/right and direction)
+BINARY_FEATURES = tuple(range(3, DIRECTION_FEATURE + 4))
+
+# Danger features are checked for these directions (straight, left, right)
+DANGER_DIRECTIONS = (UP, LEFT, RIGHT)
+DANGER_WALL = -1 # Move is flagged as a wall hit
+DANGER_NONE = -2 # Move leaves the board without being flagged
+
+# Channels of the grid observation (obs_type="grid")
+HEAD_CHANNEL = 0 # 255 on the head
+BODY_CHANNEL = 1 # Segment age: 255 on the head fading to 1 at the tail
+APPLE_CHANNEL = 2 # 255 on the apple
+WALL_CHANNEL = 3 # 255 on the border around the board
+GRID_CHANNELS = 4
+BINARY_CHANNELS = (HEAD_CHANNEL, APPLE_CHANNEL, WALL_CHANNEL) # Channels that are always 0 or 255
+NEVER_ENTERED = -(2**30) # Entry step of cells the head has not visited this episode
+
+# Uniform numbers pre-drawn per NumPy call by PredrawnRandom
+RANDOM_BLOCK_SIZE = 1024
+
+# Saved random state: PCG64 state and increment (two 64-bit words each), has_uint32, uinteger
+RNG_STATE_WORDS = 6
+UINT64_MASK = (1 << 64) - 1
+
+# Default pixel size of the board and its window (matching main.py)
+BOARD_PIXELS = 600
+WINDOW_SIZE = 700
+WINDOW_MARGIN = 50
+
+
+# Compute the pixel layout of a board
+def grid_layout(
+    grid_width: int = 600,
+    grid_height: int = 600,
+    step_size: int = 50,
+    cols: int | None = None,
+    rows: int | None = None,
+) -> Dict[str, int]:
+    """
+    Returns grid_width, grid_height, step_size, grid_left, grid_top, window_width, window_height
+
+    With cols and rows the board is sized in cells and the cell size is picked so the
+    board fits the default 600px area (at least 1px per cell). The window is 700x700
+    and grows for larger boards, keeping the grid 50px from the left, right and bottom.
+    """
+    if cols is not None or rows is not None:
+        if cols is None or rows is None:
+            raise ValueError("cols and rows must be given together")
+        step_size = max(1, BOARD_PIXELS // max(cols, rows))
+        grid_width = cols * step_size
+        grid_height = rows * step_size
+
+    window_width = max(WINDOW_SIZE, grid_width + 2 * WINDOW_MARGIN)
+    window_height = max(WINDOW_SIZE, grid_height + 2 * WINDOW_MARGIN)
+    return {
+        "grid_width": grid_width,
+        "grid_height": grid_height,
+        "step_size": step_size,
+        "grid_left": (window_width - grid_width) // 2,  # Centered horizontally
+        "grid_top": window_height - grid_height - WINDOW_MARGIN,  # 50px from bottom
+        "window_width": window_width,
+        "window_height": window_height,
+    }
+
+
+# Cell offset and distance normalization of the feature observations
+def observation_geometry(layout: Dict[str, int], sized_in_cells: bool) -> Tuple[float, float, float]:
+    """
+    Returns (col_offset, row_offset, max_distance)
+
+    Boards sized in cells (cols, rows) observe cells directly: no offset, and the
+    apple distance (of the board-normalized dx, dy) is divided by the diagonal
+    sqrt(2), so it stays in [0, 1] on any board. Boards sized in pixels keep the
+    original features that existing models were trained on: cells are offset by
+    the grid position in the window (the danger bits see the right and bottom
+    walls one cell early and never the left and top walls) and the distance is
+    divided by the pixel diagonal.
+    """
+    if sized_in_cells:
+        return 0.0, 0.0, math.sqrt(2)
+    step_size = layout["step_size"]
+    max_distance = math.sqrt(layout["grid_width"]**2 + layout["grid_height"]**2)
+    return layout["grid_left"] / step_size, layout["grid_top"] / step_size, max_distance
+
+
+# Compute the body channel from the step at which the head last entered each cell
+def body_ages(age: np.ndarray, length: np.ndarray | int) -> np.ndarray:
+    """
+    Returns age converted in place to body channel values: 255 on the head,
+    fading linearly to 1 at the tail, 0 on cells without a segment
+
+    Args:
+        age: head moves since each cell was last entered (int32, modified in place)
+        length: snake length, broadcast against age
+
+    Body segment i (0 = head) was placed i moves ago, so a cell is occupied
+    exactly when its latest entry is younger than the snake length.
+    """
+    np.minimum(age, length, out=age)
+    occupied = age < length
+    age *= 254
+    age //= np.maximum(np.asarray(length) - 1, 1)
+    np.subtract(255, age, out=age)
+    age *= occupied
+    return age
+
+
+# Create the observation space of the grid observation
+def grid_observation_space(cols: int, rows: int) -> spaces.Box:
+    """
+    Returns Box(0, 255, (4, rows + 2, cols + 2), uint8), channels first with a one-cell wall border
+    """
+    return spaces.Box(0, 255, shape=(GRID_CHANNELS, rows + 2, cols + 2), dtype=np.uint8)
+
+
+# rng_pos of states without a random stream (SnakeVecEnv boards share one generator)
+NO_RNG_POS = -2
+
+# Header of a saved board state (SnakeEnv.get_state, SnakeVecEnv.get_states) as
+# (name, struct code) pairs; the body cells (head first) follow the header
+STATE_FIELDS = (
+    ("length", "i"),
+    ("apple", "i"), # -1 if there is no apple
+    ("direction", "b"), # -1 before the first move
+    ("next_direction", "b"), # -1 if none is queued
+    ("direction_locked", "?"),
+    ("alive", "?"),
+    ("should_grow", "?"),
+    ("score", "q"),
+    ("steps_without_food", "i"),
+    ("episode_steps", "q"),
+    ("rng_state", f"{RNG_STATE_WORDS}Q"),
+    ("rng_pos", "i"), # -1 if the state has no pre-drawn block, NO_RNG_POS if it has no random stream
+)
+STATE_HEADER = struct.Struct("<" + "".join(code for _, code in STATE_FIELDS))
+
+
+# Layout of a saved board state
+def state_dtype(cols: int, rows: int, initial_length: int) -> np.dtype:
+    """
+    Returns the packed structured dtype of one board state: the STATE_FIELDS header
+    followed by the body cells, head first, in a fixed-size array (the longest
+    possible snake). Boards with up to 65536 cells store cells as uint16.
+    """
+    n_cells = cols * rows
+    fields = []
+    for name, code in STATE_FIELDS:
+        count = int(code[:-1] or 1)
+        fields.append((name, "<" + code[-1]) if count == 1 else (name, "<" + code[-1], (count,)))
+    fields.append(("body", "<u2" if n_cells <= 65536 else "<i4", (n_cells + initial_length,)))
+    return np.dtype(fields)
+
+
+# Observation type matching an observation space (e.g. of a trained model)
+def obs_type_of(observation_space: spaces.Space) -> str:
+    """
+    Returns "grid" for board images and "features" for the 11-feature vector
+    """
+    return "grid" if len(observation_space.shape) == 3 else "features"
+
+
+# Pack a PCG64 bit generator state into RNG_STATE_WORDS integers
+def pack_pcg64_state(state: Dict[str, Any]) -> Tuple[int, ...]:
+    if state["bit_generator"] != "PCG64":
+        raise ValueError(f"Only PCG64 generators can be saved, got {state['bit_generator']}")
+    value, inc = state["state"]["state"], state["state"]["inc"]
+    return (value & UINT64_MASK, value >> 64, inc & UINT64_MASK, inc >> 64, state["has_uint32"], state["uinteger"])
+
+
+# Inverse of pack_pcg64_state
+def unpack_pcg64_state(words: Sequence[int]) -> Dict[str, Any]:
+    return {
+        "bit_generator": "PCG64",
+        "state": {"state": words[0] | words[1] << 64, "inc": words[2] | words[3] << 64},
+        "has_uint32": words[4],
+        "uinteger": words[5],
+    }
+
+
+class PredrawnRandom:
+    """
+    Random number source for the Snake and Apple entities, backed by a NumPy Generator.
+
+    Uniform floats in [0, 1) are drawn block_size at a time and randrange(n)
+    maps the next one to int(u * n) (always < n for float64 u), so a random
+    cell costs a list lookup instead of a Generator call. Implements the
+    randrange, randint, choice and random methods the entities use.
+
+    get_state() captures the generator state at the start of the current block
+    and the position in it, so set_state() redraws the same block (or keeps it
+    when it is already loaded) and continues with the same numbers.
+    """
+    def __init__(self, generator: np.random.Generator, block_size: int = RANDOM_BLOCK_SIZE):
+        self.block_size = block_size
+        self.set_generator(generator)
+
+    # Draw from a new generator (e.g. after reset(seed=...)) and drop the pre-drawn numbers
+    def set_generator(self, generator: np.random.Generator) -> None:
+        self.generator = generator
+        self._block: list = []
+        self._block_state: Dict[str, Any] | None = None # Generator state before the block was drawn
+        self._block_words: Tuple[int, ...] | None = None # _block_state packed by get_state
+        self._pos = 0
+
+    # Next uniform float in [0, 1)
+    def random(self) -> float:
+        pos = self._pos
+        if pos == len(self._block):
+            self._block_state = self.generator.bit_generator.state
+            self._block_words = None
+            self._block = self.generator.random(self.block_size).tolist()
+            pos = 0
+        self._pos = pos + 1
+        return self._block[pos]
+
+    # Random integer in range(start, stop) (or range(start) like random.randrange)
+    def randrange(self, start: int, stop: int | None = None) -> int:
+        if stop is None:
+            return int(self.random() * start)
+        return start + int(self.random() * (stop - start))
+
+    # Random integer in [a, b]
+    def randint(self, a: int, b: int) -> int:
+        return a + int(self.random() * (b - a + 1))
+
+    # Random element of a non-empty sequence
+    def choice(self, seq):
+        return seq[int(self.random() * len(seq))]
+
+    # Compact snapshot of the random stream
+    def get_state(self) -> Tuple[Tuple[int, ...], int]:
+        """
+        Returns (RNG_STATE_WORDS uint64 words of the PCG64 state at the start of
+        the block, position in the block or -1 if no block was drawn yet)
+        """
+        if self._block_state is None:
+            return pack_pcg64_state(self.generator.bit_generator.state), -1
+        if self._block_words is None:
+            self._block_words = pack_pcg64_state(self._block_state)
+        return self._block_words, self._pos
+
+    # Continue the random stream from a get_state snapshot
+    def set_state(self, words: Sequence[int], pos: int) -> None:
+        words = tuple(words)
+        if pos < 0:
+            self.generator.bit_generator.state = unpack_pcg64_state(words)
+            self._block = []
+            self._block_state = self._block_words = None
+            self._pos = 0
+            return
+
+        # Redraw the block unless it is the one already loaded
+        if self._block_state is None or words != self.get_state()[0]:
+            self.generator.bit_generator.state = self._block_state = unpack_pcg64_state(words)
+            self._block_words = words
+            self._block = self.generator.random(self.block_size).tolist()
+        self._pos = pos
 
 
 class SnakeEnv(gym.Env):
@@ -24,13 +288,32 @@ class SnakeEnv(gym.Env):
     - [3-5]: Danger detection (straight, left, right)
     - [6-9]: Current direction (one-hot: up, down, left, right)
     - [10]: Normalized snake length
+
+    With obs_type="grid" the observation is a (4, rows + 2, cols + 2) uint8 board
+    image instead (channels: head, body age, apple, walls), for CnnPolicy.
     
     Action space: Discrete(4)
     - 0: UP
     - 1: DOWN
     - 2: LEFT
     - 3: RIGHT
+
+    Render modes: "human" (pygame window) and "rgb_array" (NumPy frame from BoardRenderer).
+
+    The board is either given in pixels (grid_width, grid_height, step_size) or
+    directly in cells (cols, rows); game logic only uses integer cells and the
+    pixel layout is used for rendering and the observation normalization.
+
+    Start cells and apple spawns are drawn from the environment's own np_random
+    (through PredrawnRandom), so reset(seed=s) followed by the same actions
+    always replays the same episodes, independent of other environments.
+
+    get_state() saves the complete game state (body, direction, apple, counters
+    and random stream) in a fixed-size byte buffer and set_state() restores it in
+    O(length), for lookahead planners and replaying episodes from any step.
     """    
+    metadata = {"render_modes": ["human", "rgb_array"], "render_fps": 10}
+
     # Initialize snake environment
     def __init__(
         self,
@@ -39,51 +322,203 @@ class SnakeEnv(gym.Env):
         step_size: int = 50,
         initial_length: int = 5,
         render_mode: str | None = None,
+        copy_obs: bool = True,
+        reuse_info: bool = False,
+        cols: int | None = None,
+        rows: int | None = None,
+        copy_frame: bool = True,
+        obs_type: str = "features",
     ):
         # Initialize superclass gym
         super().__init__()
 
-        # Initialize grid dimensions
-        self.grid_width = grid_width
-        self.grid_height = grid_height
-        self.step_size = step_size
+        # Initialize grid dimensions (cols and rows override the pixel size)
+        layout = grid_layout(grid_width, grid_height, step_size, cols, rows)
+        grid_width = self.grid_width = layout["grid_width"]
+        grid_height = self.grid_height = layout["grid_height"]
+        step_size = self.step_size = layout["step_size"]
         self.initial_length = initial_length
         
-        # Grid dimensions (cols, rows, max_distance)
+        # Grid dimensions (cols, rows)
         self.grid_cols = grid_width / step_size
         self.grid_rows = grid_height / step_size
 
-        # Max distance is the diagonal of the grid and used for normalization
-        self.max_distance = math.sqrt(grid_width**2 + grid_height**2)
-        
-        # Grid boundaries (centered in 700x700 window, matching main.py)
-        WINDOW_SIZE = 700
-        self.grid_left = (WINDOW_SIZE - grid_width) // 2  # Centered horizontally
-        self.grid_top = WINDOW_SIZE - grid_height - 50  # 50px from bottom
+        # Grid boundaries and window size (700x700 for the default board, matching main.py)
+        self.window_width = layout["window_width"]
+        self.window_height = layout["window_height"]
+        self.grid_left = layout["grid_left"]
+        self.grid_top = layout["grid_top"]
         self.grid_right = self.grid_left + grid_width
         self.grid_bottom = self.grid_top + grid_height
+
+        # Offset of the grid in cells and distance normalization (window coordinates
+        # and pixel diagonal for pixel-sized boards, see observation_geometry)
+        self.sized_in_cells = cols is not None
+        self.col_offset, self.row_offset, self.max_distance = observation_geometry(layout, self.sized_in_cells)
+
+        # Integer board size and max length used for normalization
+        self.cols = grid_width // step_size
+        self.rows = grid_height // step_size
+        self.max_length = self.grid_cols * self.grid_rows
+
+        # Observation buffer (returned directly when copy_obs is False)
+        self.copy_obs = copy_obs
+        self._obs = np.zeros(11, dtype=np.float32)
+        self._obs_direction = None # Direction currently set in the one-hot features
+        self._build_danger_tables()
+
+        # Grid observation buffers (obs_type="grid"), updated incrementally every step
+        if obs_type not in ("features", "grid"):
+            raise ValueError(f"Unknown obs_type: {obs_type}")
+        self.obs_type = obs_type
+        if obs_type == "grid":
+            self._init_grid()
+
+        # Info dict (updated in place and returned on every step when reuse_info is True)
+        self.reuse_info = reuse_info
+        self._info: Dict[str, Any] = {"score": 0, "snake_length": 0, "steps_without_food": 0}
         
         # Define action space (4 possible moves aka the directions)
         self.action_space = spaces.Discrete(4)
         
-        # Define observation space (11 features, range [-1, 1])
-        self.observation_space = spaces.Box(-1, 1, shape=(11,))
+        # Define observation space (11 features, range [-1, 1], or the board image)
+        if obs_type == "grid":
+            self.observation_space = grid_observation_space(self.cols, self.rows)
+        else:
+            self.observation_space = spaces.Box(-1, 1, shape=(11,))
         
         # Rendering
         self.render_mode = render_mode
+        self.copy_frame = copy_frame # rgb_array frames are copies unless copy_frame is False
         self.window = None
         self.clock = None
-        self.screen = None
+        self.renderer = None # BoardRenderer, created on the first frame
         
         # Initialize game state variables
         self.snake = None # Snake entity
         self.apple = None # Apple entity
+        self.rng = None # PredrawnRandom over np_random, shared by the entities
+        self._state_dtype = state_dtype(self.cols, self.rows, initial_length) # get_state layout
+        self._state_body_type = self._state_dtype.fields["body"][0] # Body cells array type
         self.score = 0 # Score
         self.steps_without_food = 0 # Steps without food
         self.max_steps_without_food = 1000 # Prevent infinite games
+        self.profiler = None # PhaseTimer while profiling is enabled (rl/profiling.py)
     
 
 
+    # Build per-cell lookup tables for the danger features
+    def _build_danger_tables(self) -> None:
+        """
+        For each danger direction (UP, LEFT, RIGHT) and head cell, stores the
+        neighbouring cell index, DANGER_WALL if the move is flagged as a wall
+        hit, or DANGER_NONE if it can never be dangerous
+        """
+        self._danger_neighbors = []
+        for direction in DANGER_DIRECTIONS:
+            col_offset, row_offset = DIRECTION_OFFSETS[direction]
+            neighbors = []
+            for row in range(self.rows):
+                for col in range(self.cols):
+                    next_col = col + col_offset
+                    next_row = row + row_offset
+                    # Wall hit when the neighbour falls outside the board in observation coordinates
+                    # (cell-sized boards: exactly off the board; pixel-sized: the legacy offset edges)
+                    next_x = next_col + self.col_offset
+                    next_y = next_row + self.row_offset
+                    if next_x < 0 or next_x >= self.grid_cols or next_y < 0 or next_y >= self.grid_rows:
+                        neighbors.append(DANGER_WALL)
+                    elif 0 <= next_col < self.cols and 0 <= next_row < self.rows:
+                        neighbors.append(next_row * self.cols + next_col)
+                    else:
+                        neighbors.append(DANGER_NONE)
+            self._danger_neighbors.append(neighbors)
+
+
+
+    # Allocate the grid observation buffers
+    def _init_grid(self) -> None:
+        # Board image with a one-cell border; the wall channel never changes
+        self._grid = np.zeros((GRID_CHANNELS, self.rows + 2, self.cols + 2), dtype=np.uint8)
+        self._grid[WALL_CHANNEL] = 255
+        self._grid[WALL_CHANNEL, 1:-1, 1:-1] = 0
+        self._grid_flat = self._grid.reshape(GRID_CHANNELS, -1)
+        self._grid_body = self._grid[BODY_CHANNEL, 1:-1, 1:-1]
+
+        # Head moves this episode and the move at which the head last entered each cell
+        self._grid_moves = 0
+        self._entered = np.full(self.rows * self.cols, NEVER_ENTERED, dtype=np.int32)
+        self._ages = np.zeros((self.rows, self.cols), dtype=np.int32)
+
+        # Body channel value of every age for the current snake length (rebuilt when it grows)
+        self._age_table = np.zeros(1, dtype=np.uint8)
+        self._age_table_length = -1
+
+        # Cells currently set in the head and apple channels (padded indices, -1 if none)
+        self._grid_head = -1
+        self._grid_apple = -1
+
+
+
+    # Index of a cell in the padded board image
+    def _padded_index(self, cell: int) -> int:
+        return cell + self.cols + 3 + 2 * (cell // self.cols)
+
+
+
+    # Write the board into the grid observation buffer
+    def _get_grid_obs(self) -> np.ndarray:
+        """
+        Returns the (4, rows + 2, cols + 2) uint8 board image
+
+        Head and apple are moved in place and the body channel is looked up from
+        the per-cell entry moves, so no Python loop over the body is needed.
+        """
+        flat = self._grid_flat
+        snake = self.snake
+        head = snake.body[0]
+
+        # Head channel
+        padded = self._padded_index(head)
+        if padded != self._grid_head:
+            if self._grid_head >= 0:
+                flat[HEAD_CHANNEL, self._grid_head] = 0
+            flat[HEAD_CHANNEL, padded] = 255
+            self._grid_head = padded
+
+        # Apple channel (the apple stays under the head when the board is full)
+        apple = self._padded_index(self.apple.cell) if self.apple.cell != head else -1
+        if apple != self._grid_apple:
+            if self._grid_apple >= 0:
+                flat[APPLE_CHANNEL, self._grid_apple] = 0
+            if apple >= 0:
+                flat[APPLE_CHANNEL, apple] = 255
+            self._grid_apple = apple
+
+        # Body channel from the age of every cell
+        length = len(snake)
+        if length != self._age_table_length:
+            self._age_table = body_ages(np.arange(length + 1, dtype=np.int32), length).astype(np.uint8)
+            self._age_table_length = length
+        ages = np.subtract(self._grid_moves, self._entered.reshape(self.rows, self.cols), out=self._ages)
+        np.minimum(ages, length, out=ages)
+        self._grid_body[...] = self._age_table[ages]
+
+        return self._grid.copy() if self.copy_obs else self._grid
+
+
+
+    # Clear the grid observation for a new episode
+    def _reset_grid(self) -> None:
+        self._grid[:WALL_CHANNEL] = 0
+        self._grid_head = -1
+        self._grid_apple = -1
+        self._grid_moves = 0
+        self._entered.fill(NEVER_ENTERED)
+        self._entered[self.snake.body[0]] = 0
+
+
+
     # Extract feature-based state representation
     def _get_obs(self) -> np.ndarray:
         """        
@@ -99,95 +534,80 @@ class SnakeEnv(gym.Env):
             9. direction_left: 1 if moving left, 0 otherwise
             10. direction_right: 1 if moving right, 0 otherwise
             11. normalized_length: Snake length normalized by max possible length
+
+        Features are written into a preallocated buffer, a copy is returned
+        unless the env was created with copy_obs=False.
+
+        With obs_type="grid" the board image is returned instead (see _get_grid_obs).
         """
         # Case if snake or apple is not initialized
         if self.snake is None or self.apple is None:
-            return np.zeros(11, dtype=np.float32)
-        
-        # Get snake head position
-        head = self.snake.segments[0]
-        
-        # Convert pixel coordinates to grid coordinates
-        head_col = head.x / self.step_size
-        head_row = head.y / self.step_size
-        apple_col = self.apple.x / self.step_size
-        apple_row = self.apple.y / self.step_size
+            return np.zeros(self.observation_space.shape, dtype=self.observation_space.dtype)
+
+        if self.obs_type == "grid":
+            return self._get_grid_obs()
+
+        obs = self._obs
+        snake = self.snake
+        head = snake.body[0]
+        head_row, head_col = divmod(head, self.cols)
         
         # Calculate apple position features (dx, dy, distance)
         # Normalize by grid dimensions
-        apple_dx = (apple_col - head_col) / self.grid_cols
-        apple_dy = (apple_row - head_row) / self.grid_rows
-        apple_dist = math.sqrt(apple_dx**2 + apple_dy**2) / self.max_distance
+        apple_dx = (self.apple.col - head_col) / self.grid_cols
+        apple_dy = (self.apple.row - head_row) / self.grid_rows
+        obs[0] = apple_dx
+        obs[1] = apple_dy
+        obs[2] = math.sqrt(apple_dx**2 + apple_dy**2) / self.max_distance
 
-        # Calculate danger features (straight, left, right)
-        danger_straight = self._check_danger((head_col, head_row), "UP")
-        danger_left = self._check_danger((head_col, head_row), "LEFT")
-        danger_right = self._check_danger((head_col, head_row), "RIGHT")
-        
-        # Calculate direction features (one-hot encoding)
-        direction_up = 1 if self.snake.direction == "UP" else 0
-        direction_down = 1 if self.snake.direction == "DOWN" else 0
-        direction_left = 1 if self.snake.direction == "LEFT" else 0
-        direction_right = 1 if self.snake.direction == "RIGHT" else 0
+        # Calculate danger features (straight, left, right) from the lookup tables
+        occupancy = snake.occupancy
+        up, left, right = self._danger_neighbors
+        neighbor = up[head]
+        obs[3] = neighbor == DANGER_WALL or (neighbor >= 0 and occupancy[neighbor] > 0)
+        neighbor = left[head]
+        obs[4] = neighbor == DANGER_WALL or (neighbor >= 0 and occupancy[neighbor] > 0)
+        neighbor = right[head]
+        obs[5] = neighbor == DANGER_WALL or (neighbor >= 0 and occupancy[neighbor] > 0)
+        
+        # Update direction features (one-hot encoding) only when the direction changed
+        if snake.direction != self._obs_direction:
+            if self._obs_direction is not None:
+                obs[DIRECTION_FEATURE + self._obs_direction] = 0.0
+            if snake.direction is not None:
+                obs[DIRECTION_FEATURE + snake.direction] = 1.0
+            self._obs_direction = snake.direction
         
         # Calculate normalized snake length
         # Normalize by total cells on grid
-        max_length = self.grid_cols * self.grid_rows  # Total cells on grid
-        normalized_len = len(self.snake.segments) / max_length
-        
-        # Return numpy array with all 11 features
-        return np.array([apple_dx, apple_dy, apple_dist, danger_straight, danger_left, danger_right, direction_up, direction_down, direction_left, direction_right, normalized_len], dtype=np.float32)
-        
-
-
-    # Check if moving in the given direction would result in collision
-    def _check_danger(self, head_pos: Tuple[int, int], direction: str) -> bool:
-        """        
-        Returns True if danger of collision, False if safe
-        """
-        # Case if snake is not initialized or empty
-        if self.snake is None or len(self.snake.segments) == 0:
-            return False
-        
-        # Current head position in grid coordinates
-        head_col, head_row = head_pos[0], head_pos[1]
-        
-        # Convert direction string to coordinate offsets
-        direction_offsets = {
-            "UP": (0, -1),
-            "DOWN": (0, 1),
-            "LEFT": (-1, 0),
-            "RIGHT": (1, 0),
-        }
-        col_offset, row_offset = direction_offsets[direction]
+        obs[10] = len(snake) / self.max_length
         
-        # Next position based on direction
-        next_col = head_col + col_offset
-        next_row = head_row + row_offset
-
-        # Check wall collision (out of bounds)
-        if next_col < 0 or next_col >= self.grid_cols or next_row < 0 or next_row >= self.grid_rows:
-            return True
-        
-        # Check body collision (collision with snake segments)
-        for segment in self.snake.segments[1:]:
-            if segment.x / self.step_size == next_col and segment.y / self.step_size == next_row:
-                return True
+        return obs.copy() if self.copy_obs else obs
         
-        # No collision
-        return False
-    
 
     
     # Get additional info
     def _get_info(self) -> Dict[str, Any]:
         """
         Returns dict with score, snake_length, steps_without_food
+
+        With reuse_info the same dict is updated and returned every time.
         """
+        if self.reuse_info:
+            info = self._info
+            # Drop keys added by wrappers (e.g. Monitor's "episode")
+            if len(info) != 3:
+                for key in [key for key in info if key not in ("score", "snake_length", "steps_without_food")]:
+                    del info[key]
+            info["score"] = self.score
+            info["snake_length"] = len(self.snake) if self.snake else 0
+            info["steps_without_food"] = self.steps_without_food
+            return info
+
         # Return info dictionary
         return {
              "score": self.score,
-             "snake_length": len(self.snake.segments) if self.snake else 0,
+             "snake_length": len(self.snake) if self.snake else 0,
              "steps_without_food": self.steps_without_food,
         }
         
@@ -202,34 +622,50 @@ class SnakeEnv(gym.Env):
             seed: Random seed for reproducibility
         """
         super().reset(seed=seed)
-        
-        # Initialize Snake
-        self.snake = Snake(
-            grid_left=self.grid_left,
-            grid_top=self.grid_top,
-            grid_width=self.grid_width,
-            grid_height=self.grid_height,
-            step=self.step_size,
-            initial_length=self.initial_length,
-        )
-        
-        # Initialize Apple
-        self.apple = Apple(
-            grid_left=self.grid_left,
-            grid_top=self.grid_top,
-            grid_width=self.grid_width,
-            grid_height=self.grid_height,
-            cell_size=self.step_size,
-            size=self.step_size,
-        )
+
+        # Initialize Snake and Apple once, later resets reuse the board arrays
+        if self.snake is None:
+            # The constructors place a first snake and apple from a throwaway source,
+            # so a seeded first episode matches any later reset with the same seed
+            placement = random.Random(0)
+            self.snake = Snake(
+                cols=self.cols,
+                rows=self.rows,
+                initial_length=self.initial_length,
+                grid_left=self.grid_left,
+                grid_top=self.grid_top,
+                step=self.step_size,
+                rng=placement,
+            )
+            self.apple = Apple(
+                cols=self.cols,
+                rows=self.rows,
+                grid_left=self.grid_left,
+                grid_top=self.grid_top,
+                cell_size=self.step_size,
+                size=self.step_size,
+                rng=placement,
+            )
+            self.rng = PredrawnRandom(self.np_random)
+            self.snake.rng = self.apple.rng = self.rng
+        elif seed is not None:
+            # A seed replaces np_random, drop the numbers drawn from the old one
+            self.rng.set_generator(self.np_random)
+        self.snake.reset(self.initial_length)
         
         # Spawn apple in valid position (not on snake)
-        self.apple.spawn_random(self.snake.segments)
+        self.apple.spawn_random(free_cells=self.snake.free_cells)
         
         # Set tracking variables
         self.score = 0
         self.steps_without_food = 0
         self.episode_steps = 0
+
+        # Clear the observation buffers
+        self._obs[:] = 0.0
+        self._obs_direction = None
+        if self.obs_type == "grid":
+            self._reset_grid()
         
         # Get initial observation and info
         observation = self._get_obs()
@@ -252,27 +688,26 @@ class SnakeEnv(gym.Env):
         Args: action: 0=UP, 1=DOWN, 2=LEFT, 3=RIGHT
         """
         # Convert action to int if it's a numpy array
-        if isinstance(action, np.ndarray):
-            action = int(action.item())
-        else:
-            action = int(action)
-        
-        # Convert action to direction string
-        action_to_direction = {0: "UP", 1: "DOWN", 2: "LEFT", 3: "RIGHT"}
-        direction = action_to_direction[action]
+        if action.__class__ is not int:
+            action = int(action.item()) if isinstance(action, np.ndarray) else int(action)
         
-        # Set snake direction (prevent 180-degree turns)
-        self.snake.direction_locked = False
-        opposites = {"UP": "DOWN", "DOWN": "UP", "LEFT": "RIGHT", "RIGHT": "LEFT"}
+        # Set snake direction (actions are direction codes, prevent 180-degree turns)
+        snake = self.snake
+        snake.direction_locked = False
         
-        if self.snake.direction is None:
-            self.snake.direction = direction
-        elif direction != opposites[self.snake.direction]:
-            self.snake.next_direction = direction
-            self.snake.direction_locked = True
+        if snake.direction is None:
+            snake.direction = action
+        elif action != OPPOSITE_DIRECTIONS[snake.direction]:
+            snake.next_direction = action
+            snake.direction_locked = True
         
         # Update snake and check if alive
-        alive = self.snake.update()
+        alive = snake.update()
+
+        # Record when the head entered its cell (grid observation body ages)
+        if alive and self.obs_type == "grid":
+            self._grid_moves += 1
+            self._entered[snake.body[0]] = self._grid_moves
         
         # Increment episode step counter
         self.episode_steps += 1
@@ -287,14 +722,18 @@ class SnakeEnv(gym.Env):
             reward = -30.0 # Negative reward for dying
             terminated = True # Episode ended (snake died)
 
-        elif self.apple.x == self.snake.segments[0].x and self.apple.y == self.snake.segments[0].y:
+        elif snake.body[0] == self.apple.cell:
             reward = 5.0 # Positive reward for eating apple
-            self.snake.grow() # Grow snake
+            snake.grow() # Grow snake
             self.score += 100 # Increment score (100 points per apple)
-            self.apple.spawn_random(self.snake.segments) # Spawn new apple
             self.steps_without_food = 0 # Reset counter
+            if len(snake.free_cells) == 0:
+                reward = 100.0 # Bonus reward for winning (no cell left for an apple)
+                terminated = True
+            else:
+                self.apple.spawn_random(free_cells=snake.free_cells) # Spawn new apple
 
-        elif len(self.snake.segments) == self.grid_cols * self.grid_rows:
+        elif len(snake) == self.max_length:
             reward = 100.0 # Bonus reward for winning (filled grid)
             terminated = True # Episode ended (snake won)
 
@@ -318,12 +757,109 @@ class SnakeEnv(gym.Env):
         # Return new observation, reward, terminated, truncated, info
         return observation, reward, terminated, truncated, info
     
+    # Size in bytes of a get_state buffer
+    @property
+    def state_size(self) -> int:
+        return self._state_dtype.itemsize
+
+    # Save the complete game state
+    def get_state(self, out: np.ndarray | None = None) -> np.ndarray:
+        """
+        Returns the state as a (state_size,) uint8 buffer (written into out if given).
+        The layout is state_dtype; unused body slots are zero, so equal game states
+        give equal bytes.
+        """
+        if out is None:
+            out = np.zeros(self.state_size, dtype=np.uint8)
+        snake = self.snake
+        length = len(snake)
+        rng_words, rng_pos = self.rng.get_state()
+        STATE_HEADER.pack_into(
+            out, 0,
+            length,
+            self.apple.cell,
+            -1 if snake.direction is None else snake.direction,
+            -1 if snake.next_direction is None else snake.next_direction,
+            snake.direction_locked,
+            snake.alive,
+            snake.should_grow,
+            self.score,
+            self.steps_without_food,
+            self.episode_steps,
+            *rng_words,
+            rng_pos,
+        )
+        body = self._state_body(out)
+        body[:length] = snake.body
+        body[length:] = 0
+        return out
+
+    # Restore a state saved by get_state
+    def set_state(self, state: np.ndarray | bytes, restore_rng: bool = True) -> np.ndarray:
+        """
+        Returns the observation of the restored state. Runs in O(length) of the
+        previous and restored snakes. With restore_rng=False, or for states without a
+        random stream (SnakeVecEnv.get_states), the env keeps its own random stream
+        (e.g. a planner sampling apple spawns instead of replaying them).
+        """
+        if self.snake is None:
+            self.reset()
+        header = STATE_HEADER.unpack_from(state)
+        length, apple, direction, next_direction = header[:4]
+        cells = self._state_body(state)[:length].tolist()
+
+        snake = self.snake
+        snake.set_body(cells)
+        snake.direction = None if direction < 0 else direction
+        snake.next_direction = None if next_direction < 0 else next_direction
+        snake.direction_locked, snake.alive, snake.should_grow = header[4:7]
+        self.apple.place(apple if apple >= 0 else cells[0])
+        self.score, self.steps_without_food, self.episode_steps = header[7:10]
+        rng_pos = header[10 + RNG_STATE_WORDS]
+        if restore_rng and rng_pos != NO_RNG_POS:
+            self.rng.set_state(header[10:10 + RNG_STATE_WORDS], rng_pos)
+
+        # Cell entry moves are rebuilt from the body: the most recent entry of a
+        # cell is its first occurrence from the head, older entries become stale
+        if self.obs_type == "grid":
+            moves = self._grid_moves + length + 1
+            if moves >= -NEVER_ENTERED:
+                self._entered.fill(NEVER_ENTERED)
+                moves = length
+            self._grid_moves = moves
+            entered = self._entered
+            for age in range(length - 1, -1, -1):
+                entered[cells[age]] = moves - age
+
+        return self._get_obs()
+
+    # Body cells of a state buffer (a view)
+    def _state_body(self, state: np.ndarray | bytes) -> np.ndarray:
+        body = self._state_body_type
+        return np.frombuffer(state, dtype=body.base, count=body.shape[0], offset=STATE_HEADER.size)
+
     # Render the environment
     def render(self):
         if self.render_mode == "rgb_array":
             return self._render_frame()
     
-    # Render a frame using pygame
+    # Time step/reset/render phases (nothing is timed, and nothing costs extra, until enabled)
+    def enable_profiling(self, enabled: bool = True):
+        """
+        Returns the PhaseTimer collecting the timings (None when disabled)
+
+        step, reset, render and the methods they call are replaced by timed
+        versions on this instance (see rl.profiling.instrument_env).
+        """
+        from rl.profiling import instrument_env, remove_instrumentation
+        if enabled and self.profiler is None:
+            self.profiler = instrument_env(self)
+        elif not enabled and self.profiler is not None:
+            remove_instrumentation(self)
+            self.profiler = None
+        return self.profiler
+
+    # Render a frame
     def _render_frame(self):
         if self.render_mode is None:
             return
@@ -333,52 +869,40 @@ class SnakeEnv(gym.Env):
         if self.window is None and self.render_mode == "human":
             pygame.init()
             pygame.display.init()
-            self.window = pygame.display.set_mode((700, 700))
+            self.window = pygame.display.set_mode((self.window_width, self.window_height))
             pygame.display.set_caption("Snake RL - Playing")
         
         if self.clock is None and self.render_mode == "human":
             self.clock = pygame.time.Clock()
         
-        if self.screen is None:
-            self.screen = pygame.Surface((700, 700))
-        
-        # Colors
-        BG = (0, 0, 0)
-        SNAKE_COLOR = (36, 140, 15)
-        APPLE_COLOR = (255, 0, 0)
-        GRID_OUTLINE = (60, 60, 60)
-        
-        # Draw background
-        self.screen.fill(BG)
-        pygame.draw.rect(
-            self.screen,
-            GRID_OUTLINE,
-            (self.grid_left, self.grid_top, self.grid_width, self.grid_height),
-            width=2,
-        )
-        
-        # Draw apple
-        if self.apple:
-            self.apple.draw(self.screen, APPLE_COLOR)
-        
-        # Draw snake
-        if self.snake:
-            self.snake.draw(self.screen, SNAKE_COLOR)
+        if self.renderer is None:
+            self.renderer = BoardRenderer(
+                self.cols,
+                self.rows,
+                self.step_size,
+                self.grid_left,
+                self.grid_top,
+                self.grid_width,
+                self.grid_height,
+                self.window_width,
+                self.window_height,
+            )
         
-        # Draw score
-        font = pygame.font.Font(None, 36)
-        score_text = font.render(f"Score: {self.score}", True, (255, 255, 255))
-        self.screen.blit(score_text, (20, 20))
+        # Draw the board, apple, snake and score into the frame buffer
+        frame = self.renderer.render(
+            self.snake.body if self.snake else (),
+            self.apple.cell if self.apple else -1,
+            self.score,
+            copy=self.copy_frame and self.render_mode == "rgb_array",
+        )
         
         if self.render_mode == "human":
-            self.window.blit(self.screen, self.window.get_rect())
+            pygame.surfarray.blit_array(self.window, frame.transpose(1, 0, 2))
             pygame.event.pump()
             pygame.display.update()
-            self.clock.tick(10)  # 10 FPS for play (faster than training)
+            self.clock.tick(self.metadata["render_fps"])  # 10 FPS for play (faster than training)
         else:  # rgb_array
-            return np.transpose(
-                np.array(pygame.surfarray.pixels3d(self.screen)), axes=(1, 0, 2)
-            )
+            return frame
     
     # Clean up resources
     def close(self):
@@ -0,0 +1,366 @@
+"""
+Non-learned Snake solver: a Hamiltonian cycle with safe shortcuts toward the apple.
+"""
+import os  # for file operations
+import sys  # for system operations
+from collections import deque  # for the virtual snake
+from typing import Dict, List, Tuple  # for type hints
+
+import numpy as np  # for the cached cycle tables
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from entitySnake import OPPOSITE_DIRECTIONS, move_table  # for direction codes and neighbor cells
+from rl.snake_env import SnakeEnv  # for the environment being played
+
+# Where cycle tables are cached between runs (override with SNAKE_RL_CACHE)
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "snake_rl")
+
+# Free cells kept between the head and the tail (besides pending growth) when taking a shortcut
+SHORTCUT_MARGIN = 3
+
+# Cycles per board size, see hamiltonian_cycle
+_CYCLES: Dict[Tuple[int, int], np.ndarray] = {}
+
+
+# Build a Hamiltonian cycle over a board with an even number of rows
+def _build_cycle(cols: int, rows: int) -> List[int]:
+    """
+    Returns the cells in cycle order: right along row 0, zigzag through columns 1..
+    on the other rows, back up column 0
+    """
+    cycle = [col for col in range(cols)]
+    for row in range(1, rows):
+        columns = range(cols - 1, 0, -1) if row % 2 else range(1, cols)
+        cycle.extend(row * cols + col for col in columns)
+    cycle.extend(row * cols for row in range(rows - 1, 0, -1))
+    return cycle
+
+
+# Hamiltonian cycle of a board, cached in memory and on disk
+def hamiltonian_cycle(cols: int, rows: int, cache_dir: str | None = None) -> np.ndarray:
+    """
+    Returns the (cols * rows,) int32 cells in cycle order. Needs an even number of
+    rows or columns (a board with an odd number of cells has no Hamiltonian cycle).
+    """
+    cycle = _CYCLES.get((cols, rows))
+    if cycle is not None:
+        return cycle
+    if cols < 2 or rows < 2 or (cols % 2 and rows % 2):
+        raise ValueError(f"A {cols}x{rows} board has no Hamiltonian cycle")
+
+    cache_dir = cache_dir or os.environ.get("SNAKE_RL_CACHE", DEFAULT_CACHE_DIR)
+    path = os.path.join(cache_dir, "cycles", f"{cols}x{rows}.npy")
+    try:
+        cycle = np.load(path)
+    except (OSError, ValueError):
+        cycle = None
+    if cycle is None or cycle.shape != (cols * rows,):
+        if rows % 2 == 0:
+            cells = _build_cycle(cols, rows)
+        else:
+            # Transpose the cycle of the (rows, cols) board
+            cells = [(cell % rows) * cols + cell // rows for cell in _build_cycle(rows, cols)]
+        cycle = np.array(cells, dtype=np.int32)
+
+        # Write through a temporary file so concurrent workers never read a partial table
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, "wb") as f:
+                np.save(f, cycle)
+            os.replace(temp_path, path)
+        except OSError:
+            pass  # Read-only cache directory: the cycle is rebuilt next time
+
+    _CYCLES[(cols, rows)] = cycle
+    return cycle
+
+
+class SolverAgent:
+    """
+    Plays SnakeEnv by following a Hamiltonian cycle and cutting across it toward the apple.
+
+    The snake's body stays ordered along the cycle from tail to head, so the cells
+    ahead of the head up to the tail are free and following the cycle can never
+    collide. A shortcut to a neighbor further along the cycle keeps that order as long
+    as it lands before the apple and leaves SHORTCUT_MARGIN free cells (plus pending
+    growth) in front of the tail. Among the allowed moves, the one with the shortest
+    path to the apple is taken: a BFS over the free cells from the apple, computed
+    once per apple into buffers that are reused. Shortcuts stop when the snake fills
+    shortcut_limit of the board.
+
+    Positions that do not follow the cycle (a restored state, or boards with an odd
+    number of cells, which have no Hamiltonian cycle) are played greedily: the shortest
+    path to the apple if the tail is still reachable afterwards, otherwise the move
+    that keeps the tail reachable with the most room. The cycle is picked up again as
+    soon as the body lies along it.
+    """
+    def __init__(self, env: SnakeEnv, shortcuts: bool = True, shortcut_limit: float = 0.5, cache_dir: str | None = None):
+        """
+        Args:
+            env: the environment that will be played (its board size is used)
+            shortcuts: cut across the cycle toward the apple (False follows the cycle)
+            shortcut_limit: fraction of the board filled by the snake after which only the cycle is followed
+            cache_dir: directory of the cycle table cache (default: SNAKE_RL_CACHE or ~/.cache/snake_rl)
+        """
+        cols, rows = env.cols, env.rows
+        n_cells = cols * rows
+        self.n_cells = n_cells
+        self.shortcuts = shortcuts
+        self.max_shortcut_length = int(shortcut_limit * n_cells)
+
+        # Neighbors of every cell as (direction, cell) pairs, without wall moves
+        self.moves = move_table(cols, rows)
+        self.neighbors = [
+            [(direction, self.moves[direction][cell]) for direction in range(4) if self.moves[direction][cell] != cell]
+            for cell in range(n_cells)
+        ]
+
+        # Cycle position of every cell and the direction to the next cell along the cycle
+        try:
+            cycle = hamiltonian_cycle(cols, rows, cache_dir).tolist()
+        except ValueError:
+            cycle = None
+        self.order: List[int] | None = None
+        self.cycle_directions: List[int] | None = None
+        if cycle is not None:
+            self.order = [0] * n_cells
+            self.cycle_directions = [0] * n_cells
+            for position, cell in enumerate(cycle):
+                self.order[cell] = position
+                successor = cycle[(position + 1) % n_cells]
+                self.cycle_directions[cell] = next(d for d, neighbor in self.neighbors[cell] if neighbor == successor)
+
+        # Reusable BFS buffers: a cell was reached in the current search if seen[cell] == stamp
+        self._seen = [0] * n_cells
+        self._parent = [0] * n_cells
+        self._queue = [0] * n_cells
+        self._stamp = 0
+
+        # Distances to the apple (valid where dist_seen[cell] == dist_stamp), kept for (env, score, apple)
+        self._dist = [0] * n_cells
+        self._dist_seen = [0] * n_cells
+        self._dist_stamp = 0
+        self._dist_key: Tuple[int, int, int] | None = None
+
+        # (env, head, episode step) expected after the last move along the cycle
+        self._expected: Tuple[int, int, int] | None = None
+
+    # Choose the next action for the env's current position
+    def act(self, env: SnakeEnv) -> int:
+        head = env.snake.body[0]
+
+        # Skip the O(length) cycle check when the last move kept the body on the cycle
+        if self.order is not None:
+            if self._expected == (id(env), head, env.episode_steps) or self._on_cycle(env.snake.body):
+                action = self._cycle_action(env)
+                if action is not None:
+                    self._expected = (id(env), self.moves[action][head], env.episode_steps + 1)
+                    return action
+        self._expected = None
+        return self._greedy_action(env)
+
+    # Nothing to release (same interface as MCTSAgent)
+    def close(self) -> None:
+        pass
+
+    # Whether the body is ordered along the cycle from tail to head
+    def _on_cycle(self, body) -> bool:
+        order = self.order
+        n_cells = self.n_cells
+        tail_position = order[body[-1]]
+        previous = 0
+        for cell in reversed(body):
+            position = (order[cell] - tail_position) % n_cells
+            if position < previous:
+                return False
+            previous = position
+        return True
+
+    # Move along the cycle or a safe shortcut (None if even the cycle move is blocked)
+    def _cycle_action(self, env: SnakeEnv) -> int | None:
+        snake = env.snake
+        body = snake.body
+        occupancy = snake.occupancy
+        order = self.order
+        n_cells = self.n_cells
+        head = body[0]
+        tail = body[-1]
+        head_position = order[head]
+
+        # Free cells along the cycle between the head and the tail
+        to_tail = (order[tail] - head_position) % n_cells or n_cells
+        if to_tail < 2:
+            return None
+        action = self.cycle_directions[head]
+        apple = env.apple.cell
+        if not self.shortcuts or len(body) >= self.max_shortcut_length or apple == head:
+            return action
+
+        # Segments that will not leave the tail: pending growth and stacked start segments
+        growth = int(snake.should_grow)
+        index = len(body) - 2
+        while index >= 0 and body[index] == tail:
+            growth += 1
+            index -= 1
+
+        # Largest jump along the cycle that stays before the apple and keeps the margin
+        to_apple = (order[apple] - head_position) % n_cells
+        max_jump = min(to_apple, to_tail - 1 - growth - SHORTCUT_MARGIN)
+        if max_jump <= 1:
+            return action
+
+        # Among the allowed moves, the shortest path to the apple (longest jump among ties)
+        if self._dist_key != (id(env), env.score, apple):
+            self._distance_map(apple, occupancy)
+            self._dist_key = (id(env), env.score, apple)
+        dist = self._dist
+        dist_seen = self._dist_seen
+        stamp = self._dist_stamp
+        best_dist = n_cells
+        best_jump = 0
+        for direction, neighbor in self.neighbors[head]:
+            jump = (order[neighbor] - head_position) % n_cells
+            if jump > 1 and (jump > max_jump or occupancy[neighbor]):
+                continue
+            neighbor_dist = dist[neighbor] if dist_seen[neighbor] == stamp else n_cells
+            if neighbor_dist < best_dist or (neighbor_dist == best_dist and jump > best_jump):
+                best_dist = neighbor_dist
+                best_jump = jump
+                action = direction
+        return action
+
+    # BFS distances to the apple over the free cells
+    def _distance_map(self, apple: int, occupancy) -> None:
+        self._stamp += 1
+        stamp = self._stamp
+        seen = self._dist_seen
+        dist = self._dist
+        queue = self._queue
+        neighbors = self.neighbors
+
+        seen[apple] = stamp
+        dist[apple] = 0
+        queue[0] = apple
+        read, write = 0, 1
+        while read < write:
+            cell = queue[read]
+            read += 1
+            next_dist = dist[cell] + 1
+            for _, neighbor in neighbors[cell]:
+                if seen[neighbor] != stamp and not occupancy[neighbor]:
+                    seen[neighbor] = stamp
+                    dist[neighbor] = next_dist
+                    queue[write] = neighbor
+                    write += 1
+        self._dist_stamp = stamp
+
+    # Shortest path from start to goal over the free cells
+    def _shortest_path(self, start: int, goal: int, occupancy) -> List[int] | None:
+        """
+        Returns the cells after start up to goal (None if the goal cannot be reached)
+        """
+        self._stamp += 1
+        stamp = self._stamp
+        seen = self._seen
+        parent = self._parent
+        queue = self._queue
+        neighbors = self.neighbors
+
+        seen[start] = stamp
+        queue[0] = start
+        read, write = 0, 1
+        while read < write:
+            cell = queue[read]
+            read += 1
+            for _, neighbor in neighbors[cell]:
+                if seen[neighbor] == stamp or occupancy[neighbor]:
+                    continue
+                seen[neighbor] = stamp
+                parent[neighbor] = cell
+                if neighbor == goal:
+                    path = [neighbor]
+                    while parent[neighbor] != start:
+                        neighbor = parent[neighbor]
+                        path.append(neighbor)
+                    path.reverse()
+                    return path
+                queue[write] = neighbor
+                write += 1
+        return None
+
+    # Flood fill from a cell the head would move to
+    def _room(self, start: int, tail: int, occupancy) -> Tuple[bool, int]:
+        """
+        Returns (whether a reachable cell touches the tail, number of reachable free cells)
+        """
+        self._stamp += 1
+        stamp = self._stamp
+        seen = self._seen
+        queue = self._queue
+        neighbors = self.neighbors
+
+        seen[start] = stamp
+        queue[0] = start
+        read, write = 0, 1
+        reaches_tail = False
+        while read < write:
+            cell = queue[read]
+            read += 1
+            for _, neighbor in neighbors[cell]:
+                if neighbor == tail:
+                    reaches_tail = True
+                if seen[neighbor] != stamp and not occupancy[neighbor]:
+                    seen[neighbor] = stamp
+                    queue[write] = neighbor
+                    write += 1
+        return reaches_tail, write - 1
+
+    # Shortest path to the apple if the tail stays reachable, otherwise the roomiest move
+    def _greedy_action(self, env: SnakeEnv) -> int:
+        snake = env.snake
+        body = snake.body
+        occupancy = snake.occupancy
+        head = body[0]
+        tail = body[-1]
+        opposite = OPPOSITE_DIRECTIONS[snake.direction] if snake.direction is not None else -1
+
+        moves = [
+            (direction, neighbor) for direction, neighbor in self.neighbors[head]
+            if not occupancy[neighbor] and direction != opposite
+        ]
+        if not moves:
+            return snake.direction if snake.direction is not None else 0
+
+        # Follow the shortest path to the apple if a virtual snake that took it can still reach its tail
+        path = self._shortest_path(head, env.apple.cell, occupancy)
+        if path is not None:
+            virtual_body = deque(body)
+            virtual_occupancy = occupancy[:]
+            growing = snake.should_grow
+            for cell in path:
+                virtual_body.appendleft(cell)
+                virtual_occupancy[cell] += 1
+                if growing:
+                    growing = False
+                else:
+                    virtual_occupancy[virtual_body.pop()] -= 1
+            if self._room(path[-1], virtual_body[-1], virtual_occupancy)[0]:
+                return next(direction for direction, neighbor in moves if neighbor == path[0])
+
+        # Otherwise keep the tail reachable, closest to the apple, with the most room
+        self._distance_map(env.apple.cell, occupancy)
+        self._dist_key = None
+        dist = self._dist
+        dist_seen = self._dist_seen
+        stamp = self._dist_stamp
+        best_action, best_score = moves[0][0], None
+        for direction, neighbor in moves:
+            reaches_tail, room = self._room(neighbor, tail, occupancy)
+            neighbor_dist = dist[neighbor] if dist_seen[neighbor] == stamp else self.n_cells
+            score = (reaches_tail, -neighbor_dist, room)
+            if best_score is None or score > best_score:
+                best_action, best_score = direction, score
+        return best_action
@@ -0,0 +1,351 @@
+"""
+Hyperparameter sweeps: many short DQN trainings in parallel with grid or random search and ASHA early stopping.
+"""
+import os  # for file operations
+import sys  # for system operations
+import csv  # for the summary table
+import json  # for search spaces and results
+import math  # for log-uniform sampling
+import time  # for timing and output directories
+import random  # for random search
+import argparse  # for command line arguments
+import itertools  # for grid search
+import traceback  # for reporting failed trials
+import multiprocessing as mp  # for the trial processes
+from multiprocessing.connection import Connection, wait  # for talking to running trials
+from typing import Any, Dict, List, Tuple  # for type hints
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Default search space over the DQN_KWARGS of rl/train.py (lists are choices)
+DEFAULT_SPACE: Dict[str, Any] = {
+    "learning_rate": [3e-5, 1e-4, 3e-4],
+    "batch_size": [32, 64, 128],
+    "buffer_size": [50_000, 100_000],
+    "exploration_fraction": [0.1, 0.2],
+    "gamma": [0.98, 0.99],
+}
+
+# Secondary statistic that breaks ties of each metric at the rungs (e.g. all trials scoring 0 early on)
+TIEBREAKERS = {"score_mean": "reward_mean", "reward_mean": "score_mean"}
+
+# Sampled distributions: {"uniform": [low, high]}, {"log_uniform": [low, high]} or {"int": [low, high]}
+DISTRIBUTIONS = ("uniform", "log_uniform", "int")
+
+
+# Load a search space from a JSON file or an inline JSON string
+def load_space(text: str | None) -> Dict[str, Any]:
+    """
+    Returns {hyperparameter: list of choices or distribution dict}
+    """
+    if text is None:
+        return dict(DEFAULT_SPACE)
+    if os.path.exists(text):
+        with open(text) as f:
+            space = json.load(f)
+    else:
+        space = json.loads(text)
+    for name, values in space.items():
+        if isinstance(values, dict):
+            if len(values) != 1 or next(iter(values)) not in DISTRIBUTIONS:
+                raise ValueError(f"{name}: a distribution is one of {DISTRIBUTIONS} with [low, high], got {values}")
+        elif not isinstance(values, list) or not values:
+            raise ValueError(f"{name}: expected a non-empty list of choices or a distribution, got {values}")
+    return space
+
+
+# Draw one value of a hyperparameter
+def _sample(values, rng: random.Random):
+    if isinstance(values, list):
+        return rng.choice(values)
+    (kind, (low, high)), = values.items()
+    if kind == "uniform":
+        return rng.uniform(low, high)
+    if kind == "log_uniform":
+        return math.exp(rng.uniform(math.log(low), math.log(high)))
+    return rng.randint(int(low), int(high))
+
+
+# Hyperparameters of every trial
+def make_trials(space: Dict[str, Any], search: str, n_trials: int | None = None, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Returns one hyperparameter dict per trial
+
+    grid: every combination of the choices (at most n_trials of them)
+    random: n_trials independent draws
+    """
+    if search == "grid":
+        sampled = [name for name, values in space.items() if not isinstance(values, list)]
+        if sampled:
+            raise ValueError(f"Grid search needs lists of choices, {', '.join(sampled)} are distributions")
+        names = list(space)
+        trials = [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+        return trials[:n_trials] if n_trials else trials
+    rng = random.Random(seed)
+    return [{name: _sample(values, rng) for name, values in space.items()} for _ in range(n_trials or 20)]
+
+
+# Training steps at which trials are evaluated
+def rung_steps(min_steps: int, max_steps: int, eta: float) -> List[int]:
+    """
+    Returns [min_steps, min_steps * eta, ...] below max_steps, then max_steps
+    """
+    rungs = []
+    steps = float(min_steps)
+    while steps < max_steps:
+        rungs.append(int(steps))
+        steps *= eta
+    return rungs + [max_steps]
+
+
+class SuccessiveHalving:
+    """
+    Asynchronous successive halving (ASHA) over the evaluation rungs of all trials.
+
+    A trial reaching rung k continues only if it ranks in the top
+    ceil(n / eta) of the n results recorded at rung k so far, so most trials are
+    stopped after the first rungs and the budget goes to the promising ones.
+    Results are compared as (metric, tie-breaker) tuples and a result tied with
+    an earlier one ranks below it, so trials that all score 0 at an early rung
+    are still pruned. Decisions never wait for other trials, so job slots stay
+    busy. Without early stopping there is a single rung at max_steps and every
+    trial runs to the end.
+    """
+    def __init__(self, min_steps: int, max_steps: int, eta: float = 3.0, early_stopping: bool = True):
+        self.eta = eta
+        self.rungs = rung_steps(min_steps, max_steps, eta) if early_stopping else [max_steps]
+        self.results: List[List[Tuple[float, ...]]] = [[] for _ in self.rungs]
+
+    # Record a rung result and decide whether the trial continues
+    def report(self, rung: int, value: Tuple[float, ...]) -> bool:
+        results = self.results[rung]
+        rank = sum(earlier >= value for earlier in results)
+        results.append(value)
+        if rung == len(self.rungs) - 1:
+            return True
+        return rank < math.ceil(len(results) / self.eta)
+
+
+# Entry point of a trial process
+def _run_trial(trial: int, params: Dict[str, Any], settings: Dict[str, Any], cpus: List[int] | None, conn: Connection) -> None:
+    try:
+        # Pin the CPUs and thread counts before torch starts its thread pools
+        if cpus and hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, cpus)
+        threads = str(settings["torch_threads"])
+        for name in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+            os.environ[name] = threads
+        import torch
+        torch.set_num_threads(settings["torch_threads"])
+
+        from stable_baselines3.common.callbacks import BaseCallback
+        from rl.train import ENV_KWARGS, make_model, make_train_env
+        from rl.evaluate import evaluate_batched
+
+        class RungCallback(BaseCallback):
+            # Evaluate at every rung and stop when the sweep says so
+            def __init__(self, rungs: List[int]):
+                super().__init__()
+                self.rungs = rungs
+                self.rung = 0
+
+            def _on_step(self) -> bool:
+                if self.num_timesteps < self.rungs[self.rung]:
+                    return True
+                stats = evaluate_batched(
+                    self.model.policy,
+                    n_episodes=settings["eval_episodes"],
+                    num_envs=settings["eval_envs"],
+                    seed=settings["seed"] + 10_000,  # Same boards for every trial and rung
+                    env_kwargs=env_kwargs,
+                )
+                conn.send(("rung", self.rung, self.num_timesteps, stats))
+                keep_going = conn.recv()
+                self.rung += 1
+                return keep_going and self.rung < len(self.rungs)
+
+        trial_dir = os.path.join(settings["output"], f"trial_{trial:03d}")
+        env_kwargs = dict(ENV_KWARGS, obs_type=settings["obs_type"])
+        env = make_train_env(settings["num_envs"], settings["vec_backend"], settings["seed"], os.path.join(trial_dir, "monitor"), env_kwargs)
+        try:
+            model = make_model(env, settings["obs_type"], settings["num_envs"], settings["seed"], tensorboard_log=None, **params)
+            callback = RungCallback(settings["rungs"])
+            start = time.perf_counter()
+            model.learn(total_timesteps=settings["rungs"][-1], callback=callback)
+            elapsed = time.perf_counter() - start
+        finally:
+            env.close()
+
+        completed = callback.rung == len(settings["rungs"])
+        if completed:
+            model.save(os.path.join(trial_dir, "model"))
+        conn.send(("done", "completed" if completed else "stopped", model.num_timesteps, elapsed))
+    except Exception:
+        conn.send(("error", traceback.format_exc()))
+    finally:
+        conn.close()
+
+
+# CPU sets of the job slots
+def job_slots(jobs: int, cpus_per_job: int) -> List[List[int] | None]:
+    """
+    Returns one CPU list per slot (None without pinning); slots wrap around if there are more jobs than CPUs
+    """
+    if cpus_per_job <= 0:
+        return [None] * jobs
+    cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+    return [[cpus[(slot * cpus_per_job + i) % len(cpus)] for i in range(cpus_per_job)] for slot in range(jobs)]
+
+
+# Run all trials on a pool of job slots
+def run_sweep(trials: List[Dict[str, Any]], scheduler: SuccessiveHalving, settings: Dict[str, Any], slots: List[List[int] | None], metric: str) -> List[Dict[str, Any]]:
+    """
+    Returns one result dict per trial (params, status, steps, metric, per-rung stats, seconds)
+    """
+    ctx = mp.get_context("spawn")
+    settings = dict(settings, rungs=scheduler.rungs)
+    results = [dict(trial=i, params=params, status="pending", steps=0, metric=None, rungs=[], seconds=0.0) for i, params in enumerate(trials)]
+    pending = list(range(len(trials)))
+    free = list(range(len(slots)))
+    running: Dict[Connection, Tuple[int, Any, int, float]] = {}
+
+    while pending or running:
+        # Start trials on the free slots
+        while pending and free:
+            trial, slot = pending.pop(0), free.pop(0)
+            parent_conn, child_conn = ctx.Pipe()
+            process = ctx.Process(target=_run_trial, args=(trial, trials[trial], settings, slots[slot], child_conn), daemon=True)
+            process.start()
+            child_conn.close()
+            running[parent_conn] = (trial, process, slot, time.perf_counter())
+            results[trial]["status"] = "running"
+
+        for conn in wait(list(running)):
+            trial, process, slot, started = running[conn]
+            result = results[trial]
+            try:
+                message = conn.recv()
+            except EOFError:
+                message = ("error", f"trial process exited with code {process.exitcode}")
+
+            if message[0] == "rung":
+                _, rung, steps, stats = message
+                value = stats[metric]
+                keep_going = scheduler.report(rung, (value, stats[TIEBREAKERS[metric]]))
+                result.update(steps=steps, metric=value)
+                result["rungs"].append(dict(steps=steps, **stats))
+                conn.send(keep_going)
+                print(f"trial {trial:3d} rung {rung} ({steps:,} steps): {metric} {value:.3f}{'' if keep_going else ' -> stopped'}")
+                continue
+
+            if message[0] == "done":
+                _, status, steps, _ = message
+                result.update(status=status, steps=steps)
+            else:
+                result["status"] = "failed"
+                result["error"] = message[1]
+                print(f"trial {trial:3d} failed:\n{message[1]}")
+            result["seconds"] = time.perf_counter() - started
+            process.join()
+            conn.close()
+            del running[conn]
+            free.append(slot)
+    return results
+
+
+# Write the summary table as CSV and JSON
+def write_summary(results: List[Dict[str, Any]], output: str, metric: str) -> None:
+    names = sorted({name for result in results for name in result["params"]})
+    with open(os.path.join(output, "summary.csv"), "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["trial", "status", "steps", metric, *names, "seconds"])
+        for result in results:
+            writer.writerow([result["trial"], result["status"], result["steps"], result["metric"], *(result["params"].get(name) for name in names), round(result["seconds"], 1)])
+    with open(os.path.join(output, "summary.json"), "w") as f:
+        json.dump(results, f, indent=2)
+
+
+# Summary table, best trials first
+def format_summary(results: List[Dict[str, Any]], metric: str) -> str:
+    """
+    Returns one line per trial sorted by metric (failed trials last)
+    """
+    names = sorted({name for result in results for name in result["params"]})
+    ranked = sorted(results, key=lambda result: -math.inf if result["metric"] is None else result["metric"], reverse=True)
+    widths = [max(len(name), 10) for name in names]
+    lines = [f"{'trial':>5}  {'status':<10}{'steps':>10}{metric:>14}  " + "  ".join(f"{name:>{width}}" for name, width in zip(names, widths)) + f"{'seconds':>9}"]
+    for result in ranked:
+        value = "" if result["metric"] is None else f"{result['metric']:.3f}"
+        params = "  ".join(f"{result['params'].get(name, ''):>{width}g}" if isinstance(result["params"].get(name), (int, float)) else f"{str(result['params'].get(name, '')):>{width}}" for name, width in zip(names, widths))
+        lines.append(f"{result['trial']:>5}  {result['status']:<10}{result['steps']:>10,}{value:>14}  {params}{result['seconds']:>9.1f}")
+    return "\n".join(lines)
+
+
+# Main sweep function
+def main():
+    # Set up argument parser
+    parser = argparse.ArgumentParser(description="Hyperparameter sweep over short DQN trainings")
+    parser.add_argument("--space", type=str, default=None, help="Search space as a JSON file or inline JSON (default: DEFAULT_SPACE)")
+    parser.add_argument("--search", choices=["grid", "random"], default="random", help="grid: every combination, random: --trials draws")
+    parser.add_argument("--trials", type=int, default=None, help="Random draws (default 20), or the first N grid points")
+    parser.add_argument("--scheduler", choices=["asha", "none"], default="asha", help="asha: stop losing trials at the rungs, none: train every trial to --max-steps")
+    parser.add_argument("--min-steps", type=int, default=20_000, help="Training steps of the first rung")
+    parser.add_argument("--max-steps", type=int, default=200_000, help="Training steps of a full trial")
+    parser.add_argument("--eta", type=float, default=3.0, help="Rung growth factor; the top 1/eta of each rung continues")
+    parser.add_argument("--jobs", type=int, default=None, help="Trials run at once (default: CPUs / --cpus-per-job)")
+    parser.add_argument("--cpus-per-job", type=int, default=1, help="CPUs each trial is pinned to (0: no pinning)")
+    parser.add_argument("--torch-threads", type=int, default=1, help="Torch threads per trial")
+    parser.add_argument("--num-envs", type=int, default=1, help="Training environments per trial")
+    parser.add_argument("--vec-backend", choices=["dummy", "subproc", "numpy"], default="dummy", help="VecEnv backend of each trial")
+    parser.add_argument("--obs-type", choices=["features", "grid"], default="features", help="Observation type")
+    parser.add_argument("--eval-episodes", type=int, default=32, help="Episodes per rung evaluation")
+    parser.add_argument("--eval-envs", type=int, default=16, help="Boards played at once during evaluation")
+    parser.add_argument("--metric", choices=list(TIEBREAKERS), default="score_mean", help="Evaluation statistic to maximize")
+    parser.add_argument("--output", type=str, default=None, help="Output directory (default: sweeps/<time>)")
+    parser.add_argument("--seed", type=int, default=0, help="Training seed of every trial and seed of the random search")
+    args = parser.parse_args()
+
+    # Check the hyperparameter names before starting any trial
+    import inspect
+    from stable_baselines3 import DQN
+    try:
+        space = load_space(args.space)
+        trials = make_trials(space, args.search, args.trials, args.seed)
+    except ValueError as error:
+        parser.error(str(error))
+    unknown = set(space) - set(inspect.signature(DQN).parameters)
+    if unknown:
+        parser.error(f"Not DQN arguments: {', '.join(sorted(unknown))}")
+
+    scheduler = SuccessiveHalving(args.min_steps, args.max_steps, args.eta, early_stopping=args.scheduler == "asha")
+    cpus_per_job = max(args.cpus_per_job, 1)
+    available = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    jobs = args.jobs or max(1, available // cpus_per_job)
+    slots = job_slots(jobs, args.cpus_per_job)
+
+    output = args.output or os.path.join("sweeps", time.strftime("%Y%m%d-%H%M%S"))
+    os.makedirs(output, exist_ok=True)
+    with open(os.path.join(output, "space.json"), "w") as f:
+        json.dump(dict(space=space, search=args.search, rungs=scheduler.rungs, eta=args.eta, metric=args.metric), f, indent=2)
+    print(f"{len(trials)} trials, {jobs} jobs, rungs at {', '.join(f'{steps:,}' for steps in scheduler.rungs)} steps, results in {output}")
+
+    settings = dict(
+        output=output,
+        num_envs=args.num_envs,
+        vec_backend=args.vec_backend,
+        obs_type=args.obs_type,
+        eval_episodes=args.eval_episodes,
+        eval_envs=args.eval_envs,
+        torch_threads=args.torch_threads,
+        seed=args.seed,
+    )
+    start = time.perf_counter()
+    results = run_sweep(trials, scheduler, settings, slots, args.metric)
+    write_summary(results, output, args.metric)
+    print(format_summary(results, args.metric))
+    print(f"Sweep finished in {time.perf_counter() - start:.0f}s, summary in {os.path.join(output, 'summary.csv')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Torch runtime controls: CPU thread counts and greedy Q-network policies (eager, TorchScript or torch.compile) for play.
+"""
+import os  # for file operations
+import sys  # for system operations
+import warnings  # for TorchScript deprecation warnings
+from typing import Tuple  # for type hints
+
+import numpy as np  # for numerical operations
+import torch  # for thread settings and inference
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from torch import nn  # for the plain Q-network
+from stable_baselines3.common.preprocessing import is_image_space  # for observation preprocessing
+from rl.numpy_policy import load_policy  # for .zip and exported .npz models
+
+# How a Stable-Baselines3 model runs for play: model.predict, or its Q-network eager, traced or compiled
+POLICY_BACKENDS = ("sb3", "eager", "trace", "compile")
+
+
+# Set torch's intra-op and inter-op thread counts (None keeps torch's default)
+def configure_threads(threads: int | None = None, interop_threads: int | None = None) -> None:
+    if threads is not None:
+        torch.set_num_threads(threads)
+    if interop_threads is not None:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError as e:
+            # Only possible before torch has started any inter-op work
+            print(f"Could not set interop threads: {e}")
+
+
+class QNetworkPolicy:
+    """
+    Greedy policy that calls a DQN's Q-network directly under torch.inference_mode.
+
+    model.predict converts observations, checks their shape, switches training
+    mode and runs under no_grad on every call; for one observation per decision
+    that overhead is larger than the forward pass itself. This policy scales
+    board images like Stable-Baselines3 and runs the features extractor and
+    Q-value layers as one plain module, without the observation space checks of
+    Stable-Baselines3's preprocessing. With backend "trace" that module is a
+    TorchScript trace optimized for inference, with "compile" it goes through
+    torch.compile (compiled on the first calls). Actions are always greedy.
+    """
+    def __init__(self, model, backend: str = "eager"):
+        if backend not in POLICY_BACKENDS[1:]:
+            raise ValueError(f"Unknown Q-network backend: {backend}")
+        policy = model.policy
+        policy.set_training_mode(False)
+        q_net = nn.Sequential(policy.q_net.features_extractor, policy.q_net.q_net)
+        self.backend = backend
+        self.observation_space = model.observation_space
+        self.obs_shape = model.observation_space.shape
+        self.device = model.device
+        self.normalize_images = bool(policy.normalize_images and is_image_space(model.observation_space))
+
+        if backend == "trace":
+            example = self._to_tensor(self.observation_space.sample()[None])
+            with torch.no_grad(), warnings.catch_warnings():
+                warnings.simplefilter("ignore", FutureWarning)
+                q_net = torch.jit.optimize_for_inference(torch.jit.trace(q_net, example))
+        elif backend == "compile":
+            q_net = torch.compile(q_net, dynamic=True)
+        self.q_net = q_net
+
+    # Float tensor of a batch of observations (images are scaled to [0, 1])
+    def _to_tensor(self, obs: np.ndarray) -> torch.Tensor:
+        x = torch.as_tensor(obs, device=self.device).float()
+        return x / 255.0 if self.normalize_images else x
+
+    # Q-values of a batch of observations
+    def q_values(self, obs: np.ndarray) -> np.ndarray:
+        """
+        Returns (N, n_actions) float32 Q-values for a batch of observations
+        """
+        with torch.inference_mode():
+            return self.q_net(self._to_tensor(np.asarray(obs))).cpu().numpy()
+
+    # Greedy actions (same signature as DQN.predict)
+    def predict(self, obs: np.ndarray, state=None, episode_start=None, deterministic: bool = True) -> Tuple[np.ndarray, None]:
+        """
+        Returns (actions, None); a single observation gives a single action like DQN.predict
+        """
+        obs = np.asarray(obs)
+        batched = obs.ndim > len(self.obs_shape)
+        with torch.inference_mode():
+            q_values = self.q_net(self._to_tensor(obs if batched else obs[None]))
+            actions = q_values.argmax(dim=1).cpu().numpy()
+        return (actions if batched else actions[0]), None
+
+
+# Load a model for play with the given backend
+def load_play_policy(path: str, backend: str = "sb3", device: str = "auto", warmup: int = 3):
+    """
+    Returns load_policy(path) for "sb3" and exported .npz models, otherwise a QNetworkPolicy of the loaded DQN
+
+    Traced and compiled policies first predict warmup single observations and
+    batches, so compilation does not show up as decision latency in play.
+    """
+    model = load_policy(path, device=device)
+    if backend == "sb3" or path.endswith(".npz"):
+        return model
+    policy = QNetworkPolicy(model, backend)
+    if backend in ("trace", "compile"):
+        space = policy.observation_space
+        for _ in range(warmup):
+            policy.predict(space.sample())
+            policy.predict(np.stack([space.sample(), space.sample()]))
+    return policy
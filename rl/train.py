@@ -1,89 +1,270 @@
 """
 Training script for Snake RL agent using DQN.
 """
-from typing import Any
-
-
 import os
 import sys
+import csv
+import glob
+import json
+import argparse
+import time
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from stable_baselines3 import DQN # for DQN agent
-from stable_baselines3.common.callbacks import EvalCallback, CheckpointCallback # for callbacks
 from stable_baselines3.common.monitor import Monitor # for monitoring environment
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv, VecMonitor # for parallel environments
 from rl import SnakeEnv # for SnakeEnv environment
+from rl.checkpoint import AsyncCheckpointCallback, load_checkpoint # for checkpoints written in the background and resuming
+from rl.evaluate import BatchedEvalCallback # for batched evaluation
+from rl.policies import GridCNN # for grid observation policies
+from rl.torch_runtime import configure_threads # for torch thread counts
+
+# Environment settings shared by training and evaluation
+ENV_KWARGS = dict(
+    grid_width=600,
+    grid_height=600,
+    step_size=50,
+    initial_length=5,
+)
+
+# Single-environment DQN update schedule (scaled with the number of environments)
+BASE_TRAIN_FREQ = 4
+BASE_GRADIENT_STEPS = 1
+
+# Total training steps (a resumed run trains until the same total)
+TOTAL_TIMESTEPS = 5_000_000
+
+# DQN hyperparameters (rl/sweep.py searches over these)
+DQN_KWARGS = dict(
+    learning_rate=1e-4,
+    learning_starts=1000, # Steps before learning starts
+    batch_size=32, # Batch size for training
+    gamma=0.99, # Discount factor for future rewards
+    buffer_size=100_000, # Replay buffer size
+    exploration_fraction=0.2,   # Exploration phase fraction
+    exploration_initial_eps=1.0, # Initial exploration rate
+    exploration_final_eps=0.05, # Final exploration rate
+)
+
+# Create a factory for one seeded, monitored training worker
+def make_env(rank: int, monitor_dir: str, env_kwargs: dict = ENV_KWARGS):
+    def _init():
+        # Each env draws from its own generator, seeded by env.seed(seed) (worker i gets seed + i)
+        env = SnakeEnv(**env_kwargs)
+        return Monitor(env, os.path.join(monitor_dir, str(rank)))
+    return _init
+
+# Create the vectorized training environment
+def make_train_env(num_envs: int, backend: str, seed: int, monitor_dir: str, env_kwargs: dict = ENV_KWARGS):
+    os.makedirs(monitor_dir, exist_ok=True)
+
+    # Batched NumPy boards in this process
+    if backend == "numpy":
+        from rl.vec_env import SnakeVecEnv
+        env = SnakeVecEnv(num_envs, seed=seed, **env_kwargs)
+        return VecMonitor(env, os.path.join(monitor_dir, "numpy"))
+
+    env_fns = [make_env(rank, monitor_dir, env_kwargs) for rank in range(num_envs)]
+    if backend == "subproc":
+        env = SubprocVecEnv(env_fns)
+    else:
+        env = DummyVecEnv(env_fns)
+    env.seed(seed)
+    return env
+
+# Create a DQN agent with the default hyperparameters, overridden by hyperparams
+def make_model(env, obs_type: str, num_envs: int, seed: int, tensorboard_log: str | None = "tensorboard_logs/", **hyperparams) -> DQN:
+    # Grid observations use a CNN sized for small boards
+    if obs_type == "grid":
+        policy, policy_kwargs = "CnnPolicy", dict(features_extractor_class=GridCNN)
+    else:
+        policy, policy_kwargs = "MlpPolicy", None
+
+    # Keep about one gradient step per 4 collected transitions
+    train_freq = max(1, round(BASE_TRAIN_FREQ / num_envs))
+    gradient_steps = max(1, round(BASE_GRADIENT_STEPS * num_envs / BASE_TRAIN_FREQ))
+
+    kwargs = dict(
+        DQN_KWARGS,
+        policy_kwargs=policy_kwargs,
+        tensorboard_log=tensorboard_log, # for logging rewards and losses
+        train_freq=train_freq, # Vectorized steps between updates
+        gradient_steps=gradient_steps, # Updates per training round
+        seed=seed,
+    )
+    kwargs.update(hyperparams)
+    return DQN(policy, env, **kwargs)
+
+# Merge the per-worker Monitor logs of the given run directories into one monitor file sorted by time
+def merge_monitor_logs(monitor_dirs: list[str], output_path: str) -> None:
+    rows = []
+    t_starts = []
+    for monitor_dir in monitor_dirs:
+        for path in glob.glob(os.path.join(monitor_dir, "*monitor.csv")):
+            with open(path) as f:
+                header = json.loads(f.readline()[1:])
+                t_starts.append(header["t_start"])
+                # Store episode end times as absolute timestamps
+                for row in csv.DictReader(f):
+                    rows.append((header["t_start"] + float(row["t"]), row["r"], row["l"]))
+    if not t_starts:
+        return
+
+    # Rewrite times relative to the earliest worker start
+    t_start = min(t_starts)
+    rows.sort()
+    with open(output_path, "w", newline="") as f:
+        f.write("#" + json.dumps({"t_start": t_start, "env_id": "SnakeEnv"}) + "\n")
+        writer = csv.writer(f)
+        writer.writerow(["r", "l", "t"])
+        for t, r, l in rows:
+            writer.writerow([r, l, round(t - t_start, 6)])
 
 # Main training function
-def main():    
-    # Create training environment
-    env = SnakeEnv(
-        grid_width=600,
-        grid_height=600,
-        step_size=50,
-        initial_length=5,
+def main():
+    # Set up argument parser
+    parser = argparse.ArgumentParser(description="Train DQN agent for Snake")
+    parser.add_argument("--num-envs", type=int, default=1, help="Number of parallel training environments")
+    parser.add_argument(
+        "--vec-backend",
+        choices=["dummy", "subproc", "numpy"],
+        default="dummy",
+        help="dummy: envs in this process, subproc: one process per env, numpy: batched SnakeVecEnv",
     )
-    
-    # Wrap with Monitor for logging
-    log_dir = "logs/"
-    os.makedirs(log_dir, exist_ok=True)
-    env = Monitor(env, log_dir)
-    
-    # Create evaluation environment
-    eval_env = SnakeEnv(
-        grid_width=600,
-        grid_height=600,
-        step_size=50,
-        initial_length=5,
-        render_mode=None,
+    parser.add_argument("--seed", type=int, default=0, help="Base random seed (worker i uses seed + i)")
+    parser.add_argument(
+        "--obs-type",
+        choices=["features", "grid"],
+        default="features",
+        help="features: 11-feature vector with MlpPolicy, grid: board image with CnnPolicy",
     )
-    # Wrap with Monitor for logging
-    eval_env = Monitor[Any, Any](eval_env, log_dir + "eval/")
-    
-    # Create DQN agent
-    model = DQN(
-        "MlpPolicy",  # Multi-layer perceptron policy
-        env,
-        learning_rate=1e-4,
-        learning_starts=1000, # Steps before learning starts
-        batch_size=32, # Batch size for training
-        tensorboard_log="tensorboard_logs/", # for logging rewards and losses
-        gamma=0.99, # Discount factor for future rewards
-        buffer_size=100_000, # Replay buffer size
-        exploration_fraction=0.2,   # Exploration phase fraction
-        exploration_initial_eps=1.0, # Initial exploration rate
-        exploration_final_eps=0.05, # Final exploration rate
-
+    parser.add_argument("--eval-episodes", type=int, default=32, help="Episodes per evaluation")
+    parser.add_argument("--eval-envs", type=int, default=16, help="Boards played at once during evaluation")
+    parser.add_argument("--sync-eval", action="store_true", help="Evaluate on the training thread instead of a background process")
+    parser.add_argument(
+        "--replay-buffer",
+        choices=["default", "compact"],
+        default="default",
+        help="default: Stable-Baselines3 ReplayBuffer, compact: bit-packed SnakeReplayBuffer (rl/replay.py)",
+    )
+    parser.add_argument("--buffer-size", type=int, default=100_000, help="Replay buffer size in transitions")
+    parser.add_argument("--buffer-dir", type=str, default=None, help="Memory-map the compact replay buffer in this directory")
+    parser.add_argument("--keep-checkpoints", type=int, default=3, help="Checkpoints to keep (0: all)")
+    parser.add_argument(
+        "--checkpoint-replay",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Store the replay buffer with the checkpoints as incremental chunks",
     )
-    
-    # Set up callbacks
-    eval_callback = EvalCallback(
-        eval_env,
+    parser.add_argument(
+        "--resume",
+        type=str,
+        default=None,
+        help="Continue training from a checkpoint (.zip/.json, or a checkpoint directory for its newest checkpoint)",
+    )
+    parser.add_argument("--profile", action="store_true", help="Log env steps/sec and SnakeEnv phase shares to TensorBoard (rl/profiling.py)")
+    parser.add_argument("--demos", type=str, default=None, help="Demonstration dataset (rl/demos.py) to pre-fill the replay buffer with")
+    parser.add_argument("--demo-transitions", type=int, default=None, help="Most demonstration transitions to load (default: as many as fit)")
+    parser.add_argument("--torch-threads", type=int, default=None, help="Torch intra-op threads (default: torch's choice, usually one per core)")
+    parser.add_argument("--interop-threads", type=int, default=None, help="Torch inter-op threads (default: torch's choice)")
+    args = parser.parse_args()
+    num_envs = args.num_envs
+
+    # Limit torch's thread pools so side-by-side runs do not oversubscribe the CPU
+    configure_threads(args.torch_threads, args.interop_threads)
+    env_kwargs = dict(ENV_KWARGS, obs_type=args.obs_type)
+
+    # Each run writes its worker logs to its own directory; checkpoints record the runs
+    # they descend from, so a resumed run merges only the logs of its own lineage
+    log_dir = "logs/"
+    monitor_dir = log_dir + "workers/"
+    run_id = time.strftime("run_%Y%m%d-%H%M%S") + f"_{os.getpid()}"
+    env = make_train_env(num_envs, args.vec_backend, args.seed, os.path.join(monitor_dir, run_id), env_kwargs)
+
+    # Compact replay buffer (observations stored once and bit-packed)
+    if args.replay_buffer == "compact":
+        from rl.replay import SnakeReplayBuffer
+        replay_buffer_class, replay_buffer_kwargs = SnakeReplayBuffer, dict(storage_dir=args.buffer_dir)
+    else:
+        replay_buffer_class, replay_buffer_kwargs = None, None
+
+    # Create DQN agent (or restore it with its replay buffer, random streams and boards)
+    manifest = None
+    if args.resume:
+        model, manifest = load_checkpoint(args.resume, env)
+        print(f"Resumed from {args.resume} at {model.num_timesteps} steps")
+    else:
+        model = make_model(
+            env,
+            args.obs_type,
+            num_envs,
+            args.seed,
+            buffer_size=args.buffer_size,
+            replay_buffer_class=replay_buffer_class,
+            replay_buffer_kwargs=replay_buffer_kwargs,
+        )
+    # Runs whose worker logs belong to this training (earlier runs of a resumed checkpoint, then this one)
+    lineage = (manifest or {}).get("runs", []) + [run_id]
+
+    # Pre-fill the replay buffer with demonstrations
+    if args.demos and not args.resume:
+        from rl.demos import DemoDataset
+        added = DemoDataset(args.demos).fill_replay_buffer(model.replay_buffer, args.demo_transitions)
+        print(f"Added {added} demonstration transitions from {args.demos} to the replay buffer")
+
+    # Set up callbacks (frequencies count vectorized steps, so divide by num_envs)
+    eval_callback = BatchedEvalCallback(
+        eval_freq=max(5000 // num_envs, 1),  # Evaluate every N steps
+        n_eval_episodes=args.eval_episodes,
+        num_envs=args.eval_envs,
+        asynchronous=not args.sync_eval,
         best_model_save_path="models/best/",
         log_path=log_dir + "eval/",
-        eval_freq=5000,  # Evaluate every N steps
-        deterministic=True,
-        render=False,
+        seed=args.seed,
+        env_kwargs=env_kwargs,
     )
-    
-    checkpoint_callback = CheckpointCallback(
-        save_freq=10000,  # Save checkpoint every N steps
+
+    checkpoint_callback = AsyncCheckpointCallback(
+        save_freq=max(10000 // num_envs, 1),  # Save checkpoint every N steps
         save_path="models/checkpoints/",
         name_prefix="snake_dqn",
+        keep_last=args.keep_checkpoints,
+        save_replay_buffer=args.checkpoint_replay,
+        metadata={"runs": lineage},
     )
-    
+
+    # Per-phase environment timing (off by default, costs nothing when off)
+    callbacks = [eval_callback, checkpoint_callback]
+    if args.profile:
+        from rl.profiling import ProfilingCallback
+        callbacks.append(ProfilingCallback(log_freq=max(10000 // num_envs, 1), verbose=1))
+
+    # Continue callback schedules, evaluation history and replay chunks of a resumed run
+    if args.resume:
+        for callback in callbacks:
+            callback.n_calls = model.num_timesteps // num_envs
+        eval_callback.load_history(model.num_timesteps)
+        if manifest is not None:
+            checkpoint_callback.resume(manifest)
+
     # Train the agent
-    print("Starting training...")
-    model.learn(
-        total_timesteps=5000000,  # Total training steps
-        callback=[eval_callback, checkpoint_callback],
-        progress_bar=True,
-    )
-    
+    print(f"Starting training with {num_envs} {args.vec_backend} environment(s)...")
+    try:
+        model.learn(
+            total_timesteps=TOTAL_TIMESTEPS - model.num_timesteps,  # Remaining training steps
+            callback=callbacks,
+            reset_num_timesteps=not args.resume, # Resumed runs continue their step counter and TensorBoard run
+            progress_bar=True,
+        )
+    finally:
+        env.close()
+        merge_monitor_logs([os.path.join(monitor_dir, run) for run in lineage], log_dir + "monitor.csv")
+
     # Save final model
     model.save("models/snake_dqn_final")
     print("Training complete! Model saved to models/snake_dqn_final")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
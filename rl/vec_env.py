@@ -0,0 +1,596 @@
+"""
+Batched NumPy Snake environment implementing the Stable-Baselines3 VecEnv interface.
+"""
+import numpy as np  # for numerical operations
+from gymnasium import spaces  # for action and observation spaces
+from stable_baselines3.common.vec_env.base_vec_env import VecEnv  # for vectorized env interface
+from typing import Any, Dict, List, Sequence  # for type hints
+import sys  # for system operations
+import os  # for file operations
+
+# Added parent directory to path to import the board layout and renderer
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from rl.snake_env import (
+    grid_layout,
+    observation_geometry,
+    grid_observation_space,
+    body_ages,
+    HEAD_CHANNEL,
+    BODY_CHANNEL,
+    APPLE_CHANNEL,
+    WALL_CHANNEL,
+    GRID_CHANNELS,
+    NEVER_ENTERED,
+    state_dtype,
+    NO_RNG_POS,
+)
+from rl.render import BoardRenderer
+
+
+# Action codes (same as SnakeEnv): 0=UP, 1=DOWN, 2=LEFT, 3=RIGHT
+DIRECTION_COL_OFFSETS = np.array([0, 0, -1, 1], dtype=np.int64)
+DIRECTION_ROW_OFFSETS = np.array([-1, 1, 0, 0], dtype=np.int64)
+OPPOSITE_DIRECTIONS = np.array([1, 0, 3, 2], dtype=np.int64)
+
+# Danger features are checked for these absolute directions, matching SnakeEnv._get_obs
+DANGER_DIRECTIONS = (0, 2, 3)  # UP, LEFT, RIGHT
+
+
+class SnakeVecEnv(VecEnv):
+    """
+    N Snake boards stepped together with vectorized NumPy operations.
+
+    Produces the same 11-feature observations, rewards, terminations and info keys
+    as SnakeEnv.step, and auto-resets finished boards like DummyVecEnv (the last
+    observation is stored in info["terminal_observation"]).
+
+    Board state is kept in preallocated arrays:
+    - occupancy: (N, cells) segment count per cell (segments may stack)
+    - body: (N, capacity) ring buffer of flat cell indices, head at head_ptr
+    - direction, apple, length, grow flag and episode counters: (N,)
+
+    With obs_type="grid" all boards are written into one contiguous
+    (N, 4, rows + 2, cols + 2) uint8 batch buffer (see SnakeEnv obs_type="grid").
+
+    get_states() and set_states() save and restore boards in the SnakeEnv.get_state
+    format, so states can move between SnakeEnv and SnakeVecEnv boards with the same
+    size and initial length, and clone_boards() copies boards inside the batch (e.g.
+    one position into many boards for parallel lookahead). All boards share one
+    random generator, so board states carry no random stream (rng_pos is
+    NO_RNG_POS and SnakeEnv.set_state keeps its own).
+    Observations are copies of the batch buffer unless copy_obs=False, in which
+    case the buffer itself is returned and overwritten by the next step (fine for
+    inference, not for algorithms that keep the previous observation like DQN).
+    """
+    # Initialize vectorized snake environment
+    def __init__(
+        self,
+        num_envs: int,
+        grid_width: int = 600,
+        grid_height: int = 600,
+        step_size: int = 50,
+        initial_length: int = 5,
+        seed: int | None = None,
+        cols: int | None = None,
+        rows: int | None = None,
+        render_mode: str | None = None,
+        obs_type: str = "features",
+        copy_obs: bool = True,
+    ):
+        # Initialize grid dimensions (same as SnakeEnv, cols and rows override the pixel size)
+        layout = grid_layout(grid_width, grid_height, step_size, cols, rows)
+        grid_width = self.grid_width = layout["grid_width"]
+        grid_height = self.grid_height = layout["grid_height"]
+        step_size = self.step_size = layout["step_size"]
+        self.initial_length = initial_length
+        self.grid_cols = grid_width / step_size
+        self.grid_rows = grid_height / step_size
+
+        # Grid boundaries (same window layout as SnakeEnv)
+        self.grid_left = layout["grid_left"]
+        self.grid_top = layout["grid_top"]
+        self.window_width = layout["window_width"]
+        self.window_height = layout["window_height"]
+
+        # Same observation geometry as SnakeEnv (window coordinates for pixel-sized boards)
+        self.sized_in_cells = cols is not None
+        self.col_offset, self.row_offset, self.max_distance = observation_geometry(layout, self.sized_in_cells)
+
+        # Integer board size used for the state arrays
+        self.cols = grid_width // step_size
+        self.rows = grid_height // step_size
+        self.n_cells = self.cols * self.rows
+        self.max_steps_without_food = 1000 # Prevent infinite games
+
+        # Only rgb_array rendering (one BoardRenderer per board, created on the first frame)
+        if render_mode not in (None, "rgb_array"):
+            raise ValueError(f"Unsupported render_mode for SnakeVecEnv: {render_mode}")
+        self.render_mode = render_mode
+        self._renderers: List[BoardRenderer] | None = None
+
+        if obs_type not in ("features", "grid"):
+            raise ValueError(f"Unknown obs_type: {obs_type}")
+        self.obs_type = obs_type
+        self.copy_obs = copy_obs
+        if obs_type == "grid":
+            observation_space = grid_observation_space(self.cols, self.rows)
+        else:
+            observation_space = spaces.Box(-1, 1, shape=(11,))
+
+        super().__init__(
+            num_envs,
+            observation_space,
+            spaces.Discrete(4),
+        )
+
+        # Random generator shared by all boards (starting cells and apples)
+        self.np_random = np.random.default_rng(seed)
+
+        # Ring buffer is large enough for stacked segments created at the walls
+        self.capacity = 2 * max(self.n_cells, initial_length) + 2
+
+        # Saved board state layout (shared with SnakeEnv.get_state)
+        self._state_dtype = state_dtype(self.cols, self.rows, initial_length)
+        self._state_length = self.n_cells + initial_length # Body cells in a saved state
+        self.state_size = self._state_dtype.itemsize
+
+        # Preallocated board state
+        n = num_envs
+        self.occupancy = np.zeros((n, self.n_cells), dtype=np.int32)
+        self.body = np.zeros((n, self.capacity), dtype=np.int64)
+        self.head_ptr = np.zeros(n, dtype=np.int64)
+        self.tail_ptr = np.zeros(n, dtype=np.int64)
+        self.length = np.zeros(n, dtype=np.int64)
+        self.direction = np.full(n, -1, dtype=np.int64)  # -1 until the first move
+        self.apple = np.zeros(n, dtype=np.int64)  # -1 when no free cell is left
+        self.should_grow = np.zeros(n, dtype=bool)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.steps_without_food = np.zeros(n, dtype=np.int64)
+        self.episode_steps = np.zeros(n, dtype=np.int64)
+
+        # Step buffers
+        self._env_idx = np.arange(n)
+        self._obs = np.zeros((n, 11), dtype=np.float32)
+        self._actions = np.zeros(n, dtype=np.int64)
+
+        # Grid observations: one contiguous batch buffer, used as the observation buffer
+        if obs_type == "grid":
+            self._obs = np.zeros((n, *observation_space.shape), dtype=np.uint8)
+            self._obs[:, WALL_CHANNEL] = 255
+            self._obs[:, WALL_CHANNEL, 1:-1, 1:-1] = 0
+            self._grid_flat = self._obs.reshape(n, GRID_CHANNELS, -1)
+            self._grid_moves = np.zeros(n, dtype=np.int32)  # Head moves this episode
+            self._entered = np.full((n, self.n_cells), NEVER_ENTERED, dtype=np.int32)  # Move at which the head entered each cell
+            self._grid_head = np.zeros(n, dtype=np.int64)  # Padded index set in the head channel
+            self._grid_apple = np.full(n, -1, dtype=np.int64)  # Padded index set in the apple channel (-1 if none)
+
+
+
+    # Reset all boards
+    def reset(self) -> np.ndarray:
+        """
+        Returns initial observations for all boards
+        """
+        # Reseed the generator if seed() was called
+        if self._seeds[0] is not None:
+            self.np_random = np.random.default_rng(self._seeds)
+        self._reset_seeds()
+        self._reset_options()
+
+        self._reset_boards(self._env_idx)
+        self._compute_obs(self._env_idx)
+        self.reset_infos = [self._get_info(i) for i in range(self.num_envs)]
+        return self._obs.copy() if self.copy_obs else self._obs
+
+
+
+    # Store actions for the next step_wait
+    def step_async(self, actions: np.ndarray) -> None:
+        self._actions[:] = np.asarray(actions).reshape(self.num_envs)
+
+
+
+    # Advance all boards one step
+    def step_wait(self) -> tuple[np.ndarray, np.ndarray, np.ndarray, List[Dict[str, Any]]]:
+        """
+        Returns observations, rewards, dones, infos (same semantics as SnakeEnv.step)
+        """
+        idx = self._env_idx
+        actions = self._actions
+
+        # Set direction (prevent 180-degree turns)
+        current = self.direction
+        reverse = (current >= 0) & (actions == OPPOSITE_DIRECTIONS[current])
+        direction = np.where(reverse, current, actions)
+        self.direction = direction
+
+        # Move one cell, clamped to the grid like Snake.update
+        head = self.body[idx, self.head_ptr]
+        head_col = head % self.cols
+        head_row = head // self.cols
+        new_col = np.clip(head_col + DIRECTION_COL_OFFSETS[direction], 0, self.cols - 1)
+        new_row = np.clip(head_row + DIRECTION_ROW_OFFSETS[direction], 0, self.rows - 1)
+        new_head = new_row * self.cols + new_col
+
+        # Self collision with any segment except the head
+        alive = (self.occupancy[idx, new_head] - (new_head == head)) == 0
+
+        # Push new head on living boards
+        moved = idx[alive]
+        self.head_ptr[moved] = (self.head_ptr[moved] + 1) % self.capacity
+        self.body[moved, self.head_ptr[moved]] = new_head[moved]
+        self.occupancy[moved, new_head[moved]] += 1
+        if self.obs_type == "grid":
+            self._grid_moves[moved] += 1
+            self._entered[moved, new_head[moved]] = self._grid_moves[moved]
+
+        # Pop tail unless growing
+        popped = idx[alive & ~self.should_grow]
+        tail = self.body[popped, self.tail_ptr[popped]]
+        self.occupancy[popped, tail] -= 1
+        self.tail_ptr[popped] = (self.tail_ptr[popped] + 1) % self.capacity
+        self.length[idx[alive & self.should_grow]] += 1
+        self.should_grow[moved] = False
+
+        # Increment episode step counter
+        self.episode_steps += 1
+
+        # Calculate reward based on outcome
+        ate = alive & (new_head == self.apple)
+        won = alive & ~ate & (self.length == self.grid_cols * self.grid_rows)
+        starving = alive & ~ate & ~won
+
+        rewards = np.full(self.num_envs, -0.25, dtype=np.float32) # Small negative reward per step
+        rewards[~alive] = -30.0 # Negative reward for dying
+        rewards[ate] = 5.0 # Positive reward for eating apple
+        rewards[won] = 100.0 # Bonus reward for winning (filled grid)
+
+        # Eating grows the snake, scores and spawns a new apple
+        eaters = idx[ate]
+        self.should_grow[eaters] = True
+        self.score[eaters] += 100
+        self.steps_without_food[eaters] = 0
+        self._spawn_apples(eaters)
+
+        # Eating the last free cell wins (no apple can spawn)
+        filled = ate & (self.apple < 0)
+        rewards[filled] = 100.0
+        won |= filled
+
+        # Truncate if too many steps without food
+        self.steps_without_food[starving] += 1
+        truncated = starving & (self.steps_without_food >= self.max_steps_without_food)
+        rewards[truncated] = -10.0 # Penalty for inefficiency
+
+        terminated = ~alive | won
+        dones = terminated | truncated
+
+        # Observations and infos of the finished step
+        self._compute_obs(idx)
+        infos = [self._get_info(i) for i in range(self.num_envs)]
+
+        # Auto-reset finished boards
+        done_idx = idx[dones]
+        if done_idx.size:
+            for i in done_idx:
+                infos[i]["TimeLimit.truncated"] = bool(truncated[i] and not terminated[i])
+                infos[i]["terminal_observation"] = self._obs[i].copy()
+            self._reset_boards(done_idx)
+            self._compute_obs(done_idx)
+
+        obs = self._obs.copy() if self.copy_obs else self._obs
+        return obs, rewards, dones, infos
+
+
+
+    # Reset the given boards to their initial state
+    def _reset_boards(self, indices: np.ndarray) -> None:
+        length = self.initial_length
+
+        # Random starting cell with all segments stacked on it
+        start = self.np_random.integers(self.n_cells, size=indices.size)
+        self.occupancy[indices] = 0
+        self.occupancy[indices, start] = length
+        self.body[indices, :length] = start[:, None]
+        self.tail_ptr[indices] = 0
+        self.head_ptr[indices] = length - 1
+        self.length[indices] = length
+
+        # Set tracking variables
+        self.direction[indices] = -1
+        self.should_grow[indices] = False
+        self.score[indices] = 0
+        self.steps_without_food[indices] = 0
+        self.episode_steps[indices] = 0
+
+        # Clear the grid observation
+        if self.obs_type == "grid":
+            self._obs[indices, :WALL_CHANNEL] = 0
+            self._grid_apple[indices] = -1
+            self._grid_moves[indices] = 0
+            self._entered[indices] = NEVER_ENTERED
+            self._entered[indices, start] = 0
+
+        # Spawn apple in valid position (not on snake)
+        self._spawn_apples(indices)
+
+
+
+    # Spawn apples on free cells of the given boards
+    def _spawn_apples(self, indices: np.ndarray) -> None:
+        # Vectorized rejection sampling, cheap while the boards have room
+        pending = indices
+        for _ in range(8):
+            if pending.size == 0:
+                return
+            cells = self.np_random.integers(self.n_cells, size=pending.size)
+            free = self.occupancy[pending, cells] == 0
+            self.apple[pending[free]] = cells[free]
+            pending = pending[~free]
+
+        # Nearly full boards pick directly among the free cells
+        for i in pending:
+            free_cells = np.flatnonzero(self.occupancy[i] == 0)
+            if free_cells.size:
+                self.apple[i] = free_cells[self.np_random.integers(free_cells.size)]
+            else:
+                self.apple[i] = -1
+
+
+
+    # Write observations of the given boards into the observation buffer
+    def _compute_obs(self, indices: np.ndarray) -> None:
+        """
+        Same 11 features as SnakeEnv._get_obs, computed for many boards at once
+        """
+        if self.obs_type == "grid":
+            self._compute_grid_obs(indices)
+            return
+
+        head = self.body[indices, self.head_ptr[indices]]
+        head_col = head % self.cols
+        head_row = head // self.cols
+
+        # Apple position features (dx, dy, distance); no apple reads as on the head
+        apple = self.apple[indices]
+        apple = np.where(apple >= 0, apple, head)
+        apple_dx = (apple % self.cols - head_col) / self.grid_cols
+        apple_dy = (apple // self.cols - head_row) / self.grid_rows
+
+        obs = np.zeros((indices.size, 11), dtype=np.float32)
+        obs[:, 0] = apple_dx
+        obs[:, 1] = apple_dy
+        obs[:, 2] = np.sqrt(apple_dx**2 + apple_dy**2) / self.max_distance
+
+        # Danger features (walls in observation coordinates, body in the occupancy grid)
+        for feature, direction in enumerate(DANGER_DIRECTIONS, start=3):
+            next_col = head_col + DIRECTION_COL_OFFSETS[direction]
+            next_row = head_row + DIRECTION_ROW_OFFSETS[direction]
+            next_x = next_col + self.col_offset
+            next_y = next_row + self.row_offset
+            wall = (next_x < 0) | (next_x >= self.grid_cols) | (next_y < 0) | (next_y >= self.grid_rows)
+            inside = (next_col >= 0) & (next_col < self.cols) & (next_row >= 0) & (next_row < self.rows)
+            cell = np.where(inside, next_row * self.cols + next_col, 0)
+            body = inside & (self.occupancy[indices, cell] > 0)
+            obs[:, feature] = wall | body
+
+        # Direction features (one-hot encoding, none before the first move)
+        direction = self.direction[indices]
+        moving = direction >= 0
+        obs[moving, 6 + direction[moving]] = 1.0
+
+        # Normalized snake length
+        obs[:, 10] = self.length[indices] / (self.grid_cols * self.grid_rows)
+
+        self._obs[indices] = obs
+
+
+
+    # Write board images of the given boards into the batch buffer
+    def _compute_grid_obs(self, indices: np.ndarray) -> None:
+        """
+        Same board image as SnakeEnv._get_grid_obs, computed for many boards at once
+        """
+        flat = self._grid_flat
+        head = self.body[indices, self.head_ptr[indices]]
+
+        # Head channel
+        padded = head + self.cols + 3 + 2 * (head // self.cols)
+        flat[indices, HEAD_CHANNEL, self._grid_head[indices]] = 0
+        flat[indices, HEAD_CHANNEL, padded] = 255
+        self._grid_head[indices] = padded
+
+        # Apple channel (no apple once the board is full)
+        apple = self.apple[indices]
+        previous = self._grid_apple[indices]
+        had_apple = previous >= 0
+        flat[indices[had_apple], APPLE_CHANNEL, previous[had_apple]] = 0
+        has_apple = apple >= 0
+        apple = np.where(has_apple, apple + self.cols + 3 + 2 * (apple // self.cols), -1)
+        flat[indices[has_apple], APPLE_CHANNEL, apple[has_apple]] = 255
+        self._grid_apple[indices] = apple
+
+        # Body channel from the age of every cell
+        ages = self._grid_moves[indices, None] - self._entered[indices]
+        body_ages(ages, self.length[indices, None].astype(np.int32))
+        self._obs[indices, BODY_CHANNEL, 1:-1, 1:-1] = ages.reshape(indices.size, self.rows, self.cols)
+
+
+
+    # Save the state of the given boards (all by default)
+    def get_states(self, indices: np.ndarray | None = None) -> np.ndarray:
+        """
+        Returns an (n, state_size) uint8 array of SnakeEnv.get_state buffers without
+        a random stream (rng_pos is NO_RNG_POS, SnakeEnv.set_state keeps its own)
+        """
+        indices = self._env_idx if indices is None else np.asarray(indices)
+        states = np.zeros(indices.size, dtype=self._state_dtype)
+        length = self.length[indices]
+        states["length"] = length
+        states["apple"] = self.apple[indices]
+        states["direction"] = self.direction[indices]
+        states["next_direction"] = -1
+        states["alive"] = True
+        states["should_grow"] = self.should_grow[indices]
+        states["score"] = self.score[indices]
+        states["steps_without_food"] = self.steps_without_food[indices]
+        states["episode_steps"] = self.episode_steps[indices]
+        states["rng_pos"] = NO_RNG_POS
+
+        # Ring buffer read backwards from the head, zero past the tail
+        ages = np.arange(self._state_length)
+        positions = (self.head_ptr[indices, None] - ages) % self.capacity
+        cells = self.body[indices[:, None], positions]
+        states["body"] = np.where(ages < length[:, None], cells, 0)
+        return states.view(np.uint8).reshape(indices.size, -1)
+
+    # Restore boards from saved states (SnakeEnv.get_state or get_states)
+    def set_states(self, states: np.ndarray, indices: np.ndarray | None = None) -> np.ndarray:
+        """
+        Returns the observations of the restored boards (all boards by default, one state per board)
+        """
+        indices = self._env_idx if indices is None else np.asarray(indices)
+        states = np.ascontiguousarray(states, dtype=np.uint8).reshape(indices.size, -1).view(self._state_dtype)[:, 0]
+        length = states["length"].astype(np.int64)
+
+        # Body in ring order (tail at slot 0, head at slot length - 1)
+        slots = np.arange(self._state_length)
+        inside = slots < length[:, None]
+        ages = np.where(inside, length[:, None] - 1 - slots, 0)
+        cells = np.take_along_axis(states["body"].astype(np.int64), ages, axis=1)
+        self.body[indices, :self._state_length] = np.where(inside, cells, 0)
+        self.tail_ptr[indices] = 0
+        self.head_ptr[indices] = length - 1
+        self.length[indices] = length
+
+        # Segment counts per cell
+        rows = np.broadcast_to(indices[:, None], inside.shape)[inside]
+        self.occupancy[indices] = 0
+        np.add.at(self.occupancy, (rows, cells[inside]), 1)
+
+        # SnakeEnv leaves the apple under the head when the board is full, here there is none
+        apple = states["apple"].astype(np.int64)
+        head = states["body"][:, 0].astype(np.int64)
+        self.apple[indices] = np.where(apple == head, -1, apple)
+        self.direction[indices] = states["direction"]
+        self.should_grow[indices] = states["should_grow"]
+        self.score[indices] = states["score"]
+        self.steps_without_food[indices] = states["steps_without_food"]
+        self.episode_steps[indices] = states["episode_steps"]
+
+        # Cell entry moves from the body: the most recent entry is the smallest age
+        if self.obs_type == "grid":
+            self._grid_moves[indices] = length
+            self._entered[indices] = NEVER_ENTERED
+            np.maximum.at(self._entered, (rows, cells[inside]), (length[:, None] - ages)[inside].astype(np.int32))
+
+        self._compute_obs(indices)
+        return self._obs[indices].copy()
+
+    # Copy boards inside the batch
+    def clone_boards(self, source: np.ndarray, target: np.ndarray) -> None:
+        """
+        Board target[i] becomes a copy of board source[i] (sources may repeat)
+        """
+        source = np.asarray(source)
+        target = np.asarray(target)
+        arrays = [
+            self.occupancy, self.body, self.head_ptr, self.tail_ptr, self.length, self.direction,
+            self.apple, self.should_grow, self.score, self.steps_without_food, self.episode_steps, self._obs,
+        ]
+        if self.obs_type == "grid":
+            arrays += [self._grid_moves, self._entered, self._grid_head, self._grid_apple]
+        for array in arrays:
+            array[target] = array[source]
+
+    # Get additional info for one board
+    def _get_info(self, i: int) -> Dict[str, Any]:
+        """
+        Returns dict with score, snake_length, steps_without_food
+        """
+        return {
+            "score": int(self.score[i]),
+            "snake_length": int(self.length[i]),
+            "steps_without_food": int(self.steps_without_food[i]),
+        }
+
+
+
+    # VecEnv plumbing: all boards live in this object
+    def close(self) -> None:
+        pass
+
+    # Attributes are shared by all boards, so every board reports the same value
+    def get_attr(self, attr_name: str, indices=None) -> List[Any]:
+        return [getattr(self, attr_name) for _ in self._get_indices(indices)]
+
+    def set_attr(self, attr_name: str, value: Any, indices=None) -> None:
+        self._all_boards(indices, f"set_attr({attr_name!r})")
+        setattr(self, attr_name, value)
+
+    # SnakeEnv methods run per board (get_state, set_state, reset, seed); any other
+    # method of this object is shared by all boards and runs once for all of them
+    def env_method(self, method_name: str, *method_args, indices=None, **method_kwargs) -> List[Any]:
+        board_methods = {
+            "get_state": self._board_get_state,
+            "set_state": self._board_set_state,
+            "reset": self._board_reset,
+            "seed": self._board_seed,
+        }
+        indices = np.asarray(list(self._get_indices(indices)), dtype=np.int64)
+        if method_name in board_methods:
+            return board_methods[method_name](indices, *method_args, **method_kwargs)
+        method = getattr(self, method_name)
+        self._all_boards(indices, f"env_method({method_name!r})")
+        result = method(*method_args, **method_kwargs)
+        return [result for _ in indices]
+
+    # Raise for a per-board call on a subset of boards that can only apply to all of them
+    def _all_boards(self, indices, call: str) -> None:
+        if indices is not None and sorted(self._get_indices(indices)) != list(range(self.num_envs)):
+            raise NotImplementedError(f"SnakeVecEnv boards share {call}, it cannot target a subset of boards")
+
+    # SnakeEnv.get_state of each board
+    def _board_get_state(self, indices: np.ndarray) -> List[np.ndarray]:
+        return list(self.get_states(indices))
+
+    # SnakeEnv.set_state on each board (observation per board)
+    def _board_set_state(self, indices: np.ndarray, state: np.ndarray | bytes, restore_rng: bool = True) -> List[np.ndarray]:
+        state = np.frombuffer(state, dtype=np.uint8) if isinstance(state, bytes) else np.asarray(state, dtype=np.uint8)
+        if restore_rng and state[:self.state_size].view(self._state_dtype)["rng_pos"][0] != NO_RNG_POS:
+            raise NotImplementedError("SnakeVecEnv boards share one random generator, use set_state(state, restore_rng=False)")
+        return list(self.set_states(np.broadcast_to(state, (indices.size, state.size)), indices))
+
+    # SnakeEnv.reset of each board ((observation, info) per board)
+    def _board_reset(self, indices: np.ndarray, seed: int | None = None, options: Dict[str, Any] | None = None) -> List[tuple]:
+        if seed is not None:
+            raise NotImplementedError("SnakeVecEnv boards share one random generator, use seed() followed by reset()")
+        self._reset_boards(indices)
+        self._compute_obs(indices)
+        infos = [self._get_info(i) for i in indices]
+        for i, info in zip(indices, infos):
+            self.reset_infos[i] = info
+        return [(self._obs[i].copy(), info) for i, info in zip(indices, infos)]
+
+    # Seeds applied by the next reset (all boards, like VecEnv.seed)
+    def _board_seed(self, indices: np.ndarray, seed: int | None = None) -> List[int | None]:
+        self._all_boards(indices, "seed")
+        seeds = self.seed(seed)
+        return [seeds[i] for i in indices]
+
+    def env_is_wrapped(self, wrapper_class, indices=None) -> List[bool]:
+        return [False for _ in self._get_indices(indices)]
+
+    def get_images(self) -> Sequence[np.ndarray | None]:
+        if self.render_mode != "rgb_array":
+            return [None for _ in range(self.num_envs)]
+        if self._renderers is None:
+            layout = (
+                self.cols, self.rows, self.step_size, self.grid_left, self.grid_top,
+                self.grid_width, self.grid_height, self.window_width, self.window_height,
+            )
+            self._renderers = [BoardRenderer(*layout) for _ in range(self.num_envs)]
+        return [
+            renderer.render(self.occupancy[i] > 0, int(self.apple[i]), int(self.score[i]))
+            for i, renderer in enumerate(self._renderers)
+        ]